@@ -0,0 +1,188 @@
+# BatchRun.py
+"""
+Headless batch propagation from a JSON scenario file.
+
+    python -m BatchRun scenario.json -o results/run_001
+
+Scenario format:
+
+    {
+      "time":   {"start": 0.0, "end": 25514.43},
+      "output": "results/run_001",
+      "bodies": [
+        {"class": "Earth",
+         "orbit":    {"static": true},
+         "attitude": {"integrator": "AdaptiveRK45Integrator", "torques": [{"type": "NullTorque"}]}},
+        {"class": "LEOSpaceVehicle", "name": "LEOSat", "sync_dt": 1,
+         "orbit":    {"integrator": "AdaptiveRK45Integrator",
+                      "forces": [{"type": "PointMassGravity", "body": "Earth"}],
+                      "absTol": 1e-10, "relTol": 1e-10},
+         "attitude": {"integrator": "AdaptiveRK45Integrator",
+                      "torques": [{"type": "NullTorque"}], "dt_max": 10}}
+      ]
+    }
+
+Bodies are ExampleObjectClasses classes; "name", "orbit_state" and
+"attitude_state" optionally override their defaults. Integrator blocks take
+any IndividualIntegratorProperties field (absTol, relTol, dt, dt_min,
+dt_max) and "stm": true enables the state transition matrix; an orbit
+block of {"static": true} holds the body fixed without integrating it.
+"extrapolate": tol lets other bodies read this body's orbit past its
+latest sync by Hermite extrapolation (CouplingModels), so it can use a
+much larger sync_dt. Force and torque entries name a ForceModels class; a
+"body" argument refers to another body by name.
+
+--checkpoint FILE needs --checkpoint-every SECONDS (simulation time).
+
+Results are written with TrajectoryStore.save_trajectories. Only the
+modules a batch run needs are imported, and only once the run starts.
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m BatchRun", description="Run a propagation scenario headless.")
+    parser.add_argument("scenario", help="scenario JSON file")
+    parser.add_argument("-o", "--output", help="trajectory store directory (default: scenario 'output')")
+    parser.add_argument("--end", type=float, help="override the scenario end time [s]")
+    parser.add_argument("--checkpoint", help="write periodic checkpoints to this file")
+    parser.add_argument("--checkpoint-every", type=float, default=None, help="checkpoint interval in simulation seconds (required with --checkpoint)")
+    parser.add_argument("--resume", help="resume from this checkpoint instead of starting fresh")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="propagate independent bodies in this many worker processes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print per-sync progress")
+    args = parser.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+
+    if args.checkpoint is not None and args.checkpoint_every is None:
+        parser.error("--checkpoint needs --checkpoint-every")
+
+    output = args.output or scenario.get("output")
+    if not output:
+        parser.error("no output path: pass -o or set 'output' in the scenario")
+
+    wall_start = time.perf_counter()
+    bodyList, TimeElement = build_scenario(scenario)
+    if args.end is not None:
+        TimeElement.endTime = args.end
+
+    run_scenario(
+        bodyList, TimeElement,
+        checkpoint_path=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        verbose=args.verbose,
+        workers=args.workers,
+    )
+
+    import TrajectoryStore
+    TrajectoryStore.save_trajectories(output, bodyList)
+
+    print(f"{len(bodyList)} bodies to t = {TimeElement.endTime:g} s -> {output} "
+          f"({time.perf_counter() - wall_start:.2f} s)")
+    return 0
+
+
+# ======================================================
+# Scenario
+# ======================================================
+def build_scenario(scenario):
+    """Return (bodyList, TimeElement) for a scenario dictionary."""
+    import numpy as np
+    import ExampleObjectClasses
+    import IntegratorModels
+    import TimeModule
+
+    TimeElement = TimeModule.Time()
+    span = scenario.get("time", {})
+    TimeElement.startTime = float(span.get("start", TimeElement.startTime))
+    TimeElement.endTime = float(span.get("end", TimeElement.endTime))
+    TimeElement.duration = TimeElement.endTime - TimeElement.startTime
+
+    # Bodies first, so forces can refer to any of them by name
+    bodies = {}
+    bodyList = []
+    for spec in scenario["bodies"]:
+        body = getattr(ExampleObjectClasses, spec["class"])()
+        if "name" in spec:
+            body.name = spec["name"]
+        if body.name in bodies:
+            raise ValueError(f"duplicate body name in scenario: {body.name}")
+
+        SP = body.StateProperties
+        for history in ("orbit", "attitude"):
+            if f"{history}_state" in spec:
+                state = np.asarray(spec[f"{history}_state"], dtype=float)
+                SP.restore_history(history, [TimeElement.startTime], [state], state)
+
+        bodies[body.name] = body
+        bodyList.append(body)
+
+    integrators = {}
+    for spec, body in zip(scenario["bodies"], bodyList):
+        IP = body.IntegratorProperties
+        if "sync_dt" in spec:
+            IP.sync_dt = float(spec["sync_dt"])
+        if "extrapolate" in spec:
+            import CouplingModels
+            CouplingModels.enable_extrapolation(body, tol=float(spec["extrapolate"]))
+
+        for kind in ("orbit", "attitude"):
+            settings = spec.get(kind)
+            if not settings:
+                continue
+            if kind == "orbit" and settings.get("static"):
+                body.make_static()
+                continue
+
+            IPk = getattr(IP, kind)
+            name = settings.get("integrator", "AdaptiveRK45Integrator")
+            if name not in integrators:
+                integrators[name] = getattr(IntegratorModels, name)()
+            IPk.integrator = integrators[name]
+
+            if kind == "orbit":
+                forces = [_build_model(entry, bodies) for entry in settings.get("forces", [])]
+                IPk.dynamics = IntegratorModels.OrbitDynamics(forces)
+                if settings.get("stm"):
+                    body.StateProperties.enable_stm()
+            else:
+                torques = [_build_model(entry, bodies) for entry in settings.get("torques", [])]
+                IPk.dynamics = IntegratorModels.AttitudeDynamics(torques=torques, body=body)
+
+            for field in ("absTol", "relTol", "dt", "dt_min", "dt_max"):
+                if field in settings:
+                    setattr(IPk, field, float(settings[field]))
+
+    return bodyList, TimeElement
+
+def run_scenario(bodyList, TimeElement, checkpoint_path=None, checkpoint_every=None, resume=None, verbose=False, workers=None):
+    import CheckpointModule
+    import PropagatorModels
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        if checkpoint_every is None:
+            raise ValueError("checkpoint_path needs checkpoint_every (simulation seconds)")
+        checkpoint = CheckpointModule.Checkpointer(checkpoint_path, every_sim=checkpoint_every)
+
+    if resume is not None:
+        return PropagatorModels.Resume(bodyList, TimeElement, resume, checkpoint, verbose=verbose, workers=workers)
+    return PropagatorModels.Propagate(bodyList, TimeElement, checkpoint, verbose=verbose, workers=workers)
+
+def _build_model(entry, bodies):
+    import ForceModels
+
+    entry = dict(entry)
+    cls = getattr(ForceModels, entry.pop("type"))
+    if "body" in entry:
+        entry["body"] = bodies[entry["body"]]
+    return cls(**entry)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# CheckpointModule.py
+import os
+import pickle
+import time
+import CouplingModels
+
+CHECKPOINT_VERSION = 1
+
+
+# ======================================================
+# Checkpointer
+# ======================================================
+class Checkpointer:
+    """
+    Periodic checkpoint policy for PropagatorModels.Propagate.
+
+    path        : checkpoint file (rewritten atomically on every save)
+    every_sim   : save after this much simulation time [s] has elapsed
+    every_wall  : save after this much wall-clock time [s] has elapsed
+    history     : "tail" - only the samples still needed for interpolation
+                           (enough for a bit-identical resume)
+                  "full" - complete histories (compact archives are
+                           stored as they are)
+                  None   - current states only
+
+    Decimator and extrapolator state is saved with the histories, so
+    pending prediction checks survive a resume, as are patched-conic
+    central-body switches.
+    """
+
+    def __init__(self, path, every_sim=None, every_wall=None, history="tail"):
+        if history not in ("tail", "full", None):
+            raise ValueError(f"unknown checkpoint history mode: {history}")
+
+        self.path = path
+        self.every_sim = every_sim
+        self.every_wall = every_wall
+        self.history = history
+
+        self._last_sim = None
+        self._last_wall = time.perf_counter()
+        self.saves = 0
+
+    def maybe_save(self, bodyList, pq, uid, t_sim):
+        if self._last_sim is None:
+            self._last_sim = t_sim
+
+        due = False
+        if self.every_sim is not None and t_sim - self._last_sim >= self.every_sim:
+            due = True
+        if self.every_wall is not None and time.perf_counter() - self._last_wall >= self.every_wall:
+            due = True
+
+        if due:
+            self.save(bodyList, pq, uid, t_sim)
+
+    def save(self, bodyList, pq, uid, t_sim):
+        save_checkpoint(self.path, bodyList, pq, uid, t_sim, history=self.history)
+        self._last_sim = t_sim
+        self._last_wall = time.perf_counter()
+        self.saves += 1
+
+
+# ======================================================
+# Save / Load
+# ======================================================
+def save_checkpoint(path, bodyList, pq, uid, t_sim, history="tail"):
+    names = _index_by_name(bodyList)
+
+    # Earliest time any body will integrate from; older samples are never read again
+    t_floor = None
+    if history == "tail":
+        synced = [_body_floor(body) for body in bodyList if _is_propagated(body)]
+        synced = [t for t in synced if t is not None]
+        t_floor = min(synced) if synced else None
+
+    bodies = {}
+    for name, body in names.items():
+        SP = body.StateProperties
+        IP = body.IntegratorProperties
+
+        entry = {
+            "collided": SP.collided,
+            "halt_time": getattr(SP, "halt_time", None),
+            "event_log": list(getattr(SP, "event_log", [])),
+            "orbit_dt": IP.orbit.dt,
+            "attitude_dt": IP.attitude.dt,
+            "orbit_controller": IP.orbit.controller,
+            "attitude_controller": IP.attitude.controller,
+            "archive_keep": getattr(SP, "archive_keep", None),
+            "extrapolator": _export_extrapolator(getattr(SP, "extrapolator", None)),
+            "orbit_switches": _export_switches(IP.orbit.dynamics),
+        }
+        for kind in ("orbit", "attitude", "stm"):
+            # A full checkpoint keeps the compact archive as it is
+            archive = getattr(SP, f"_{kind}_archive", None) if history == "full" else None
+            decimator = getattr(SP, f"_{kind}_decimator", None) if history is not None else None
+
+            times, states, current = SP.export_history(
+                kind, t_from=_history_floor(SP, kind, t_floor, decimator), archived=archive is None
+            )
+            if history is None and len(times):
+                times, states = times[-1:], states[-1:]
+            entry[kind] = {
+                "times": times, "states": states, "current": current,
+                "archive": archive, "decimator": decimator,
+            }
+
+        bodies[name] = entry
+
+    data = {
+        "version": CHECKPOINT_VERSION,
+        "sim_time": t_sim,
+        "uid": uid,
+        "heap": [(t, entry_uid, body.name) for t, entry_uid, body in pq],
+        "history": history,
+        "bodies": bodies,
+    }
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+
+    if data.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"unsupported checkpoint version: {data.get('version')}")
+    return data
+
+def restore_checkpoint(path, bodyList):
+    """
+    Load a checkpoint into an already-built bodyList.
+
+    Returns the (pq, uid) pair to continue the propagation loop with.
+    """
+    data = load_checkpoint(path) if isinstance(path, (str, os.PathLike)) else path
+    names = _index_by_name(bodyList)
+
+    missing = set(data["bodies"]) - set(names)
+    if missing:
+        raise ValueError(f"checkpoint bodies not in bodyList: {sorted(missing)}")
+
+    for name, entry in data["bodies"].items():
+        body = names[name]
+        SP = body.StateProperties
+        IP = body.IntegratorProperties
+
+        SP.collided = entry["collided"]
+        SP.halt_time = entry.get("halt_time")
+        SP.event_log = list(entry.get("event_log", []))
+        IP.orbit.dt = entry["orbit_dt"]
+        IP.attitude.dt = entry["attitude_dt"]
+        IP.orbit.controller = entry.get("orbit_controller", IP.orbit.controller)
+        IP.attitude.controller = entry.get("attitude_controller", IP.attitude.controller)
+
+        if entry.get("archive_keep") is not None:
+            SP.archive_keep = entry["archive_keep"]
+
+        for kind in ("orbit", "attitude", "stm"):
+            saved = entry.get(kind)
+            if saved is None:
+                continue
+            SP.restore_history(kind, saved["times"], saved["states"], saved["current"])
+            if saved.get("archive") is not None:
+                setattr(SP, f"_{kind}_archive", saved["archive"])
+            if saved.get("decimator") is not None:
+                setattr(SP, f"_{kind}_decimator", saved["decimator"])
+
+    # Pending prediction checks and central-body switches name other bodies,
+    # so every body must exist first
+    for name, entry in data["bodies"].items():
+        if entry.get("extrapolator") is not None:
+            _restore_extrapolator(names[name], entry["extrapolator"], names)
+        if entry.get("orbit_switches") is not None:
+            _restore_switches(names[name].IntegratorProperties.orbit.dynamics, entry["orbit_switches"], names)
+
+    # The heap list is stored in its internal order, so no re-heapify is needed
+    pq = [(t, entry_uid, names[name]) for t, entry_uid, name in data["heap"]]
+    return pq, data["uid"]
+
+
+# ======================================================
+# Helpers
+# ======================================================
+def _index_by_name(bodyList):
+    names = {}
+    for body in bodyList:
+        if body.name in names:
+            raise ValueError(f"checkpointing needs unique body names: {body.name}")
+        names[body.name] = body
+    return names
+
+def _is_propagated(body):
+    IP = body.IntegratorProperties
+    return IP.orbit.is_propagated or IP.attitude.is_propagated
+
+def _history_floor(SP, kind, t_floor, decimator):
+    """
+    Oldest time a tail checkpoint must keep for one history: a decimator
+    still compares against the last two samples, and pending extrapolation
+    checks compare against every sample after the prediction basis.
+    """
+    if t_floor is None:
+        return None
+    times = getattr(SP, f"_{kind}_times")
+    if decimator is not None and len(times) >= 2:
+        t_floor = min(t_floor, times[-2])
+    extrapolator = getattr(SP, "extrapolator", None)
+    if kind == "orbit" and extrapolator is not None and extrapolator._basis is not None:
+        t_floor = min(t_floor, extrapolator._basis[0])
+    return t_floor
+
+def _export_extrapolator(extrapolator):
+    if extrapolator is None:
+        return None
+    with extrapolator._lock:
+        return {
+            "tol": extrapolator.tol,
+            "basis": extrapolator._basis,
+            "queries": {body.name: list(window) for body, window in extrapolator._queries.items()},
+            "checks": extrapolator.checks,
+            "corrections": extrapolator.corrections,
+            "max_error": extrapolator.max_error,
+            "last_error": extrapolator.last_error,
+        }
+
+def _restore_extrapolator(body, saved, names):
+    extrapolator = body.StateProperties.extrapolator
+    if extrapolator is None:
+        extrapolator = CouplingModels.enable_extrapolation(body, saved["tol"])
+
+    extrapolator.tol = saved["tol"]
+    extrapolator._basis = saved["basis"]
+    extrapolator._queries = {names[name]: list(window) for name, window in saved["queries"].items()}
+    extrapolator.checks = saved["checks"]
+    extrapolator.corrections = saved["corrections"]
+    extrapolator.max_error = saved["max_error"]
+    extrapolator.last_error = saved["last_error"]
+
+def _export_switches(dynamics):
+    # Patched-conic central-body switches (see PatchedConicModels)
+    switches = getattr(dynamics, "switches", None)
+    if switches is None:
+        return None
+    return [(t, None if central is None else central.name) for t, central in switches]
+
+def _restore_switches(dynamics, saved, names):
+    if not hasattr(dynamics, "switches"):
+        return
+    dynamics.switches = [(t, None if name is None else names[name]) for t, name in saved]
+    if dynamics.switches:
+        dynamics.central = dynamics.switches[-1][1]
+
+def _body_floor(body):
+    SP = body.StateProperties
+    IP = body.IntegratorProperties
+    times = []
+    if IP.orbit.is_propagated:
+        times.append(SP.orbit_latest_time)
+    if IP.attitude.is_propagated:
+        times.append(SP.attitude_latest_time)
+    times = [t for t in times if t is not None]
+    return min(times) if times else None
@@ -1,8 +1,12 @@
 # CommandModule.py
+import csv
 import heapq
+import itertools
+import json
+import queue
 from dataclasses import dataclass
+from typing import Callable, Optional
 import CommandSet
-import RealTimePropagator
 
 # ======================================================
 # Command Object
@@ -13,6 +17,12 @@ class Command:
     command_name: str
     arguments: dict
     issue_time: float
+    # Called as on_executed(command, sim_time, ok) once the command has run
+    on_executed: Optional[Callable] = None
+    # Optional id used to cancel or replace the command while it is queued
+    command_id: Optional[str] = None
+    # Why the command failed (set by CommandModule before on_executed runs)
+    error: Optional[str] = None
 
 
 # ======================================================
@@ -22,7 +32,23 @@ class CommandModule:
     def __init__(self, simulator, bodyList):
         self.simulator = simulator
         self.bodyList = bodyList
+        self.propagator = None
         self._queue = []
+        self._seq = itertools.count()
+
+        # Queued (seq, command) by id; cancelled entries stay in the heap and
+        # are skipped when they reach the top
+        self._by_id = {}
+        self._cancelled = set()
+
+        # Lower-cased name -> body, kept in step with add_body
+        self._targets = {}
+        for body in bodyList:
+            self._index_body(body)
+
+        # Commands from other threads (e.g. CommandServer) land here and are
+        # moved into the priority queue by process() on the simulation thread
+        self._inbox = queue.SimpleQueue()
     # --------------------------------------------------
     # Parsing
     # --------------------------------------------------
@@ -32,26 +58,59 @@ class CommandModule:
             return None
         target = tokens[0]
         command = tokens[1]
-        args = {}
-        
-        print(tokens)
-
-        for token in tokens[2:]:
-            k, v = token.split("=")
-            if "," in v:
-                args[k] = [float(x) for x in v.split(",")]
-            else:
-                args[k] = float(v)
-
-        # Use propagator.sim_time if available, else 0
-        issue_time = self.propagator.sim_time if self.propagator else 0.0
+        args = parse_arguments(tokens[2:])
 
         return Command(
             target_name=target,
             command_name=command,
             arguments=args,
-            issue_time=issue_time
+            issue_time=self.current_time()
         )
+
+    def current_time(self):
+        # Use propagator.sim_time if available, else 0
+        return self.propagator.sim_time if self.propagator else 0.0
+
+    # --------------------------------------------------
+    # Timelines
+    # --------------------------------------------------
+    def load_timeline(self, path, fmt=None):
+        """
+        Queue every command in a timeline file; returns the number loaded.
+
+        fmt "jsonl" : one object per line, as accepted by CommandServer
+                      {"command_id": "burn1", "time": 1200.0, "target": "LEOSat",
+                       "command": "perform_maneuver", "args": {"dv": [0, 10, 0]}}
+        fmt "csv"   : header time,target,command[,args][,id] where args uses
+                      the TextBox grammar, e.g. "dv=0,10,0"
+
+        The format defaults to the file extension. Entries are pushed onto
+        the queue in one pass and heapified once.
+        """
+        if fmt is None:
+            fmt = "csv" if str(path).lower().endswith(".csv") else "jsonl"
+
+        with open(path, newline="") as f:
+            if fmt == "jsonl":
+                lines = [line for line in (l.strip() for l in f) if line and not line.startswith("#")]
+                records = json.loads("[" + ",".join(lines) + "]")
+                commands = [command_from_dict(data, self.current_time()) for data in records]
+            elif fmt == "csv":
+                commands = [
+                    Command(
+                        target_name=row["target"].strip(),
+                        command_name=row["command"].strip(),
+                        arguments=parse_arguments((row.get("args") or "").split()),
+                        issue_time=float(row["time"]),
+                        command_id=row.get("id") or None,
+                    )
+                    for row in csv.DictReader(f)
+                ]
+            else:
+                raise ValueError(f"unknown timeline format: {fmt}")
+
+        self.submit_many(commands)
+        return len(commands)
         
     # --------------------------------------------------
     # Execution
@@ -59,19 +118,16 @@ class CommandModule:
     def execute(self, command: Command):
         target = self.get_target(command.target_name)
         if target is None:
-            print(f"[CMD] unknown target: {command.target_name}")
-            return
+            return _fail(command, f"unknown target: {command.target_name}")
 
         handler = getattr(target, "CommandProperties", None)
         if handler is None:
-            print(f"[CMD] target has no CommandProperties: {target}")
-            return
+            return _fail(command, f"target has no CommandProperties: {target}")
 
         cmdset = handler.command_set
         method = getattr(cmdset, command.command_name, None)
         if method is None:
-            print(f"[CMD] unknown command on target: {command.command_name}")
-            return
+            return _fail(command, f"unknown command on target: {command.command_name}")
 
         # Dispatch with correct signature
         if isinstance(cmdset, CommandSet.SpacecraftCommandSet):
@@ -80,6 +136,7 @@ class CommandModule:
             method(command, sim_for_cmd, target)   # (command, propagator/sim, spacecraft)
         else:
             method(command, self.simulator)        # (command, simulator)      # (command, simulator)
+        return True
 
     # --------------------------------------------------
     # Both
@@ -101,32 +158,154 @@ class CommandModule:
         if name_lower in ("simulator", "sim"):
             return self.simulator
         
-        # Check bodies in bodyList
-        for body in self.bodyList:
-            if body.name.lower() == name_lower:
-                return body
-        
-        return None
+        body = self._targets.get(name_lower)
+        if body is None and len(self._targets) != len(self.bodyList):
+            # bodyList was changed behind our back; rebuild the index once
+            self._targets = {}
+            for other in self.bodyList:
+                self._index_body(other)
+            body = self._targets.get(name_lower)
+
+        return body
+
+    def add_body(self, body):
+        """Add a body to bodyList and make it addressable by name."""
+        self.bodyList.append(body)
+        self._index_body(body)
+
+    def _index_body(self, body):
+        self._targets.setdefault(body.name.lower(), body)
+
     # --------------------------------------------------
     # Scheduling
     # --------------------------------------------------
     def submit(self, command):
-        heapq.heappush(self._queue, (command.issue_time, command))
+        """
+        Queue a command; one with the id of a queued command replaces it.
+        A cancelled or replaced command still gets on_executed, with ok=False.
+        """
+        heapq.heappush(self._queue, self._entry(command))
+
+    def submit_many(self, commands):
+        entries = [self._entry(command) for command in commands]
+        if len(entries) > len(self._queue):
+            self._queue.extend(entries)
+            heapq.heapify(self._queue)
+        else:
+            for entry in entries:
+                heapq.heappush(self._queue, entry)
+
+    def _entry(self, command):
+        seq = next(self._seq)
+        if command.command_id is not None:
+            command.command_id = str(command.command_id)
+            self._cancel_queued(command.command_id, "replaced")
+            self._by_id[command.command_id] = (seq, command)
+        return (command.issue_time, seq, command)
+
+    def cancel(self, command_id):
+        """Drop a queued command by id; returns False if it is not queued."""
+        self._drain_inbox()
+        return self._cancel_queued(str(command_id), "cancelled")
+
+    def _cancel_queued(self, command_id, reason):
+        queued = self._by_id.pop(command_id, None)
+        if queued is None:
+            return False
+        seq, command = queued
+        self._cancelled.add(seq)
+
+        # The sender may be waiting for this command to run
+        if command.on_executed is not None:
+            _fail(command, f"{command.target_name} {command.command_name} {reason}: {command_id}")
+            command.on_executed(command, self.current_time(), False)
+        return True
+
+    def replace(self, command_id, command):
+        """Swap the queued command `command_id` for `command` (which takes the id)."""
+        command.command_id = str(command_id)
+        self.submit(command)
+
+    def submit_threadsafe(self, command):
+        """Queue a command from any thread; it is scheduled on the next process()."""
+        self._inbox.put(command)
+
+    def _drain_inbox(self):
+        while True:
+            try:
+                command = self._inbox.get_nowait()
+            except queue.Empty:
+                return
+            self.submit(command)
 
     # --------------------------------------------------
     # Execution
     # --------------------------------------------------
+    def next_time(self):
+        """Issue time of the earliest queued command, or None."""
+        self._drain_inbox()
+        self._discard_cancelled()
+        if not self._queue:
+            return None
+        return self._queue[0][0]
+
+    def _discard_cancelled(self):
+        while self._queue and self._queue[0][1] in self._cancelled:
+            _, seq, _ = heapq.heappop(self._queue)
+            self._cancelled.discard(seq)
+
     def process(self, sim_time):
-        while self._queue:
-            exec_time, cmd = self._queue[0]
+        self._drain_inbox()
+
+        while True:
+            self._discard_cancelled()
+            if not self._queue:
+                break
+
+            exec_time, seq, cmd = self._queue[0]
             if exec_time > sim_time:
                 break
 
             heapq.heappop(self._queue)
-            target = self.get_target(cmd.target_name)
+            if cmd.command_id is not None:
+                self._by_id.pop(cmd.command_id, None)
+
+            # A failing handler must not stop the queue or leave the sender
+            # (e.g. a CommandServer client) waiting for its acknowledgement
+            try:
+                ok = self.execute(cmd)
+            except Exception as exc:
+                ok = _fail(cmd, f"{cmd.target_name} {cmd.command_name} failed: {type(exc).__name__}: {exc}")
+
+            if cmd.on_executed is not None:
+                cmd.on_executed(cmd, sim_time, ok)
+
+
+# ======================================================
+# Helpers
+# ======================================================
+def _fail(command, message):
+    command.error = message
+    print(f"[CMD] {message}")
+    return False
+
+def parse_arguments(tokens):
+    """Parse TextBox-style key=value tokens (comma-separated values become lists)."""
+    args = {}
+    for token in tokens:
+        k, v = token.split("=")
+        if "," in v:
+            args[k] = [float(x) for x in v.split(",")]
+        else:
+            args[k] = float(v)
+    return args
 
-            target.CommandProperties.execute(
-                command=cmd,
-                simulator=self.simulator,
-                owner=target
-            )
+def command_from_dict(data, default_time=0.0):
+    """Build a Command from a JSON timeline / CommandServer record."""
+    return Command(
+        target_name=str(data["target"]),
+        command_name=str(data["command"]),
+        arguments=dict(data.get("args", {})),
+        issue_time=float(data["time"]) if "time" in data else default_time,
+        command_id=data.get("command_id"),
+    )
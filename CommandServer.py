@@ -0,0 +1,171 @@
+# CommandServer.py
+import asyncio
+import json
+import threading
+import CommandModule
+
+
+# ======================================================
+# Command Server
+# ======================================================
+class CommandServer:
+    """
+    asyncio command endpoint for the real-time simulator.
+
+    Accepts one command per line on a local TCP port (or a Unix socket when
+    `path` is given), either in the TextBox grammar
+
+        LEOSat perform_maneuver dv=0,10,0
+
+    or as a JSON line
+
+        {"id": 7, "target": "LEOSat", "command": "perform_maneuver",
+         "args": {"dv": [0, 10, 0]}, "time": 1200.0, "command_id": "burn1"}
+
+    "id" only tags the ack; "command_id" (optional) names the queued
+    command, so a later line with the same command_id replaces it.
+
+    Commands are queued with CommandModule.submit_threadsafe and run on the
+    simulation thread at the next CommandModule.process(). Each line is
+    answered with one JSON ack once the command has executed:
+
+        {"id": 7, "ok": true, "sim_time": 1200.016}
+
+    A command that fails (unknown target, or a handler that raises), or
+    that is cancelled or replaced before it runs, is answered with
+    "ok": false and an "error" message.
+
+    The event loop runs on its own daemon thread, so the GUI is untouched.
+    """
+
+    def __init__(self, command_module, host="127.0.0.1", port=0, path=None):
+        self.command_module = command_module
+        self.host = host
+        self.port = port
+        self.path = path
+
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._seq = 0
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="CommandServer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    @property
+    def address(self):
+        """(host, port) for TCP, or the socket path for Unix sockets."""
+        if self.path is not None:
+            return self.path
+        return (self.host, self.port)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        if self.path is not None:
+            start = asyncio.start_unix_server(self._handle_client, path=self.path)
+        else:
+            start = asyncio.start_server(self._handle_client, host=self.host, port=self.port)
+
+        self._server = self._loop.run_until_complete(start)
+        if self.path is None:
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    # --------------------------------------------------
+    # Connections
+    # --------------------------------------------------
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def reply(message):
+            async with write_lock:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode().strip()
+                if not text:
+                    continue
+
+                self._seq += 1
+                try:
+                    command, command_id = self.parse_line(text, default_id=self._seq)
+                except Exception as exc:
+                    await reply({"id": self._seq, "ok": False, "error": str(exc)})
+                    continue
+
+                # Acks are sent as commands execute, so keep reading meanwhile
+                task = asyncio.ensure_future(self._submit(command, command_id, reply))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _submit(self, command, command_id, reply):
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def on_executed(cmd, sim_time, ok):
+            loop.call_soon_threadsafe(_resolve, done, (sim_time, ok))
+
+        command.on_executed = on_executed
+        self.command_module.submit_threadsafe(command)
+
+        sim_time, ok = await done
+        ack = {"id": command_id, "ok": bool(ok), "sim_time": float(sim_time)}
+        if command.error is not None:
+            ack["error"] = command.error
+        await reply(ack)
+
+    # --------------------------------------------------
+    # Parsing
+    # --------------------------------------------------
+    def parse_line(self, text, default_id=None):
+        """Return (Command, id) for a text or JSON command line."""
+        if text.startswith("{"):
+            data = json.loads(text)
+            command = CommandModule.command_from_dict(data, self.command_module.current_time())
+            return command, data.get("id", default_id)
+
+        command = self.command_module.parse(text)
+        if command is None:
+            raise ValueError("empty command")
+        return command, default_id
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
@@ -33,13 +33,16 @@ class SpacecraftCommandSet(BaseCommandSet):
 
     def perform_maneuver(self, command, simulator, spacecraft):
         dv = np.array(command.arguments["dv"], dtype=float)
-        t = simulator.sim_time
+        # Propagators that run commands inside the propagation loop report the
+        # exact command time; otherwise fall back to the current sim time
+        t = getattr(simulator, "execution_time", simulator.sim_time)
 
         SP = spacecraft.StateProperties
         state = SP.orbit_state_at_time(t).copy()
         state[3:6] += dv
 
-        SP.set_orbitState(t, state)
+        # Any samples past t were computed without the burn
+        SP.override_orbitState(t, state)
         simulator.reset_propagation()
 
     def perform_attitude_change(self, command, simulator, spacecraft):
@@ -0,0 +1,217 @@
+import threading
+import numpy as np
+import EventModels
+
+# Body currently being advanced on this thread (see consumer)
+_local = threading.local()
+
+
+# ======================================================
+# Consumer Context
+# ======================================================
+class consumer:
+    """
+    Context manager naming the body whose propagation is reading source states.
+
+        with CouplingModels.consumer(body):
+            advance_body(body, t_target)
+
+    Predictions made inside the block are charged to `body`, so a bad
+    prediction can later roll back exactly the bodies that used it.
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        self._previous = getattr(_local, "body", None)
+        _local.body = self.body
+        return self.body
+
+    def __exit__(self, *exc):
+        _local.body = self._previous
+        return False
+
+def current_consumer():
+    return getattr(_local, "body", None)
+
+
+# ======================================================
+# Hermite Extrapolation
+# ======================================================
+class HermiteExtrapolator:
+    """
+    Predicts a source body's orbit state past its latest stored time.
+
+    The prediction is the cubic Hermite polynomial through the last two
+    stored samples and their derivatives (from the source's own dynamics),
+    continued past the newest one. Every prediction is charged to the
+    consumer making it; check() compares them against what the source
+    actually did once it has moved on.
+
+    tol : allowed position error of a prediction [m]
+
+    Statistics: checks, corrections, max_error (largest error seen) and
+    last_error (largest error of the latest check).
+    """
+
+    def __init__(self, body, tol=1.0):
+        self.body = body
+        self.tol = tol
+
+        self.checks = 0
+        self.corrections = 0
+        self.max_error = 0.0
+        self.last_error = 0.0
+
+        self._lock = threading.Lock()
+        self._basis = None       # (t1, HermiteDenseOutput) predictions are made from
+        self._queries = {}       # consumer -> [t_min, t_max] predicted since the last check
+
+    # Locks do not pickle (process-pool scheduling ships bodies to workers)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # Prediction
+    # --------------------------------------------------
+    def predict(self, t):
+        """Extrapolated orbit state at t (past the latest stored time)."""
+        # The basis is built outside the lock: it evaluates the source's
+        # dynamics, which may read (and extrapolate) other bodies
+        t1 = self.body.StateProperties._orbit_times[-1]
+        basis = self._basis
+        if basis is None or basis[0] != t1:
+            basis = (t1, self._build_basis())
+
+        with self._lock:
+            self._basis = basis
+            body = current_consumer()
+            if body is not None and body is not self.body:
+                window = self._queries.get(body)
+                if window is None:
+                    self._queries[body] = [t, t]
+                else:
+                    window[0] = min(window[0], t)
+                    window[1] = max(window[1], t)
+        return basis[1](t)
+
+    def _build_basis(self):
+        SP = self.body.StateProperties
+        times = SP._orbit_times
+        states = SP._orbit_states
+
+        t1, x1 = times[-1], np.asarray(states[-1][0:6], dtype=float)
+        if len(times) < 2:
+            # Only one sample: second-order Taylor expansion about it
+            return TaylorExtrapolation(t1, x1, self._derivative(x1, t1))
+
+        t0, x0 = times[-2], np.asarray(states[-2][0:6], dtype=float)
+        return EventModels.HermiteDenseOutput(t0, x0, self._derivative(x0, t0), t1, x1, self._derivative(x1, t1))
+
+    def _derivative(self, x, t):
+        dynamics = self.body.IntegratorProperties.orbit.dynamics
+        if dynamics is None:
+            return np.hstack((x[3:6], np.zeros(3)))
+        return np.asarray(dynamics(x, t), dtype=float)[0:6]
+
+    # --------------------------------------------------
+    # Verification
+    # --------------------------------------------------
+    def check(self):
+        """
+        Compare outstanding predictions with the source's new samples.
+
+        Returns [(consumer, t_restart)] for consumers whose predictions were
+        off by more than tol: their states after t_restart must be
+        recomputed. Predictions are compared at the new sample times
+        covering each consumer's window; the part of a window the source has
+        not reached yet is judged against the new, better informed,
+        extrapolation. If the source was cut back instead, every consumer
+        restarts from the source's latest time.
+        """
+        SP = self.body.StateProperties
+        with self._lock:
+            if self._basis is None or not self._queries:
+                return []
+            t1, polynomial = self._basis
+            latest = SP._orbit_times[-1]
+            if latest == t1:
+                return []           # source has not moved; nothing to compare yet
+
+            queries, self._queries = self._queries, {}
+            self._basis = None
+
+        self.checks += 1
+        if latest < t1:
+            restarts = [(body, latest) for body in queries]
+            self.corrections += len(restarts)
+            return restarts
+
+        times, states, _ = SP.export_history("orbit", t_from=t1)
+
+        restarts = []
+        worst = 0.0
+        for body, (t_min, t_max) in queries.items():
+            # Samples from the first at/after t_min to the first at/after t_max
+            lo = int(np.searchsorted(times, t_min))
+            hi = int(np.searchsorted(times, t_max))
+            points = [(t, x) for t, x in zip(times[lo:hi + 1], states[lo:hi + 1])]
+            if t_max > latest:
+                points.append((t_max, self.predict(t_max)))
+
+            t_good = t1
+            for t, actual in points:
+                error = float(np.linalg.norm(polynomial(t)[0:3] - actual[0:3]))
+                worst = max(worst, error)
+                if error > self.tol:
+                    restarts.append((body, t_good))
+                    break
+                t_good = t
+
+        self.corrections += len(restarts)
+        self.last_error = worst
+        self.max_error = max(self.max_error, worst)
+        return restarts
+
+
+class TaylorExtrapolation:
+    """Constant-acceleration continuation of one orbit state and its derivative."""
+
+    def __init__(self, t0, x0, f0):
+        self.t0 = t0
+        self.x0 = x0
+        self.f0 = f0
+
+    def __call__(self, t):
+        dt = t - self.t0
+        x = self.x0 + dt * self.f0
+        x[0:3] += 0.5 * dt**2 * self.f0[3:6]
+        return x
+
+
+def enable_extrapolation(body, tol=1.0):
+    """Let consumers of `body` read extrapolated states past its latest time."""
+    body.StateProperties.extrapolator = HermiteExtrapolator(body, tol)
+    return body.StateProperties.extrapolator
+
+def check_source(body):
+    """
+    Verify predictions of `body` after it advanced, rolling back consumers
+    whose predictions were outside tolerance. Returns the rolled-back bodies.
+    """
+    extrapolator = getattr(body.StateProperties, "extrapolator", None)
+    if extrapolator is None:
+        return []
+
+    rolled_back = []
+    for consumer_body, t_restart in extrapolator.check():
+        consumer_body.StateProperties.truncate_after(t_restart)
+        rolled_back.append(consumer_body)
+    return rolled_back
@@ -1,6 +1,17 @@
 import numpy as np
 import CommonParameterObjects
 
+class StaticEphemeris:
+    """A body that never moves: the same state at every time."""
+    def __init__(self, state):
+        self.state = np.array(state, dtype=float)
+
+    def __call__(self, t):
+        return self.state.copy()
+
+    def states_at_times(self, times):
+        return np.repeat(self.state[None, :], np.size(times), axis=0)
+
 class CircularEphemeris:
     def __init__(self, body, centralBody, epoch=0.0, plane="xy"):
         self.a = np.linalg.norm(body.StateProperties.orbit_stateCurrent[0:3])
@@ -27,6 +38,17 @@ class CircularEphemeris:
 
         return np.hstack((r, v))
 
+    def states_at_times(self, times):
+        theta = self.n * (np.asarray(times, dtype=float).ravel() - self.epoch)
+        c, s = np.cos(theta), np.sin(theta)
+        vmag = self.n * self.a
+
+        states = np.zeros((theta.size, 6))
+        j = 1 if self.plane == "xy" else 2
+        states[:, 0], states[:, j] = self.a * c, self.a * s
+        states[:, 3], states[:, 3 + j] = -vmag * s, vmag * c
+        return states
+
 class KeplerianEphemeris:
     def __init__(self, mu, elements, epoch=0.0):
         self.mu = mu
@@ -54,3 +76,10 @@ class KeplerianEphemeris:
         v = np.sqrt(self.mu*self.a)/r_p * np.array([-np.sin(E), np.sqrt(1-self.e**2)*np.cos(E), 0])
 
         return np.hstack((r, v))
+
+def states_at_times(ephemeris, times):
+    """(N, 6) states of an ephemeris, vectorized when it provides states_at_times."""
+    if hasattr(ephemeris, "states_at_times"):
+        return ephemeris.states_at_times(times)
+    times = np.asarray(times, dtype=float).ravel()
+    return np.array([ephemeris(t) for t in times], dtype=float).reshape(len(times), -1)
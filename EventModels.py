@@ -0,0 +1,254 @@
+import copy
+from dataclasses import dataclass
+from typing import Callable, Optional
+import numpy as np
+
+
+# ======================================================
+# Event Record
+# ======================================================
+@dataclass
+class EventRecord:
+    name: str
+    time: float
+    state: np.ndarray
+    direction: int          # +1 rising, -1 falling
+
+
+# ======================================================
+# Event
+# ======================================================
+class Event:
+    """
+    Scalar event function g(t, state) watched during orbit propagation.
+
+    An event occurs where g changes sign inside an accepted step. The time
+    is located on the step's dense output with a bracketing root finder,
+    so it does not depend on sync_dt.
+
+    direction : 0 any crossing, +1 only g rising through zero, -1 only falling
+    terminal  : stop propagating the body at the event
+    restart   : cut the step at the event and continue from there, so an
+                action that changes the dynamics applies from the event on
+    record    : append an EventRecord to StateProperties.event_log
+    action    : optional callable(body, record)
+    command   : optional CommandModule.Command template; a copy with
+                issue_time set to the event time is submitted to
+                command_module (thread-safe), e.g. a maneuver at perigee.
+                The copy is withdrawn again if the body's history is cut
+                back before the event (StateProperties.truncate_after)
+    bodies    : the other bodies g reads, for the parallel scheduler's
+                dependency graph (None: unknown, assumed to read every body)
+    """
+
+    def __init__(self, name, function, direction=0, terminal=False, record=True,
+                 action: Optional[Callable] = None, command=None, command_module=None,
+                 restart=False, bodies=None):
+        self.name = name
+        self.function = function
+        self.direction = direction
+        self.terminal = terminal
+        self.restart = restart
+        self.record = record
+        self.action = action
+        self.command = command
+        self.command_module = command_module
+        self.bodies = bodies
+
+    def __call__(self, t, state):
+        return float(self.function(t, state))
+
+    def fire(self, body, record):
+        if self.record:
+            body.StateProperties.event_log.append(record)
+
+        if self.action is not None:
+            self.action(body, record)
+
+        if self.command is not None and self.command_module is not None:
+            command = copy.copy(self.command)
+            command.arguments = copy.deepcopy(self.command.arguments)
+            command.issue_time = record.time
+            if command.command_id is None:
+                # The same crossing found again replaces the queued copy
+                command.command_id = f"event:{body.name}:{self.name}:{record.time!r}"
+            body.StateProperties.event_commands.append((record.time, command.command_id, self.command_module))
+            self.command_module.submit_threadsafe(command)
+
+
+# ======================================================
+# Standard Events
+# ======================================================
+def AltitudeEvent(central_body, altitude, name=None, direction=-1, **kwargs):
+    """Crossing of a fixed altitude above central_body's radius (default: descending)."""
+    def g(t, state):
+        r_c = central_body.StateProperties.orbit_state_at_time(t)[0:3]
+        return np.linalg.norm(state[0:3] - r_c) - (central_body.PhysicalProperties.radius + altitude)
+    return Event(name or f"altitude {altitude:g} m", g, direction=direction, bodies=(central_body,), **kwargs)
+
+def ApsisEvent(central_body, kind="periapsis", name=None, **kwargs):
+    """Periapsis / apoapsis passage: zero of r . v relative to central_body."""
+    direction = {"periapsis": +1, "apoapsis": -1, "both": 0}[kind]
+
+    def g(t, state):
+        c = central_body.StateProperties.orbit_state_at_time(t)
+        return float(np.dot(state[0:3] - c[0:3], state[3:6] - c[3:6]))
+    return Event(name or kind, g, direction=direction, bodies=(central_body,), **kwargs)
+
+def SOIEvent(body, name=None, direction=+1, **kwargs):
+    """Crossing of body's sphere of influence (default: leaving it)."""
+    def g(t, state):
+        return soi_margin(body, t, state)
+    return Event(name or f"{body.name} SOI", g, direction=direction, bodies=(body,), **kwargs)
+
+def soi_margin(body, t, state):
+    """Distance outside body's sphere of influence (negative inside)."""
+    r_b = body.StateProperties.orbit_state_at_time(t)[0:3]
+    return np.linalg.norm(state[0:3] - r_b) - body.PhysicalProperties.SOI
+
+def EclipseEvent(occulting_body, sun, name=None, direction=-1, **kwargs):
+    """
+    Cylindrical shadow of occulting_body (default: entering eclipse).
+
+    sun is either a body (its position is used) or a fixed unit vector
+    pointing from the occulting body towards the Sun.
+    """
+    def g(t, state):
+        r_o = occulting_body.StateProperties.orbit_state_at_time(t)[0:3]
+        r = state[0:3] - r_o
+        if hasattr(sun, "StateProperties"):
+            s = sun.StateProperties.orbit_state_at_time(t)[0:3] - r_o
+        else:
+            s = np.asarray(sun, dtype=float)
+        s = s / np.linalg.norm(s)
+
+        along = np.dot(r, s)
+        perp = np.linalg.norm(r - along * s)
+        # Positive when lit; negative inside the shadow cylinder
+        if along >= 0.0:
+            return perp + occulting_body.PhysicalProperties.radius
+        return perp - occulting_body.PhysicalProperties.radius
+    bodies = (occulting_body, sun) if hasattr(sun, "StateProperties") else (occulting_body,)
+    return Event(name or f"{occulting_body.name} eclipse", g, direction=direction, bodies=bodies, **kwargs)
+
+
+# ======================================================
+# Detection
+# ======================================================
+def handle_events(body, events, dynamics, t0, x0, t1, x1):
+    """
+    Fire the events found in one accepted orbit step (the state may carry
+    an augmented STM after the orbit state).
+
+    Returns None, or (t_event, x_event, terminal) for the first terminal or
+    restart event. The step is cut there and the orbit (and STM) sample is
+    stored at the event; a terminal event also stops the body, while after
+    a restart event the caller continues from (t_event, x_event).
+    """
+    for event, record, state in detect_events(events, dynamics, t0, x0, t1, x1):
+        event.fire(body, record)
+
+        if event.terminal or event.restart:
+            SP = body.StateProperties
+            SP.set_orbitState(record.time, state[0:6])
+            if len(state) > 6 and SP.stm_enabled:
+                SP.set_stmState(record.time, state[6:42])
+
+            if event.terminal:
+                SP.halt_time = record.time
+                print(f"Event: {body.name} {record.name} at t = {record.time:.3f} s (stopped)")
+            return record.time, state, event.terminal
+
+    return None
+
+def detect_events(events, dynamics, t0, x0, t1, x1, time_tol=1e-6, max_iter=60):
+    """
+    Return [(event, record, state)] for the events that occur in the step
+    (t0, x0) -> (t1, x1), sorted by time. record.state is the orbit part
+    of the interpolated state.
+    """
+    if not events or t1 <= t0:
+        return []
+
+    dense = None
+    found = []
+    for event in events:
+        g0 = event(t0, x0)
+        g1 = event(t1, x1)
+
+        # A zero at t0 was already reported at the end of the previous step
+        if g0 == 0.0 or np.sign(g0) == np.sign(g1):
+            continue
+
+        direction = 1 if g1 > g0 else -1
+        if event.direction and direction != event.direction:
+            continue
+
+        if dense is None:
+            dense = HermiteDenseOutput(t0, x0, dynamics(x0, t0), t1, x1, dynamics(x1, t1))
+
+        t_event = find_root(lambda t: event(t, dense(t)), t0, t1, g0, g1, time_tol, max_iter)
+        state = dense(t_event)
+        found.append((event, EventRecord(event.name, t_event, state[0:6].copy(), direction), state))
+
+    found.sort(key=lambda item: item[1].time)
+    return found
+
+class HermiteDenseOutput:
+    """Cubic Hermite interpolant of a step from its end states and derivatives."""
+
+    def __init__(self, t0, x0, f0, t1, x1, f1):
+        self.t0 = t0
+        self.h = t1 - t0
+        self.x0, self.x1 = np.asarray(x0), np.asarray(x1)
+        self.f0, self.f1 = np.asarray(f0), np.asarray(f1)
+
+    def __call__(self, t):
+        s = (t - self.t0) / self.h
+        h00 = 2*s**3 - 3*s**2 + 1
+        h10 = s**3 - 2*s**2 + s
+        h01 = -2*s**3 + 3*s**2
+        h11 = s**3 - s**2
+        return h00*self.x0 + h10*self.h*self.f0 + h01*self.x1 + h11*self.h*self.f1
+
+def find_root(g, a, b, ga, gb, tol=1e-6, max_iter=60):
+    """
+    Illinois (modified regula falsi) root of g on a bracket [a, b].
+
+    Returns the bracket end on b's side of the root, so restarting from the
+    result does not see the same crossing again (g there is never zero).
+    """
+    side = 0
+    for _ in range(max_iter):
+        c = (a * gb - b * ga) / (gb - ga)
+        gc = g(c)
+
+        if gc == 0.0:
+            # Landed on the root: close in on it from b's side by bisection
+            a = c
+            for _ in range(max_iter):
+                if abs(b - a) < tol:
+                    break
+                m = 0.5 * (a + b)
+                gm = g(m)
+                if gm != 0.0 and np.sign(gm) == np.sign(gb):
+                    b = m
+                else:
+                    a = m
+            return b
+
+        if np.sign(gc) == np.sign(gb):
+            b, gb = c, gc
+            if side == -1:
+                ga *= 0.5
+            side = -1
+        else:
+            a, ga = c, gc
+            if side == +1:
+                gb *= 0.5
+            side = +1
+
+        if abs(b - a) < tol:
+            return b
+
+    return b
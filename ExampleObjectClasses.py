@@ -13,7 +13,7 @@ class Earth(ObjectModels.Planet):
         self.PhysicalProperties.J2     = 1.08262668e-3    # dimensionless
         self.PhysicalProperties.mass   = 5.9722e24        # kg
         self.PhysicalProperties.radius = 6378137.0        # m (equatorial radius, WGS-84)
-        self.SOI  = 9.24e8    # meters
+        self.PhysicalProperties.SOI = 9.24e8    # m
 
         ## Set the State Properties ##
         orbitState = np.array([0,0,0,0,0,0])
@@ -39,7 +39,7 @@ class Moon(ObjectModels.Planet):
         self.PhysicalProperties.J2     = 2.03263e-4
         self.PhysicalProperties.mass   = 7.342e22       # kg
         self.PhysicalProperties.radius = 1737.4e3       # m
-        self.SOI  = 6.61e7    # meters
+        self.PhysicalProperties.SOI = 6.61e7    # m
 
         ## State Properties (Earth-centered inertial frame) ##
         # Moon at average distance from Earth
@@ -5,6 +5,8 @@ class Fixed:
         return np.zeros(3)
     def force(self, r=None, v=None, time=None):
         return np.zeros(3)
+    def partials(self, r=None, v=None, time=None):
+        return np.zeros((3, 3)), np.zeros((3, 3))
     
     
 class PointMassGravity:
@@ -31,6 +33,19 @@ class PointMassGravity:
 
         return -self.body.PhysicalProperties.mu * r_rel / d**3
 
+    def partials(self, r, v=None, time=None):
+        """(da/dr, da/dv) for the variational equations."""
+        r_body = self.body.StateProperties.orbit_state_at_time(time)[0:3]
+        r_rel = r - r_body
+
+        d = np.linalg.norm(r_rel)
+        if d == 0.0:
+            return np.zeros((3, 3)), np.zeros((3, 3))
+
+        mu = self.body.PhysicalProperties.mu
+        dadr = -mu / d**3 * (np.eye(3) - 3.0 * np.outer(r_rel, r_rel) / d**2)
+        return dadr, np.zeros((3, 3))
+
 class NullTorque:
     def __init__(self):
         pass
@@ -0,0 +1,142 @@
+import numpy as np
+
+
+# ======================================================
+# Online Decimation
+# ======================================================
+class OnlineDecimator:
+    """
+    Drops history samples that linear interpolation already reproduces.
+
+    Each new sample is checked against the previous one: if the straight line
+    from the last kept sample (the anchor) to the new sample passes within
+    `tol` of the previous sample and of every sample already dropped since
+    the anchor, the previous sample is replaced instead of kept.
+
+    tol        : allowed interpolation error (norm over `components`)
+    components : slice of the state the tolerance applies to
+                 (position for orbits, quaternion for attitude)
+    """
+
+    def __init__(self, tol, components=slice(0, 3), max_pending=256):
+        self.tol = float(tol)
+        self.components = components
+        self.max_pending = max_pending
+        self._pending_t = []
+        self._pending_x = []
+
+    def reset(self):
+        self._pending_t = []
+        self._pending_x = []
+
+    def can_replace_last(self, times, states, t_new, x_new):
+        if len(times) < 2:
+            self.reset()
+            return False
+
+        t_a, x_a = times[-2], states[-2]
+        t_c, x_c = times[-1], states[-1]
+
+        cand_t = np.array(self._pending_t + [t_c])
+        cand_x = np.vstack(self._pending_x + [x_c])[:, self.components]
+
+        if len(cand_t) > self.max_pending:
+            self.reset()
+            return False
+
+        alpha = ((cand_t - t_a) / (t_new - t_a))[:, None]
+        x_line = (1 - alpha) * x_a[self.components] + alpha * x_new[self.components]
+        err = np.linalg.norm(x_line - cand_x, axis=1).max()
+
+        if err <= self.tol:
+            self._pending_t.append(t_c)
+            self._pending_x.append(x_c)
+            return True
+
+        self.reset()
+        return False
+
+
+# ======================================================
+# Compact Storage Tier
+# ======================================================
+class CompactHistory:
+    """
+    Reduced-precision archive for visualization-only histories.
+
+    mode "float32" : states and times are cast to float32
+    mode "delta"   : each block keeps one float64 anchor row and stores the
+                     remaining rows as float32 offsets from it, so large
+                     coordinates (e.g. lunar distances) keep sub-metre detail
+
+    Samples are appended in batches and decoded back to float64 on read.
+    """
+
+    def __init__(self, mode="delta", block_rows=4096):
+        if mode not in ("delta", "float32"):
+            raise ValueError(f"unknown compact storage mode: {mode}")
+        self.mode = mode
+        self.block_rows = int(block_rows)
+        self._blocks = []
+        self._rows = 0
+        self._decoded = None
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def nbytes(self):
+        total = 0
+        for t0, dt, x0, dx in self._blocks:
+            total += dt.nbytes + dx.nbytes + (0 if x0 is None else x0.nbytes) + 8
+        return total
+
+    def append(self, times, states):
+        times = np.asarray(times, dtype=float)
+        states = np.asarray(states, dtype=float)
+
+        for i in range(0, len(times), self.block_rows):
+            t_blk = times[i:i + self.block_rows]
+            x_blk = states[i:i + self.block_rows]
+
+            if self.mode == "delta":
+                t0, x0 = t_blk[0], x_blk[0].copy()
+                block = (t0, (t_blk - t0).astype(np.float32), x0, (x_blk - x0).astype(np.float32))
+            else:
+                block = (0.0, t_blk.astype(np.float32), None, x_blk.astype(np.float32))
+
+            self._blocks.append(block)
+            self._rows += len(t_blk)
+
+        self._decoded = None
+
+    def truncate(self, n):
+        """Keep only the first n rows."""
+        if n >= self._rows:
+            return
+        kept, rows = [], 0
+        for t0, dt, x0, dx in self._blocks:
+            if rows >= n:
+                break
+            k = min(len(dt), n - rows)
+            kept.append((t0, dt[:k], x0, dx[:k]))
+            rows += k
+        self._blocks = kept
+        self._rows = rows
+        self._decoded = None
+
+    def clear(self):
+        self.truncate(0)
+
+    def decode(self):
+        """Return (times, states) as float64 arrays."""
+        if self._decoded is None:
+            if not self._blocks:
+                return np.empty(0), None
+            times = np.concatenate([t0 + dt.astype(float) for t0, dt, x0, dx in self._blocks])
+            states = np.vstack([
+                dx.astype(float) + (0.0 if x0 is None else x0)
+                for t0, dt, x0, dx in self._blocks
+            ])
+            self._decoded = (times, states)
+        return self._decoded
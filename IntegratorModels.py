@@ -32,6 +32,16 @@ class AdaptiveRK45Integrator():
     b4 = np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])  # 4th order
 
     def step(self, deriv_func, state, t, dt, absTol=1e-12, relTol=1e-12):
+        x5, err_vec = self.step_error(deriv_func, state, t, dt)
+
+        # Error estimate
+        err = np.linalg.norm(err_vec)
+        tol = absTol + relTol * np.linalg.norm(x5)
+
+        return x5, err, tol
+
+    def step_error(self, deriv_func, state, t, dt):
+        """Return the 5th-order state and the per-component error estimate x5 - x4."""
         k = []
         # Compute k1..k7
         k1 = deriv_func(state, t)
@@ -54,11 +64,7 @@ class AdaptiveRK45Integrator():
         # 4th-order embedded solution
         x4 = state + dt * sum(bi*ki for bi, ki in zip(self.b4, k))
 
-        # Error estimate
-        err = np.linalg.norm(x5 - x4)
-        tol = absTol + relTol * np.linalg.norm(x5)
-
-        return x5, err, tol
+        return x5, x5 - x4
 
 class EphemerisIntegrator():
     def __init__(self, ephemeris_func):
@@ -86,6 +92,64 @@ class OrbitDynamics:
         dxdt[3:6] = a
 
         return dxdt
+
+    def jacobian(self, state, time):
+        """
+        A = d(dxdt)/dx (6x6). Forces supply (da/dr, da/dv) through
+        partials(r, v, time); ones without it fall back to central differences.
+        """
+        r = state[0:3]
+        v = state[3:6]
+
+        dadr = np.zeros((3, 3))
+        dadv = np.zeros((3, 3))
+        for force in self.forces:
+            if hasattr(force, "partials"):
+                Ar, Av = force.partials(r, v, time)
+            else:
+                Ar, Av = numerical_partials(force, r, v, time)
+            dadr += Ar
+            dadv += Av
+
+        A = np.zeros((6, 6))
+        A[0:3, 3:6] = np.eye(3)
+        A[3:6, 0:3] = dadr
+        A[3:6, 3:6] = dadv
+        return A
+
+class VariationalDynamics:
+    """
+    Orbit dynamics augmented with the state transition matrix.
+
+    state = [x y z vx vy vz, Phi (6x6, row-major)]  (42 elements)
+    dPhi/dt = A(t) Phi, with A from OrbitDynamics.jacobian
+    """
+    def __init__(self, dynamics):
+        self.dynamics = dynamics
+
+    def __call__(self, state, time):
+        x = state[0:6]
+        Phi = state[6:42].reshape(6, 6)
+
+        dydt = np.empty(42)
+        dydt[0:6] = self.dynamics(x, time)
+        dydt[6:42] = (self.dynamics.jacobian(x, time) @ Phi).ravel()
+        return dydt
+
+def numerical_partials(force, r, v, time, rel_step=1e-7):
+    """Central-difference (da/dr, da/dv) for force models without partials()."""
+    dadr = np.zeros((3, 3))
+    dadv = np.zeros((3, 3))
+
+    hr = rel_step * max(np.linalg.norm(r), 1.0)
+    hv = rel_step * max(np.linalg.norm(v), 1.0)
+    for i in range(3):
+        e = np.zeros(3)
+        e[i] = hr
+        dadr[:, i] = (force.accel(r + e, v, time) - force.accel(r - e, v, time)) / (2 * hr)
+        e[i] = hv
+        dadv[:, i] = (force.accel(r, v + e, time) - force.accel(r, v - e, time)) / (2 * hv)
+    return dadr, dadv
     
 class AttitudeDynamics:
     def __init__(self, torques, body):
@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+import numpy as np
+import CommandModule
+
+
+# ======================================================
+# Lambert Solver (universal variables, zero revolution)
+# ======================================================
+def lambert(r1, r2, tof, mu, prograde=True, max_iter=100, rtol=1e-10):
+    """
+    Vectorized Lambert solver.
+
+    r1, r2 : (..., 3) position pairs (broadcastable)
+    tof    : (...) transfer times [s]
+    mu     : gravitational parameter of the central body
+
+    Returns (v1, v2, converged). Every problem is solved at once by a
+    vectorized bisection on the universal variable z, using that the
+    zero-revolution time of flight increases monotonically with z.
+    Unsolved entries (tof <= 0, 180 deg transfers) are NaN.
+    """
+    r1 = np.asarray(r1, dtype=float)
+    r2 = np.asarray(r2, dtype=float)
+    tof = np.asarray(tof, dtype=float)
+    r1, r2 = np.broadcast_arrays(r1, r2)
+    shape = np.broadcast_shapes(r1.shape[:-1], tof.shape)
+    r1 = np.broadcast_to(r1, shape + (3,))
+    r2 = np.broadcast_to(r2, shape + (3,))
+    tof = np.broadcast_to(tof, shape)
+
+    r1n = np.linalg.norm(r1, axis=-1)
+    r2n = np.linalg.norm(r2, axis=-1)
+
+    cos_dnu = np.clip(np.sum(r1 * r2, axis=-1) / (r1n * r2n), -1.0, 1.0)
+    cross_z = np.cross(r1, r2)[..., 2]
+    dnu = np.arccos(cos_dnu)
+    long_way = (cross_z < 0.0) if prograde else (cross_z >= 0.0)
+    dnu = np.where(long_way, 2 * np.pi - dnu, dnu)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        A = np.sin(dnu) * np.sqrt(r1n * r2n / (1.0 - cos_dnu))
+
+    sqrt_mu = np.sqrt(mu)
+
+    def y_of(z):
+        C, S = stumpff(z)
+        return r1n + r2n + A * (z * S - 1.0) / np.sqrt(C), C, S
+
+    def tof_of(z):
+        y, C, S = y_of(z)
+        with np.errstate(invalid="ignore"):
+            t = ((y / C) ** 1.5 * S + A * np.sqrt(y)) / sqrt_mu
+        # y < 0 lies below the physical branch: treat as "too short"
+        return np.where(y < 0.0, -np.inf, t)
+
+    z_lo = np.full(shape, -4.0 * np.pi**2 * 25.0)
+    z_hi = np.full(shape, 4.0 * np.pi**2 * (1.0 - 1e-12))
+
+    for _ in range(max_iter):
+        z = 0.5 * (z_lo + z_hi)
+        short = tof_of(z) < tof
+        z_lo = np.where(short, z, z_lo)
+        z_hi = np.where(short, z_hi, z)
+        if np.all(z_hi - z_lo < 1e-12 * np.maximum(1.0, np.abs(z))):
+            break
+
+    z = 0.5 * (z_lo + z_hi)
+    y, C, S = y_of(z)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = 1.0 - y / r1n
+        g = A * np.sqrt(y / mu)
+        gdot = 1.0 - y / r2n
+
+        v1 = (r2 - f[..., None] * r1) / g[..., None]
+        v2 = (gdot[..., None] * r2 - r1) / g[..., None]
+
+        converged = (
+            (tof > 0.0)
+            & np.isfinite(A) & (np.abs(A) > 0.0)
+            & (y >= 0.0)
+            & (np.abs(tof_of(z) - tof) <= rtol * tof + 1e-6)
+        )
+
+    v1 = np.where(converged[..., None], v1, np.nan)
+    v2 = np.where(converged[..., None], v2, np.nan)
+    return v1, v2, converged
+
+def stumpff(z):
+    """Stumpff functions C(z), S(z), vectorized, with series near z = 0."""
+    z = np.asarray(z, dtype=float)
+    C = np.empty_like(z)
+    S = np.empty_like(z)
+
+    pos = z > 1e-6
+    neg = z < -1e-6
+    small = ~(pos | neg)
+
+    sz = np.sqrt(z[pos])
+    C[pos] = (1.0 - np.cos(sz)) / z[pos]
+    S[pos] = (sz - np.sin(sz)) / sz**3
+
+    sz = np.sqrt(-z[neg])
+    C[neg] = (np.cosh(sz) - 1.0) / -z[neg]
+    S[neg] = (np.sinh(sz) - sz) / sz**3
+
+    zs = z[small]
+    C[small] = 1/2 - zs/24 + zs**2/720
+    S[small] = 1/6 - zs/120 + zs**2/5040
+    return C, S
+
+
+# ======================================================
+# Porkchop Grid
+# ======================================================
+@dataclass
+class PorkchopGrid:
+    departure_times: np.ndarray     # (N,)
+    arrival_times: np.ndarray       # (M,)
+    dv_departure: np.ndarray        # (N, M, 3) burn at departure
+    dv_arrival: np.ndarray          # (N, M, 3) burn to match the arrival body
+    valid: np.ndarray               # (N, M)
+
+    @property
+    def dv_total(self):
+        """(N, M) total |dv|; NaN where no transfer exists."""
+        return np.linalg.norm(self.dv_departure, axis=-1) + np.linalg.norm(self.dv_arrival, axis=-1)
+
+    def best(self, rendezvous=True):
+        """(i, j) of the cheapest transfer (departure burn only if not rendezvous)."""
+        cost = self.dv_total if rendezvous else np.linalg.norm(self.dv_departure, axis=-1)
+        cost = np.where(self.valid, cost, np.inf)
+        return np.unravel_index(np.argmin(cost), cost.shape)
+
+    def to_commands(self, target_name, i, j, rendezvous=True):
+        """perform_maneuver Commands for grid cell (i, j)."""
+        return transfer_commands(
+            target_name,
+            self.departure_times[i], self.dv_departure[i, j],
+            self.arrival_times[j] if rendezvous else None,
+            self.dv_arrival[i, j] if rendezvous else None,
+        )
+
+def porkchop(departure, arrival, departure_times, arrival_times, mu, central=None, prograde=True):
+    """
+    Lambert transfers for every (departure time, arrival time) pair.
+
+    departure / arrival : a body (propagated or stored history), an
+                          ephemeris callable t -> state, or a precomputed
+                          (N, 6) / (M, 6) state array
+    central             : optional body (or callable / array) the states are
+                          taken relative to, e.g. Earth
+    """
+    departure_times = np.asarray(departure_times, dtype=float)
+    arrival_times = np.asarray(arrival_times, dtype=float)
+
+    x_dep = states_at_times(departure, departure_times)
+    x_arr = states_at_times(arrival, arrival_times)
+    if central is not None:
+        x_dep = x_dep - states_at_times(central, departure_times)
+        x_arr = x_arr - states_at_times(central, arrival_times)
+
+    tof = arrival_times[None, :] - departure_times[:, None]
+    v1, v2, valid = lambert(x_dep[:, None, 0:3], x_arr[None, :, 0:3], tof, mu, prograde)
+
+    return PorkchopGrid(
+        departure_times=departure_times,
+        arrival_times=arrival_times,
+        dv_departure=v1 - x_dep[:, None, 3:6],
+        dv_arrival=x_arr[None, :, 3:6] - v2,
+        valid=valid,
+    )
+
+def states_at_times(source, times):
+    """(N, 6) orbit states of a body, ephemeris callable or state array."""
+    if hasattr(source, "StateProperties"):
+        return source.StateProperties.orbit_states_at_times(times)
+    if callable(source):
+        return np.array([source(t) for t in times], dtype=float)
+    states = np.asarray(source, dtype=float)
+    if states.shape != (len(times), 6):
+        raise ValueError(f"expected ({len(times)}, 6) states, got {states.shape}")
+    return states
+
+
+# ======================================================
+# Commands
+# ======================================================
+def transfer_commands(target_name, t_departure, dv_departure, t_arrival=None, dv_arrival=None):
+    """perform_maneuver Commands for a transfer (arrival burn optional)."""
+    commands = [
+        CommandModule.Command(
+            target_name=target_name,
+            command_name="perform_maneuver",
+            arguments={"dv": [float(x) for x in dv_departure]},
+            issue_time=float(t_departure),
+        )
+    ]
+    if t_arrival is not None and dv_arrival is not None:
+        commands.append(
+            CommandModule.Command(
+                target_name=target_name,
+                command_name="perform_maneuver",
+                arguments={"dv": [float(x) for x in dv_arrival]},
+                issue_time=float(t_arrival),
+            )
+        )
+    return commands
@@ -31,8 +31,7 @@ integrator_RK45Adaptive = IntegratorModels.AdaptiveRK45Integrator()
 #=========================
 ## Earth Properties
 #=========================
-Earth.IntegratorProperties.orbit.dynamics = IntegratorModels.OrbitDynamics([ForceModels.Fixed])
-Earth.IntegratorProperties.orbit.integrator = integrator_RK45Adaptive
+Earth.make_static()
 Earth.IntegratorProperties.attitude.integrator = integrator_RK45Adaptive
 Earth.IntegratorProperties.attitude.dynamics = IntegratorModels.AttitudeDynamics(torques = [ForceModels.NullTorque()], body = Earth )
 
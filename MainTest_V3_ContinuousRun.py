@@ -28,8 +28,7 @@ integrator = IntegratorModels.AdaptiveRK45Integrator()
 # Object Properties
 # ======================================
 # Earth
-Earth.IntegratorProperties.orbit.dynamics = IntegratorModels.OrbitDynamics([ForceModels.Fixed])
-Earth.IntegratorProperties.orbit.integrator = integrator
+Earth.make_static()
 
 # LEO Sat
 LEOSatellite.IntegratorProperties.orbit.dynamics = IntegratorModels.OrbitDynamics([ForceModels.PointMassGravity(Earth)])
@@ -1,6 +1,11 @@
+import bisect
+import math
+import threading
 from typing import Optional
 import numpy as np
 import CommandSet
+import EphemerisModels
+import HistoryStorage
 
 ## Simulation Object ##
 class SimulationObject:
@@ -27,6 +32,28 @@ class CelestialBody(GeneralObject):
         self.IntegratorProperties = BodyIntegratorProperties()
         self.CommandProperties = CommandProperties(command_set = CommandSet.PlanetCommandSet)
 
+    def make_static(self, state=None):
+        """
+        Hold the orbit at a fixed state (default: the current one).
+
+        The orbit is no longer integrated: it leaves the propagation heaps
+        and stores no history. Attitude propagation is unaffected.
+        """
+        if state is None:
+            state = self.StateProperties.orbit_stateCurrent
+        self.follow_ephemeris(EphemerisModels.StaticEphemeris(state))
+
+    def follow_ephemeris(self, ephemeris):
+        """
+        Drive the orbit from an ephemeris (callable t -> [x y z vx vy vz]).
+
+        orbit_state_at_time queries the ephemeris directly, so no samples
+        are stored or interpolated, and the orbit is not integrated.
+        """
+        self.StateProperties.set_orbit_source(ephemeris)
+        self.IntegratorProperties.orbit.integrator = None
+        self.IntegratorProperties.orbit.dynamics = None
+
 class SpaceVehicle(CelestialBody):
     def __init__(self, name : str):
         super().__init__(name)
@@ -77,16 +104,130 @@ class StateProperties:
         self._attitude_states = []   
         self._attitude_stateCurrent = None
 
+        # State transition matrix Phi(t, t0), flattened row-major (see enable_stm)
+        self._stm_times = []
+        self._stm_states = []
+        self._stm_stateCurrent = None
+        self._stm_decimator = None
+        self._stm_archive = None
+
+        # Analytic orbit (see CelestialBody.follow_ephemeris): when set, orbit
+        # queries go to the source and no orbit history is kept
+        self.orbit_source = None
+
+        # Optional predictor for queries past the latest orbit sample (see
+        # CouplingModels.enable_extrapolation); None clamps to the last sample
+        self.extrapolator = None
+
         # Collision Status
         self.collided = False
 
+        # Event detection (see EventModels): fired events, and the time a
+        # terminal event stopped the orbit
+        self.event_log = []
+        self.halt_time = None
+        # (time, command_id, command_module) of commands queued by events
+        self.event_commands = []
+        # Objects holding state derived from the orbit, told by truncate_after
+        # to undo it (e.g. PatchedConicDynamics central-body switches)
+        self.truncate_listeners = []
+
+        # Optional storage reduction (see enable_decimation / enable_compact_storage)
+        self._orbit_decimator = None
+        self._attitude_decimator = None
+        self._orbit_archive = None
+        self._attitude_archive = None
+        self.archive_keep = None
+
+        # Bumped whenever stored samples change (used by cached frame transforms)
+        self.history_version = 0
+
+        # Earliest changed sample time per history since mark_history (None: not recording)
+        self._changed_from = None
+
+## STORAGE
+    def enable_decimation(self, orbit_tol=None, attitude_tol=None):
+        """
+        Drop samples that interpolation from their neighbours reproduces.
+
+        orbit_tol    : allowed position error [m]
+        attitude_tol : allowed quaternion component error
+        """
+        self._orbit_decimator = None if orbit_tol is None else HistoryStorage.OnlineDecimator(orbit_tol, slice(0, 3))
+        self._attitude_decimator = None if attitude_tol is None else HistoryStorage.OnlineDecimator(attitude_tol, slice(0, 4))
+
+    def enable_compact_storage(self, mode="delta", keep=1024, block_rows=4096):
+        """
+        Move all but the latest `keep` samples into a float32 / delta-encoded
+        archive. Meant for bodies whose history is only used for plotting;
+        reads return float64 but with reduced precision.
+        """
+        self.archive_keep = int(keep)
+        self._orbit_archive = HistoryStorage.CompactHistory(mode, block_rows)
+        self._attitude_archive = HistoryStorage.CompactHistory(mode, block_rows)
+
+    def _archive(self, history):
+        archive = getattr(self, f"_{history}_archive")
+        if archive is None:
+            return
+        dropped = self.trim_history(history, keep=self.archive_keep, slack=self.archive_keep)
+        if dropped is not None:
+            archive.append(*dropped)
+
+    def _history_arrays(self, history):
+        times = np.asarray(getattr(self, f"_{history}_times"))
+        states = getattr(self, f"_{history}_states")
+        states = np.vstack(states) if states else None
+        archive = getattr(self, f"_{history}_archive")
+        if archive is not None and len(archive):
+            a_times, a_states = archive.decode()
+            times = np.concatenate((a_times, times))
+            states = a_states if states is None else np.vstack((a_states, states))
+        return times, states
+
+    def _append(self, history, time, state):
+        times = getattr(self, f"_{history}_times")
+        states = getattr(self, f"_{history}_states")
+        decimator = getattr(self, f"_{history}_decimator")
+
+        self.history_version += 1
+        if decimator is not None and decimator.can_replace_last(times, states, time, state):
+            self._touch(history, times[-1])
+            times[-1] = float(time)
+            states[-1] = state.copy()
+        else:
+            self._touch(history, time)
+            times.append(float(time))
+            states.append(state.copy())
+
+        self._archive(history)
+
+## ORBIT SOURCE
+    def set_orbit_source(self, source):
+        """
+        Answer orbit queries from `source` (callable t -> state) from now on.
+
+        The stored orbit history is reduced to the source's state at the first
+        stored time, kept so plots and the current state have a sample.
+        """
+        t0 = self._orbit_times[0] if self._orbit_times else 0.0
+        state = np.asarray(source(t0), dtype=float)
+
+        self.orbit_source = source
+        self.restore_history("orbit", [t0], [state], state)
+
 ## ORBIT STATE
     @property
     def orbit_latest_time(self):
+        # A source is known at every time
+        if self.orbit_source is not None:
+            return math.inf
         return self._orbit_times[-1]
     
     @property
     def orbit_times(self):
+        if self._orbit_archive is not None:
+            return self._history_arrays("orbit")[0]
         return np.asarray(self._orbit_times)
 
 
@@ -96,39 +237,32 @@ class StateProperties:
 
     @property
     def orbit_stateHistory(self):
+        if self._orbit_archive is not None:
+            return self._history_arrays("orbit")[1]
         return np.vstack(self._orbit_states)
     
     def set_orbitState(self, time, orbitState):
         
         orbitState = np.asarray(orbitState, dtype=float)
 
-        # enforce monotonic time
+        # enforce monotonic time; source-driven orbits store nothing
+        if self.orbit_source is not None:
+            return
         if self._orbit_times and time <= self._orbit_times[-1]:
             return
 
-        self._orbit_times.append(float(time))
-        self._orbit_states.append(orbitState.copy())
+        self._append("orbit", time, orbitState)
         self._orbit_stateCurrent = orbitState
 
     def orbit_state_at_time(self, t):
-        if not self._orbit_times:
-            return None
-
-        times = self.orbit_times
-        orbitStates = self.orbit_stateHistory
-
-        if t <= times[0]:
-            return orbitStates[0]
-
-        if t >= times[-1]:
-            return orbitStates[-1]
-
-        i = np.searchsorted(times, t) - 1
-        t0, t1 = times[i], times[i + 1]
-        s0, s1 = orbitStates[i], orbitStates[i + 1]
-
-        alpha = (t - t0) / (t1 - t0)
-        return (1 - alpha) * s0 + alpha * s1
+        if self.orbit_source is not None:
+            return np.array(self.orbit_source(t), dtype=float)
+        limits = getattr(_read_limits, "limits", None)
+        if limits is not None and self in limits:
+            t = min(t, limits[self][0])
+        if self.extrapolator is not None and self._orbit_times and t > self._orbit_times[-1]:
+            return self.extrapolator.predict(t)
+        return self._state_at_time("orbit", t)
 
 ## ATTITUDE STATE
     @property
@@ -139,6 +273,8 @@ class StateProperties:
     
     @property
     def attitude_times(self):
+        if self._attitude_archive is not None:
+            return self._history_arrays("attitude")[0]
         return np.asarray(self._attitude_times)
 
     @property
@@ -147,36 +283,374 @@ class StateProperties:
 
     @property
     def attitude_stateHistory(self):
+        if self._attitude_archive is not None:
+            return self._history_arrays("attitude")[1]
         return np.vstack(self._attitude_states)
     
     def set_attitudeState(self, time, attitudeState):
         attitudeState = np.asarray(attitudeState, dtype=float)
         if self._attitude_times and time <= self._attitude_times[-1]:
             return
-        self._attitude_times.append(float(time))
-        self._attitude_states.append(attitudeState.copy())
+        self._append("attitude", time, attitudeState)
         self._attitude_stateCurrent = attitudeState
 
     def attitude_state_at_time(self, t):
-
-        if not self._attitude_times:
+        limits = getattr(_read_limits, "limits", None)
+        if limits is not None and self in limits:
+            t = min(t, limits[self][1])
+        return self._state_at_time("attitude", t)
+
+    def orbit_states_at_times(self, times):
+        """Vectorized orbit_state_at_time: (N,) times -> (N, 6) states."""
+        if self.orbit_source is not None:
+            return EphemerisModels.states_at_times(self.orbit_source, times)
+        return self._states_at_times("orbit", times)
+
+    def attitude_states_at_times(self, times):
+        """Vectorized attitude_state_at_time: (N,) times -> (N, 7) states."""
+        return self._states_at_times("attitude", times)
+
+    def _states_at_times(self, history, times):
+        if not getattr(self, f"_{history}_times"):
+            return None
+        limits = getattr(_read_limits, "limits", None)
+        if limits is not None and self in limits:
+            times = np.minimum(times, limits[self][0 if history == "orbit" else 1])
+        hist_times, hist_states = self._history_arrays(history)
+        return interpolate_states(hist_times, hist_states, times)
+
+    def _state_at_time(self, history, t):
+        times = getattr(self, f"_{history}_times")
+        if not times:
             return None
-        times = self._attitude_times
-        attitudeStates = self.attitude_stateHistory
 
+        states = getattr(self, f"_{history}_states")
+        archive = getattr(self, f"_{history}_archive")
+        if archive is not None and len(archive) and t < times[0]:
+            times, states = self._history_arrays(history)
+
+        # Bisect the sample lists directly; no full-history copy per query
         if t <= times[0]:
-            return attitudeStates[0]
+            return np.array(states[0])
 
         if t >= times[-1]:
-            return attitudeStates[-1]
+            return np.array(states[-1])
 
-        i = np.searchsorted(times, t) - 1
+        i = bisect.bisect_left(times, t) - 1
         t0, t1 = times[i], times[i + 1]
-        s0, s1 = attitudeStates[i], attitudeStates[i + 1]
+        s0, s1 = states[i], states[i + 1]
 
         alpha = (t - t0) / (t1 - t0)
         return (1 - alpha) * s0 + alpha * s1
 
+## STATE TRANSITION MATRIX
+    def enable_stm(self, Phi0=None):
+        """
+        Propagate the 6x6 state transition matrix with the orbit (batch
+        Propagate). Phi starts from Phi0 (identity) at the next propagated time.
+        """
+        Phi0 = np.eye(6) if Phi0 is None else np.asarray(Phi0, dtype=float)
+        self._touch("stm", -math.inf)
+        self._stm_times = []
+        self._stm_states = []
+        self._stm_stateCurrent = Phi0.ravel().copy()
+
+    @property
+    def stm_enabled(self):
+        return self._stm_stateCurrent is not None
+
+    @property
+    def stm_latest_time(self):
+        if not self._stm_times:
+            return None
+        return self._stm_times[-1]
+
+    @property
+    def stm_times(self):
+        return np.asarray(self._stm_times)
+
+    @property
+    def stm_stateCurrent(self):
+        return None if self._stm_stateCurrent is None else self._stm_stateCurrent.reshape(6, 6)
+
+    @property
+    def stm_history(self):
+        """(N, 6, 6) STM samples at stm_times."""
+        return np.vstack(self._stm_states).reshape(-1, 6, 6)
+
+    def set_stmState(self, time, Phi):
+        Phi = np.asarray(Phi, dtype=float).ravel()
+        if self._stm_times and time <= self._stm_times[-1]:
+            return
+        self._append("stm", time, Phi)
+        self._stm_stateCurrent = Phi
+
+    def stm_at_time(self, t):
+        state = self._state_at_time("stm", t)
+        return None if state is None else state.reshape(6, 6)
+
+    def covariance_at_time(self, t, P0):
+        """Linear covariance P(t) = Phi P0 Phi^T."""
+        Phi = self.stm_at_time(t)
+        return None if Phi is None else map_covariance(Phi, P0)
+
+    def covariance_history(self, P0):
+        """(N, 6, 6) covariance at every stm_times sample."""
+        return map_covariance(self.stm_history, P0)
+
+## HISTORY EDITING
+    def truncate_after(self, t):
+        """
+        Discard orbit and attitude samples later than t (e.g. a stale lookahead).
+
+        Events (and whatever truncate_listeners derived from them) are undone
+        back to the latest orbit sample that remains, since propagation
+        restarts there and finds any later crossing again.
+        """
+        for history in ("orbit", "attitude", "stm"):
+            # keep at least the first sample
+            if self._cut_history(history, bisect.bisect_right, t, keep_first=True):
+                states = getattr(self, f"_{history}_states")
+                setattr(self, f"_{history}_stateCurrent", np.array(states[-1]))
+
+        t_events = t
+        if self.orbit_source is None and self._orbit_times:
+            t_events = min(t, self._orbit_times[-1])
+
+        self.event_log = [record for record in self.event_log if record.time <= t_events]
+        if self.halt_time is not None and self.halt_time > t_events:
+            self.halt_time = None
+
+        # Withdraw the commands those events queued
+        kept = []
+        for time, command_id, command_module in self.event_commands:
+            if time > t_events:
+                command_module.cancel(command_id)
+            else:
+                kept.append((time, command_id, command_module))
+        self.event_commands = kept
+
+        for listener in self.truncate_listeners:
+            listener.truncate_after(t_events)
+
+    def override_orbitState(self, time, orbitState):
+        """Replace the orbit state at `time`, dropping any samples at or after it."""
+        orbitState = np.asarray(orbitState, dtype=float)
+        self.history_version += 1
+        self._cut_history("orbit", bisect.bisect_left, time, keep_first=False)
+        self._touch("orbit", time)
+        self._orbit_times.append(float(time))
+        self._orbit_states.append(orbitState.copy())
+        self._orbit_stateCurrent = orbitState
+
+        for listener in self.truncate_listeners:
+            listener.truncate_after(time)
+
+    def _cut_history(self, history, position, t, keep_first):
+        """
+        Drop the samples from position(times, t) on, archived ones included.
+
+        The in-memory lists always end up holding the latest remaining
+        sample (moved back out of the archive if needed). Returns True if
+        anything was dropped.
+        """
+        times = getattr(self, f"_{history}_times")
+        states = getattr(self, f"_{history}_states")
+        archive = getattr(self, f"_{history}_archive", None)
+
+        i = position(times, t)
+        if i == len(times):
+            return False
+
+        if i == 0 and archive is not None and len(archive):
+            a_times, a_states = archive.decode()
+            j = position(a_times, t)
+            if keep_first:
+                j = max(j, 1)
+            self._touch(history, a_times[j] if j < len(a_times) else times[0])
+            del times[:]
+            del states[:]
+            if j > 0:
+                times.append(float(a_times[j - 1]))
+                states.append(a_states[j - 1].copy())
+            archive.truncate(j - 1 if j > 0 else 0)
+        else:
+            if keep_first:
+                i = max(i, 1)
+            if i < len(times):
+                self._touch(history, times[i])
+            del times[i:]
+            del states[i:]
+
+        self.history_version += 1
+        decimator = getattr(self, f"_{history}_decimator")
+        if decimator is not None:
+            decimator.reset()
+        return True
+
+## HISTORY EXPORT / RESTORE
+    def export_history(self, history, t_from=None, archived=True):
+        """
+        Return (times, states, current) for "orbit", "attitude" or "stm".
+
+        With t_from, only the samples needed to interpolate at t >= t_from are
+        returned (the last sample at or before t_from and everything after).
+        Archived samples (see enable_compact_storage) are included unless
+        archived=False.
+        """
+        times = getattr(self, f"_{history}_times")
+        states = getattr(self, f"_{history}_states")
+        current = getattr(self, f"_{history}_stateCurrent")
+
+        archive = getattr(self, f"_{history}_archive", None)
+        if archived and archive is not None and len(archive) and (t_from is None or not times or times[0] > t_from):
+            times, states = self._history_arrays(history)
+
+        start = 0
+        if t_from is not None and len(times):
+            start = max(0, int(np.searchsorted(times, t_from, side="right")) - 1)
+
+        times = np.asarray(times[start:], dtype=float)
+        states = np.vstack(states[start:]) if len(times) else None
+        current = None if current is None else np.array(current, dtype=float)
+        return times, states, current
+
+    def trim_history(self, history, keep, slack=0):
+        """
+        Drop all but the latest `keep` in-memory samples once more than
+        keep + slack are held (the archive is left alone; see take_archive).
+
+        Returns the dropped (times, states), or None if nothing was trimmed.
+        """
+        times = getattr(self, f"_{history}_times")
+        if len(times) <= keep + slack:
+            return None
+
+        states = getattr(self, f"_{history}_states")
+        self.history_version += 1
+        n_drop = len(times) - keep
+        dropped = (np.asarray(times[:n_drop], dtype=float), np.vstack(states[:n_drop]))
+        del times[:n_drop]
+        del states[:n_drop]
+        return dropped
+
+    def take_archive(self, history):
+        """Remove and return the archived (times, states), or None if empty."""
+        archive = getattr(self, f"_{history}_archive", None)
+        if archive is None or not len(archive):
+            return None
+        times, states = archive.decode()
+        self.history_version += 1
+        archive.clear()
+        return times, states
+
+    def restore_history(self, history, times, states, current):
+        """Replace a history (archive included) with previously exported samples."""
+        self.history_version += 1
+        self._touch(history, -math.inf)
+        decimator = getattr(self, f"_{history}_decimator")
+        if decimator is not None:
+            decimator.reset()
+        archive = getattr(self, f"_{history}_archive", None)
+        if archive is not None:
+            archive.clear()
+        setattr(self, f"_{history}_times", [float(t) for t in times])
+        setattr(self, f"_{history}_states", [] if states is None else [row.copy() for row in states])
+        setattr(self, f"_{history}_stateCurrent", None if current is None else np.array(current, dtype=float))
+
+## CHANGE TRACKING
+    def mark_history(self):
+        """Start recording where the histories change (see history_changes)."""
+        self._changed_from = {}
+
+    def _touch(self, history, t):
+        if self._changed_from is not None:
+            t_old = self._changed_from.get(history)
+            self._changed_from[history] = t if t_old is None else min(t_old, t)
+
+    def history_changes(self, history):
+        """
+        (t_from, times, states) since mark_history: samples at or after
+        t_from may have changed, and these are the ones held there now.
+        None if the history is unchanged. Archived samples are not covered.
+        """
+        t_from = (self._changed_from or {}).get(history)
+        if t_from is None:
+            return None
+        times = getattr(self, f"_{history}_times")
+        states = getattr(self, f"_{history}_states")
+        i = bisect.bisect_left(times, t_from)
+        return t_from, times[i:], states[i:]
+
+    def apply_history_changes(self, history, t_from, times, states):
+        """Replay history_changes taken from another copy of this body."""
+        self._cut_history(history, bisect.bisect_left, t_from, keep_first=False)
+        getattr(self, f"_{history}_times").extend(times)
+        getattr(self, f"_{history}_states").extend(states)
+        self.history_version += 1
+        self._touch(history, t_from)
+
+def adopt_ephemeris(body):
+    """
+    Switch a body integrated with an EphemerisIntegrator to follow_ephemeris,
+    so the ephemeris is queried directly instead of sampled and re-interpolated.
+    """
+    ephemeris = getattr(body.IntegratorProperties.orbit.integrator, "ephemeris_func", None)
+    if ephemeris is not None and hasattr(body, "follow_ephemeris"):
+        body.follow_ephemeris(ephemeris)
+
+# ======================================================
+# Read Limits
+# ======================================================
+_read_limits = threading.local()
+
+class read_limits:
+    """
+    Context manager capping the times other bodies are read at on this thread.
+
+        with ObjectModels.read_limits({SP: (t_orbit, t_attitude)}):
+            advance_body(body, t_target)
+
+    A read past a limit returns the state at the limit: what the body
+    showed when it had only been propagated that far. Lets a consumer run
+    after its sources have moved on and still see what the serial sync
+    loop would have shown it (see SchedulerModels). None changes nothing.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+
+    def __enter__(self):
+        self._previous = getattr(_read_limits, "limits", None)
+        if self.limits is not None:
+            _read_limits.limits = self.limits
+        return self.limits
+
+    def __exit__(self, *exc):
+        _read_limits.limits = self._previous
+        return False
+
+def interpolate_states(times, states, t):
+    """
+    Linear interpolation of a (N, k) history at an array of times, clamped
+    to the first/last sample like StateProperties.orbit_state_at_time.
+    """
+    times = np.asarray(times, dtype=float)
+    t = np.asarray(t, dtype=float)
+
+    if len(times) == 1:
+        return np.repeat(np.asarray(states[0:1], dtype=float), t.size, axis=0).reshape(t.shape + (-1,))
+
+    i = np.clip(np.searchsorted(times, t) - 1, 0, len(times) - 2)
+    t0, t1 = times[i], times[i + 1]
+    alpha = np.clip((t - t0) / (t1 - t0), 0.0, 1.0)[..., None]
+    return (1 - alpha) * states[i] + alpha * states[i + 1]
+
+def map_covariance(Phi, P0):
+    """Phi P0 Phi^T for one (6, 6) STM or a (N, 6, 6) stack."""
+    Phi = np.asarray(Phi, dtype=float)
+    return np.einsum("...ij,jk,...lk->...il", Phi, np.asarray(P0, dtype=float), Phi)
+
 class BodyIntegratorProperties:
     def __init__(self):
         self.orbit    = IndividualIntegratorProperties()
@@ -193,10 +667,16 @@ class IndividualIntegratorProperties:
         self.absTol = 1e-12
         self.relTol = 1e-12
 
-        self.dt      = 10     # current step
+        self.dt      = None   # current step (None: chosen automatically)
         self.dt_min  = .01
         self.dt_max  = 1000
 
+        # StepControlModels.StepController (None: built from absTol / relTol)
+        self.controller = None
+
+        # EventModels.Event instances checked after every accepted step
+        self.events = []
+
     @property
     def is_propagated(self):
         return self.integrator is not None and self.dynamics is not None
@@ -0,0 +1,375 @@
+import bisect
+import numpy as np
+import ForceModels
+import IntegratorModels
+import ObjectModels
+import StepControlModels
+
+
+# ======================================================
+# Particle Registry
+# ======================================================
+class ParticleRegistry:
+    """
+    Structure-of-arrays store for massless test particles.
+
+    States live in one (N, 6) array with a per-particle step size, and are
+    propagated together under shared point-mass gravity with a masked,
+    vectorized Dormand-Prince 4(5) step. Each particle still has its own
+    step size and error control.
+
+    forces     : ForceModels.PointMassGravity / Fixed instances shared by
+                 every particle; their bodies must already be propagated
+                 (or ephemeris driven) over the span
+    controller : StepControlModels.StepController whose tolerances and
+                 gains are applied per particle (position and velocity
+                 blocks scaled separately)
+
+    Samples are recorded for all particles at the times passed to
+    propagate_to. handle(i) / particles() give lightweight per-particle
+    objects whose StateProperties answer orbit_state_at_time like a body.
+    """
+
+    def __init__(self, forces, controller=None, t_start=0.0, dt_min=0.01, dt_max=1000.0, capacity=1024):
+        self.bodies = []
+        for force in forces:
+            if isinstance(force, ForceModels.PointMassGravity):
+                self.bodies.append(force.body)
+            elif not isinstance(force, ForceModels.Fixed) and force is not ForceModels.Fixed:
+                raise ValueError(f"ParticleRegistry supports point-mass gravity only, got {force!r}")
+
+        self.controller = controller or StepControlModels.StepController(atol=(1e-4, 1e-7), rtol=1e-12)
+        if self.controller.blocks is None:
+            self.controller.blocks = StepControlModels.DEFAULT_BLOCKS["orbit"]
+        self.time = float(t_start)
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+
+        self.count = 0
+        self.names = []
+        self._states = np.empty((capacity, 6))
+        self._dt = np.empty(capacity)
+        self._err_old = np.empty(capacity)
+        self._rejected = np.empty(capacity, dtype=bool)
+        self._first = np.empty(capacity, dtype=np.int64)
+
+        # Recorded samples: time list and one (count_at_time, 6) array per time
+        self._times = []
+        self._history = []
+        self.history_version = 0
+        self._central = []
+
+    # --------------------------------------------------
+    # Particles
+    # --------------------------------------------------
+    def add(self, state, name=None, dt=None):
+        return self.add_many(np.asarray(state, dtype=float)[None, :], None if name is None else [name], dt)[0]
+
+    def add_many(self, states, names=None, dt=None):
+        """Add particles at the registry's current time; returns their handles."""
+        states = np.asarray(states, dtype=float).reshape(-1, 6)
+        n_new = len(states)
+        start = self.count
+        self._reserve(start + n_new)
+
+        first = len(self._times)
+        if self._times and self._times[-1] == self.time:
+            first -= 1
+
+        stop = start + n_new
+        self._states[start:stop] = states
+        # None: automatic initial step on the first propagate_to
+        self._dt[start:stop] = np.nan if dt is None else dt
+        self._err_old[start:stop] = 1e-4
+        self._rejected[start:stop] = False
+        self._first[start:stop] = first
+        if names is None:
+            names = [f"particle_{i}" for i in range(start, stop)]
+        self.names.extend(names)
+        self.count = stop
+
+        return [ParticleHandle(self, i) for i in range(start, stop)]
+
+    def handle(self, index):
+        return ParticleHandle(self, index)
+
+    def particles(self):
+        return [ParticleHandle(self, i) for i in range(self.count)]
+
+    @property
+    def states(self):
+        """(N, 6) current states (a view)."""
+        return self._states[:self.count]
+
+    @property
+    def dt(self):
+        """(N,) current per-particle step sizes (a view)."""
+        return self._dt[:self.count]
+
+    def _reserve(self, n):
+        capacity = len(self._states)
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity)
+        for field in ("_states", "_dt", "_err_old", "_rejected", "_first"):
+            old = getattr(self, field)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, field, new)
+
+    # --------------------------------------------------
+    # History
+    # --------------------------------------------------
+    def record(self):
+        """Store the current states of all particles at the current time."""
+        snapshot = self._states[:self.count].copy()
+        if self._times and self._times[-1] == self.time:
+            self._history[-1] = snapshot
+        else:
+            self._times.append(self.time)
+            self._history.append(snapshot)
+        self.history_version += 1
+
+    def particle_history(self, index):
+        """(times, (M, 6) states) recorded for one particle."""
+        k0 = int(self._first[index])
+        times = np.asarray(self._times[k0:])
+        states = np.array([snapshot[index] for snapshot in self._history[k0:]])
+        return times, states
+
+    def particle_state_at_time(self, index, t):
+        k0 = int(self._first[index])
+        times = self._times
+        if len(times) <= k0:
+            return self._states[index].copy()
+
+        if t <= times[k0]:
+            return self._history[k0][index].copy()
+        if t >= times[-1]:
+            return self._history[-1][index].copy()
+
+        k = bisect.bisect_left(times, t, lo=k0) - 1
+        alpha = (t - times[k]) / (times[k + 1] - times[k])
+        return (1 - alpha) * self._history[k][index] + alpha * self._history[k + 1][index]
+
+    # --------------------------------------------------
+    # Propagation
+    # --------------------------------------------------
+    def propagate(self, t_end, record_dt):
+        """Propagate to t_end, recording every record_dt."""
+        while self.time < t_end:
+            self.propagate_to(min(self.time + record_dt, t_end))
+
+    def propagate_to(self, t_target):
+        """Advance every particle to t_target with masked adaptive steps, then record."""
+        n = self.count
+        if not self._times or self._times[-1] != self.time or len(self._history[-1]) != n:
+            self.record()
+
+        # Central-body histories are read-only here; take them as arrays once
+        self._central = []
+        for body in self.bodies:
+            SPb = body.StateProperties
+            if getattr(SPb, "orbit_source", None) is not None:
+                # Ephemeris-driven: query the source, there is no history to read
+                self._central.append((body.PhysicalProperties.mu, None, SPb))
+                continue
+            times = SPb.orbit_times
+            positions = SPb.orbit_stateHistory[:, 0:3]
+            if not np.ptp(positions, axis=0).any():
+                times, positions = times[:1], positions[:1]     # stationary (e.g. a fixed Earth)
+            self._central.append((body.PhysicalProperties.mu, times, positions))
+
+        self._initial_steps()
+        t = np.full(n, self.time)
+        ctrl = self.controller
+
+        while True:
+            idx = np.flatnonzero(t < t_target)
+            if idx.size == 0:
+                break
+
+            x = self._states[idx]
+            remaining = t_target - t[idx]
+            h = np.minimum(self._dt[idx], remaining)
+            shortened = h < self._dt[idx]
+
+            x_new, err_vec = self._dp45(x, t[idx], h)
+            err = self._error_norm(err_vec, x, x_new)
+            ok = (err <= 1.0) | (h <= self.dt_min)
+
+            # Rejected: shrink and retry on the next pass
+            bad = idx[~ok]
+            if bad.size:
+                fac = np.minimum(1.0 / ctrl.fac_min, err[~ok] ** (1.0 / ctrl.order) / ctrl.safety)
+                self._dt[bad] = np.maximum(self.dt_min, h[~ok] / fac)
+                self._rejected[bad] = True
+
+            # Accepted: PI update of the step, unless it was only cut to hit t_target
+            good = idx[ok]
+            if good.size:
+                e = err[ok]
+                hg = h[ok]
+                expo = 1.0 / ctrl.order - 0.75 * ctrl.beta
+                fac = e ** expo / self._err_old[good] ** ctrl.beta
+                fac = np.clip(fac / ctrl.safety, 1.0 / ctrl.fac_max, 1.0 / ctrl.fac_min)
+                dt_next = hg / fac
+                dt_next = np.where(self._rejected[good], np.minimum(dt_next, hg), dt_next)
+                dt_next = np.clip(dt_next, self.dt_min, self.dt_max)
+
+                keep = shortened[ok]
+                self._dt[good] = np.where(keep, self._dt[good], dt_next)
+                self._err_old[good] = np.maximum(e, 1e-4)
+                self._rejected[good] = False
+
+                self._states[good] = x_new[ok]
+                t[good] = np.where(hg == remaining[ok], t_target, t[good] + hg)
+
+        self.time = float(t_target)
+        self.record()
+
+    def _initial_steps(self):
+        unset = np.flatnonzero(np.isnan(self._dt[:self.count]))
+        if unset.size == 0:
+            return
+        # One shared starting step per batch of new particles is plenty: the
+        # per-particle controller takes over after the first step
+        x = self._states[unset]
+        i = unset[np.argmax(np.linalg.norm(self._accel(x[:, 0:3], np.full(len(x), self.time)), axis=1))]
+        single = _SingleDynamics(self)
+        self._dt[unset] = self.controller.initial_step(single, self._states[i], self.time, self.dt_min, self.dt_max)
+
+    def _accel(self, r, t):
+        a = np.zeros_like(r)
+        for mu, times, positions in self._central:
+            if times is None:
+                r_rel = r - positions.orbit_states_at_times(t)[:, 0:3]
+            elif len(positions) == 1:
+                r_rel = r - positions[0]
+            else:
+                r_rel = r - ObjectModels.interpolate_states(times, positions, t)
+            d = np.sqrt(np.einsum("ij,ij->i", r_rel, r_rel))[:, None]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                a -= np.where(d > 0.0, mu * r_rel / d**3, 0.0)
+        return a
+
+    def _deriv(self, x, t):
+        dxdt = np.empty_like(x)
+        dxdt[:, 0:3] = x[:, 3:6]
+        dxdt[:, 3:6] = self._accel(x[:, 0:3], t)
+        return dxdt
+
+    def _dp45(self, x, t, h):
+        """Vectorized Dormand-Prince step; returns (x5, x5 - x4)."""
+        rk = IntegratorModels.AdaptiveRK45Integrator
+        hc = h[:, None]
+        k = []
+        for stage in range(7):
+            xs = x.copy()
+            for j, a in enumerate(rk.a[stage]):
+                if a:
+                    xs += hc * a * k[j]
+            k.append(self._deriv(xs, t + rk.c[stage] * h))
+
+        x5 = x + hc * sum(b * ki for b, ki in zip(rk.b5, k) if b)
+        x4 = x + hc * sum(b * ki for b, ki in zip(rk.b4, k) if b)
+        return x5, x5 - x4
+
+    def _error_norm(self, err, x, x_new):
+        """Per-particle StepController norm: max of the position / velocity block RMS."""
+        atol = np.broadcast_to(np.asarray(self.controller.atol, dtype=float), (2,))
+        rtol = self.controller.rtol
+        worst = np.zeros(len(x))
+        for (lo, hi), a in zip(((0, 3), (3, 6)), atol):
+            size = np.maximum(np.linalg.norm(x[:, lo:hi], axis=1), np.linalg.norm(x_new[:, lo:hi], axis=1))
+            scale = a + rtol * size
+            rms = np.sqrt(np.mean((err[:, lo:hi] / scale[:, None]) ** 2, axis=1))
+            worst = np.maximum(worst, rms)
+        return worst
+
+
+class _SingleDynamics:
+    """Scalar (state, time) -> dxdt wrapper for StepController.initial_step."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __call__(self, state, time):
+        return self.registry._deriv(np.asarray(state)[None, :], np.array([time]))[0]
+
+
+# ======================================================
+# Per-particle views
+# ======================================================
+class ParticleHandle:
+    """Body-like handle onto one registry row (name, StateProperties, ...)."""
+
+    __slots__ = ("registry", "index")
+
+    PhysicalProperties = ObjectModels.PhysicalProperties()
+    VisualProperties = ObjectModels.VisualProperties()
+
+    def __init__(self, registry, index):
+        self.registry = registry
+        self.index = index
+
+    @property
+    def name(self):
+        return self.registry.names[self.index]
+
+    @property
+    def StateProperties(self):
+        return ParticleStateView(self.registry, self.index)
+
+    def __repr__(self):
+        return f"ParticleHandle({self.name!r})"
+
+
+class ParticleStateView:
+    """Read side of ObjectModels.StateProperties for one particle."""
+
+    __slots__ = ("registry", "index")
+
+    collided = False
+    attitude_latest_time = None
+    attitude_stateCurrent = None
+
+    def __init__(self, registry, index):
+        self.registry = registry
+        self.index = index
+
+    @property
+    def history_version(self):
+        return self.registry.history_version
+
+    @property
+    def orbit_latest_time(self):
+        return self.registry.time
+
+    @property
+    def orbit_stateCurrent(self):
+        return self.registry._states[self.index].copy()
+
+    @property
+    def orbit_times(self):
+        return self.registry.particle_history(self.index)[0]
+
+    @property
+    def orbit_stateHistory(self):
+        return self.registry.particle_history(self.index)[1]
+
+    def orbit_state_at_time(self, t):
+        return self.registry.particle_state_at_time(self.index, t)
+
+    def orbit_states_at_times(self, times):
+        hist_times, hist_states = self.registry.particle_history(self.index)
+        if len(hist_times) == 0:
+            return np.repeat(self.orbit_stateCurrent[None, :], np.size(times), axis=0)
+        return ObjectModels.interpolate_states(hist_times, hist_states, times)
+
+    # Particles carry no attitude; plots skip the body axes for None
+    def attitude_state_at_time(self, t):
+        return None
+
+    def attitude_states_at_times(self, times):
+        return None
@@ -0,0 +1,231 @@
+import bisect
+import numpy as np
+import EventModels
+import ForceModels
+import IntegratorModels
+import LambertModels
+import ReferenceFrameModels
+
+
+# ======================================================
+# Patched-Conic Dynamics
+# ======================================================
+class PatchedConicDynamics:
+    """
+    OrbitDynamics replacement that only feels its current central body.
+
+    The central body is the one whose PhysicalProperties.SOI contains the
+    vehicle (the smallest such sphere wins). Outside every SOI the
+    `fallback` OrbitDynamics is used if given, otherwise the body with the
+    largest SOI. SOI crossings are found by restart events (see attach),
+    so the switch happens exactly at the boundary, and each switch is kept in
+    `switches` as (time, central). Switches are undone when the vehicle's
+    orbit is cut back (StateProperties.truncate_after) and saved with
+    checkpoints.
+    """
+
+    def __init__(self, bodies, fallback=None):
+        self.bodies = [body for body in bodies if body.PhysicalProperties.SOI > 0.0]
+        if not self.bodies:
+            raise ValueError("patched conics need at least one body with PhysicalProperties.SOI set")
+
+        self.fallback = fallback
+        self.root = max(self.bodies, key=lambda body: body.PhysicalProperties.SOI)
+        self.central = None
+        self.switches = []
+
+        self._models = {
+            id(body): IntegratorModels.OrbitDynamics([ForceModels.PointMassGravity(body)])
+            for body in self.bodies
+        }
+
+    # --------------------------------------------------
+    # Dynamics
+    # --------------------------------------------------
+    @property
+    def forces(self):
+        """Every force this model may switch to (candidate bodies and fallback)."""
+        forces = [model.forces[0] for model in self._models.values()]
+        if self.fallback is not None:
+            forces += list(self.fallback.forces)
+        return forces
+
+    def _model(self):
+        if self.central is None:
+            if self.fallback is not None:
+                return self.fallback
+            return self._models[id(self.root)]
+        return self._models[id(self.central)]
+
+    def __call__(self, state, time):
+        return self._model()(state, time)
+
+    def jacobian(self, state, time):
+        return self._model().jacobian(state, time)
+
+    # --------------------------------------------------
+    # Central body
+    # --------------------------------------------------
+    def dominant_body(self, state, time):
+        """
+        Body with the smallest SOI containing the position, or None.
+
+        Inside means the SOI events' g < 0, so a state just past a crossing
+        (see EventModels.find_root) lands on the same side as the event.
+        """
+        best = None
+        for body in self.bodies:
+            if EventModels.soi_margin(body, time, state) < 0.0:
+                if best is None or body.PhysicalProperties.SOI < best.PhysicalProperties.SOI:
+                    best = body
+        return best
+
+    def set_central(self, body, time):
+        if self.switches and body is self.central:
+            return
+        self.central = body
+        self.switches.append((float(time), body))
+
+    def truncate_after(self, t):
+        """Undo the switches after t (the vehicle's orbit was cut back there)."""
+        self.switches = [switch for switch in self.switches if switch[0] <= t] or self.switches[:1]
+        if self.switches:
+            self.central = self.switches[-1][1]
+
+    def central_at(self, t):
+        """Central body in effect at time t (None: fallback region)."""
+        if not self.switches:
+            return self.central
+        times = [time for time, _ in self.switches]
+        i = max(0, bisect.bisect_right(times, t) - 1)
+        return self.switches[i][1]
+
+    def frame_at(self, t):
+        """Inertial frame centred on the central body at time t."""
+        return ReferenceFrameModels.BodyCenteredInertialFrame(self.central_at(t) or self.root)
+
+    def relative_history(self, times, states):
+        """(N, 6) states relative to whichever body was central at each time."""
+        times = np.asarray(times, dtype=float)
+        states = np.asarray(states, dtype=float)[:, 0:6]
+        relative = states.copy()
+
+        switch_times = np.array([time for time, _ in self.switches])
+        segment = np.maximum(np.searchsorted(switch_times, times, side="right") - 1, 0)
+        for i, (_, body) in enumerate(self.switches):
+            mask = segment == i
+            if mask.any():
+                body = body or self.root
+                relative[mask] -= body.StateProperties.orbit_states_at_times(times[mask])[:, 0:6]
+        return relative
+
+    def _on_crossing(self, vehicle, record):
+        # The event time lies just past the boundary, so the new region is unambiguous
+        self.set_central(self.dominant_body(record.state, record.time), record.time)
+
+
+def attach(vehicle, bodies, fallback=None, analytic=False):
+    """
+    Put `vehicle` in patched-conic mode.
+
+    bodies   : candidate central bodies (those with PhysicalProperties.SOI)
+    fallback : OrbitDynamics used outside every SOI, e.g. the full force model
+    analytic : step with the two-body Kepler solution about the central body
+               instead of integrating
+
+    Returns the PatchedConicDynamics now driving the vehicle's orbit.
+    """
+    IPo = vehicle.IntegratorProperties.orbit
+    SP = vehicle.StateProperties
+
+    dynamics = PatchedConicDynamics(bodies, fallback)
+    t0 = SP.orbit_latest_time
+    dynamics.set_central(dynamics.dominant_body(SP.orbit_stateCurrent, t0), t0)
+    IPo.dynamics = dynamics
+
+    # Switches are undone with the orbit samples they came from
+    SP.truncate_listeners = [
+        listener for listener in SP.truncate_listeners
+        if not isinstance(listener, PatchedConicDynamics)
+    ] + [dynamics]
+
+    for body in dynamics.bodies:
+        IPo.events.append(EventModels.SOIEvent(
+            body, name=f"{body.name} SOI", direction=0,
+            restart=True, action=dynamics._on_crossing,
+        ))
+
+    if analytic:
+        IPo.integrator = KeplerIntegrator()
+        if IPo.dt is None:
+            IPo.dt = 60.0
+
+    return dynamics
+
+
+# ======================================================
+# Analytic Two-Body Stepping
+# ======================================================
+class KeplerIntegrator:
+    """
+    Fixed-step "integrator" that advances the state relative to the current
+    central body with the universal-variable Kepler solution, then adds the
+    central body's own state at the end of the step. Used where the
+    dynamics have no central body (fallback region or STM runs), `fallback`
+    integrates instead.
+    """
+    adaptive = False
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or IntegratorModels.RK4Integrator()
+
+    def step(self, deriv_func, state, time, dt):
+        central = getattr(deriv_func, "central", None)
+        if central is None:
+            return self.fallback.step(deriv_func, state, time, dt)
+
+        SPc = central.StateProperties
+        relative = state[0:6] - SPc.orbit_state_at_time(time)[0:6]
+        relative = kepler_propagate(relative, dt, central.PhysicalProperties.mu)
+        return relative + SPc.orbit_state_at_time(time + dt)[0:6]
+
+def kepler_propagate(state, dt, mu, tol=1e-12, max_iter=50):
+    """Two-body propagation of a relative state by dt (universal variables)."""
+    r0 = np.asarray(state[0:3], dtype=float)
+    v0 = np.asarray(state[3:6], dtype=float)
+    r0n = np.linalg.norm(r0)
+    vr0 = np.dot(r0, v0) / r0n
+    alpha = 2.0 / r0n - np.dot(v0, v0) / mu       # 1/a
+    sqrt_mu = np.sqrt(mu)
+
+    # Newton iteration on the universal anomaly chi
+    chi = sqrt_mu * abs(alpha) * dt
+    for _ in range(max_iter):
+        z = alpha * chi**2
+        C, S = LambertModels.stumpff(np.array([z]))
+        C, S = C[0], S[0]
+        F = (r0n * vr0 / sqrt_mu * chi**2 * C
+             + (1.0 - alpha * r0n) * chi**3 * S
+             + r0n * chi - sqrt_mu * dt)
+        dF = (r0n * vr0 / sqrt_mu * chi * (1.0 - z * S)
+              + (1.0 - alpha * r0n) * chi**2 * C
+              + r0n)
+        step = F / dF
+        chi -= step
+        if abs(step) <= tol * max(1.0, abs(chi)):
+            break
+
+    z = alpha * chi**2
+    C, S = LambertModels.stumpff(np.array([z]))
+    C, S = C[0], S[0]
+
+    f = 1.0 - chi**2 / r0n * C
+    g = dt - chi**3 / sqrt_mu * S
+    r = f * r0 + g * v0
+    rn = np.linalg.norm(r)
+
+    fdot = sqrt_mu / (rn * r0n) * (z * S - 1.0) * chi
+    gdot = 1.0 - chi**2 / rn * C
+    v = fdot * r0 + gdot * v0
+
+    return np.hstack((r, v))
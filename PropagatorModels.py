@@ -1,19 +1,107 @@
 import heapq
+from dataclasses import dataclass
+from typing import Optional
 import numpy as np
 import ObjectModels
 import IntegratorModels
-
-
-def Propagate(bodyList, TimeElement):
-
-    t_start = TimeElement.startTime
-    t_end   = TimeElement.endTime
-
+import CheckpointModule
+import CouplingModels
+import EventModels
+import StepControlModels
+
+
+def Propagate(bodyList, TimeElement, checkpoint=None, verbose=True, workers=None, executor="process"):
+    """
+    Propagate every body from TimeElement.startTime to TimeElement.endTime.
+
+    checkpoint : CheckpointModule.Checkpointer, optional
+        Periodically writes everything needed to resume the run.
+    verbose : bool
+        Print per-sync progress.
+    workers : int, optional
+        Propagate groups of bodies that do not depend on each other in a
+        pool of this size ("process" or "thread" executor, see
+        SchedulerModels). Results are identical to a serial run.
+    """
+
+    initialize_bodies(bodyList, TimeElement.startTime)
+    pq, uid = initialize_sync_heap(bodyList)
+
+    return run_sync_loop(bodyList, pq, uid, TimeElement.endTime, checkpoint, verbose, workers, executor)
+
+
+def PropagateStream(bodyList, TimeElement, history_limit=None, writer=None, checkpoint=None):
+    """
+    Streaming variant of Propagate.
+
+    Yields a SyncSnapshot after every body synchronization, so results can be
+    consumed while the run is in progress.
+
+    history_limit : int, optional
+        Keep at most about this many samples per history in memory (a ring
+        buffer of the latest samples). It must cover the widest sync window
+        any body interpolates over. Older samples are handed to `writer`.
+    writer : TrajectoryStore.HistoryWriter, optional
+        Background writer that receives spilled samples, and the remaining
+        in-memory samples when the stream ends.
+    """
+    if history_limit is not None:
+        history_limit = max(2, int(history_limit))
+
+    initialize_bodies(bodyList, TimeElement.startTime)
+    pq, uid = initialize_sync_heap(bodyList)
+
+    if writer is not None:
+        for body in bodyList:
+            writer.add_body(body)
+
+    try:
+        for t_target, body in iterate_sync_loop(bodyList, pq, uid, TimeElement.endTime, checkpoint):
+            SP = body.StateProperties
+
+            if history_limit is not None:
+                for history in ("orbit", "attitude"):
+                    # Archived samples are older than anything still in memory
+                    archived = SP.take_archive(history)
+                    spilled = SP.trim_history(history, keep=history_limit, slack=history_limit)
+                    if writer is not None:
+                        for rows in (archived, spilled):
+                            if rows is not None:
+                                writer.append(body.name, history, *rows)
+
+            yield SyncSnapshot(
+                time=t_target,
+                body=body,
+                orbit_state=None if SP.orbit_stateCurrent is None else SP.orbit_stateCurrent.copy(),
+                attitude_state=None if SP.attitude_stateCurrent is None else SP.attitude_stateCurrent.copy(),
+                collided=SP.collided,
+            )
+    finally:
+        if writer is not None:
+            for body in bodyList:
+                for history in ("orbit", "attitude"):
+                    times, states, _ = body.StateProperties.export_history(history)
+                    if len(times):
+                        writer.append(body.name, history, times, states)
+            writer.close()
+
+
+@dataclass
+class SyncSnapshot:
+    time: float
+    body: object
+    orbit_state: Optional[np.ndarray]
+    attitude_state: Optional[np.ndarray]
+    collided: bool
+
+
+def initialize_bodies(bodyList, t_start):
     # ==================================================
     # Initialization
     # ==================================================
     for body in bodyList:
         SP = body.StateProperties
+        ObjectModels.adopt_ephemeris(body)
 
         if SP.orbit_latest_time is None:
             SP.set_orbitState(t_start, SP.orbit_stateCurrent)
@@ -24,6 +112,25 @@ def Propagate(bodyList, TimeElement):
         if not hasattr(SP, "collided"):
             SP.collided = False
 
+        if not hasattr(SP, "halt_time"):
+            SP.halt_time = None
+
+
+def Resume(bodyList, TimeElement, checkpoint_path, checkpoint=None, verbose=True, workers=None, executor="process"):
+    """
+    Restart a run from a checkpoint written by Propagate.
+
+    bodyList must be rebuilt the same way as for the original run (same
+    names, integrators and dynamics); the checkpoint restores the heap,
+    step sizes, current states, collision flags and saved histories.
+    """
+    for body in bodyList:
+        ObjectModels.adopt_ephemeris(body)
+    pq, uid = CheckpointModule.restore_checkpoint(checkpoint_path, bodyList)
+    return run_sync_loop(bodyList, pq, uid, TimeElement.endTime, checkpoint, verbose, workers, executor)
+
+
+def initialize_sync_heap(bodyList):
     # ==================================================
     # Priority queue: (next_sync_time, uid, body)
     # ==================================================
@@ -40,142 +147,187 @@ def Propagate(bodyList, TimeElement):
         heapq.heappush(pq, (t0 + IP.sync_dt, uid, body))
         uid += 1
 
-    # ==================================================
-    # Event-driven propagation loop
-    # ==================================================
-    while pq:
-
-        t_target, _, body = heapq.heappop(pq)
-
-        if t_target > t_end:
-            break
-
-        SP = body.StateProperties
-        IP = body.IntegratorProperties
-
-        # ==================================================
-        # ORBIT PROPAGATION
-        # ==================================================
-        if IP.orbit.is_propagated and not SP.collided:
+    return pq, uid
 
-            IPo = IP.orbit
-            t   = SP.orbit_latest_time
-            x   = SP.orbit_stateCurrent.copy()
 
-            while t < t_target:
+def run_sync_loop(bodyList, pq, uid, t_end, checkpoint=None, verbose=True, workers=None, executor="process"):
+    if workers is not None and workers > 1:
+        # Deferred: the executor machinery is only loaded for parallel runs
+        import SchedulerModels
+        loop = SchedulerModels.iterate_parallel_sync_loop(bodyList, pq, uid, t_end, workers, executor, checkpoint)
+    else:
+        loop = iterate_sync_loop(bodyList, pq, uid, t_end, checkpoint)
 
-                dt = min(IPo.dt, t_target - t)
+    for t_target, body in loop:
+        if verbose:
+            print(f"{body.name} : {100.0 * t_target / t_end:.2f}%")
 
-                if isinstance(IPo.integrator, IntegratorModels.AdaptiveRK45Integrator):
+    return bodyList
 
-                    dt_try = dt
-                    while True:
-                        x_new, err, tol = IPo.integrator.step(
-                            IPo.dynamics, x, t, dt_try,
-                            IPo.absTol, IPo.relTol
-                        )
 
-                        if err <= tol:
-                            break
+def iterate_sync_loop(bodyList, pq, uid, t_end, checkpoint=None, read_limits=None):
+    """
+    Generator form of the sync loop; yields (t_target, body) after each sync.
 
-                        dt_try = max(IPo.dt_min, 0.5 * dt_try)
+    read_limits : optional {(body, t_target): ObjectModels.read_limits map}
+                  applied while that sync runs (see SchedulerModels)
+    """
 
-                    x = x_new
-                    t += dt_try
+    # ==================================================
+    # Event-driven propagation loop
+    # ==================================================
+    while pq:
 
-                    # Adapt step
-                    if err > 0.0:
-                        fac = 0.9 * (tol / err) ** 0.25
-                        IPo.dt = np.clip(fac * dt_try, IPo.dt_min, IPo.dt_max)
-                    else:
-                        IPo.dt = min(IPo.dt_max, 2.0 * dt_try)
+        t_target, entry_uid, body = heapq.heappop(pq)
 
-                else:
-                    x = IPo.integrator.step(IPo.dynamics, x, t, dt)
-                    t += dt
+        if t_target > t_end:
+            # Leave the entry queued, so a later call can continue the run
+            heapq.heappush(pq, (t_target, entry_uid, body))
+            break
 
-            SP.set_orbitState(t_target, x)
+        # States of sources that lag behind are extrapolated and charged to
+        # this body; once a source moves on, bad predictions are rolled back
+        limits = read_limits.get((body, t_target)) if read_limits else None
+        with CouplingModels.consumer(body), ObjectModels.read_limits(limits):
+            advance_body(body, t_target)
+            check_collision(body, bodyList, t_target)
+        for consumer in CouplingModels.check_source(body):
+            # A consumer stopped by a terminal event has left the heap
+            if not any(entry[2] is consumer for entry in pq):
+                heapq.heappush(pq, (t_target, uid, consumer))
+                uid += 1
 
         # ==================================================
-        # ATTITUDE PROPAGATION
+        # Schedule next synchronization
         # ==================================================
-        if IP.attitude.is_propagated and not SP.collided:
+        # Bodies stopped by a terminal event drop out once nothing else propagates
+        IP = body.IntegratorProperties
+        if body.StateProperties.halt_time is None or IP.attitude.is_propagated:
+            next_time = t_target + IP.sync_dt
+            heapq.heappush(pq, (next_time, uid, body))
+            uid += 1
 
-            IPa = IP.attitude
-            t   = SP.attitude_latest_time
-            q   = SP.attitude_stateCurrent.copy()
+        if checkpoint is not None:
+            checkpoint.maybe_save(bodyList, pq, uid, t_target)
 
-            while t < t_target:
-                
-                dt = min(IPa.dt, t_target - t)
-                if isinstance(IPa.integrator, IntegratorModels.AdaptiveRK45Integrator):
+        yield t_target, body
 
-                    dt_try = dt
-                    while True:
-                        q_new, err, tol = IPa.integrator.step(
-                            IPa.dynamics, q, t, dt_try,
-                            IPa.absTol, IPa.relTol
-                        )
 
-                        if err <= tol:
-                            break
+def advance_body(body, t_target):
+    SP = body.StateProperties
+    IP = body.IntegratorProperties
 
-                        dt_try = max(IPa.dt_min, 0.5 * dt_try)
+    # ==================================================
+    # ORBIT PROPAGATION
+    # ==================================================
+    if IP.orbit.is_propagated and not SP.collided and SP.halt_time is None:
+
+        IPo = IP.orbit
+        t   = SP.orbit_latest_time
+        x   = SP.orbit_stateCurrent.copy()
+
+        # With the STM enabled, integrate the augmented [x, Phi] state
+        if SP.stm_enabled:
+            if SP.stm_latest_time is None:
+                SP.set_stmState(t, SP.stm_stateCurrent)
+            x = np.concatenate((x, SP.stm_stateCurrent.ravel()))
+        dynamics = orbit_dynamics(IPo, SP)
+
+        while t < t_target:
+
+            t_prev, x_prev = t, x
+            dt = min(StepControlModels.ensure_step(IPo, x[0:6], t, "orbit"), t_target - t)
+
+            if IPo.integrator.adaptive:
+
+                x, dt_taken = StepControlModels.adaptive_step(IPo, dynamics, x, t, dt, "orbit")
+                t += dt_taken
+
+            else:
+                x = IPo.integrator.step(dynamics, x, t, dt)
+                t += dt
+
+            if IPo.events:
+                cut = EventModels.handle_events(body, IPo.events, dynamics, t_prev, x_prev, t, x)
+                if cut is not None:
+                    t, x, terminal = cut
+                    if terminal:
+                        break
+                    # A restart event's action may have swapped the dynamics
+                    dynamics = orbit_dynamics(IPo, SP)
+        else:
+            SP.set_orbitState(t_target, x[0:6])
+            if SP.stm_enabled:
+                SP.set_stmState(t_target, x[6:42])
 
-                    q = renormalize_quaternion_inplace(q_new)  # <-- normalize here
-                    t += dt_try
+    # ==================================================
+    # ATTITUDE PROPAGATION
+    # ==================================================
+    if IP.attitude.is_propagated and not SP.collided:
 
-                    if err > 0.0:
-                        fac = 0.9 * (tol / err) ** 0.25
-                        IPa.dt = np.clip(fac * dt_try, IPa.dt_min, IPa.dt_max)
-                    else:
-                        IPa.dt = min(IPa.dt_max, 2.0 * dt_try)
+        IPa = IP.attitude
+        t   = SP.attitude_latest_time
+        q   = SP.attitude_stateCurrent.copy()
 
-                else:
-                    q = IPa.integrator.step(IPa.dynamics, q, t, dt)
-                    q = renormalize_quaternion_inplace(q)  # <-- normalize here
-                    t += dt
+        while t < t_target:
+            
+            dt = min(StepControlModels.ensure_step(IPa, q, t, "attitude"), t_target - t)
+            if IPa.integrator.adaptive:
 
-            SP.set_attitudeState(t_target, q)
+                q_new, dt_taken = StepControlModels.adaptive_step(IPa, IPa.dynamics, q, t, dt, "attitude")
+                q = renormalize_quaternion_inplace(q_new)  # <-- normalize here
+                t += dt_taken
 
-        # ==================================================
-        # COLLISION CHECK (SYNCHRONIZED)
-        # ==================================================
-        if not SP.collided and IP.orbit.is_propagated:
+            else:
+                q = IPa.integrator.step(IPa.dynamics, q, t, dt)
+                q = renormalize_quaternion_inplace(q)  # <-- normalize here
+                t += dt
 
-            r_body = SP.orbit_state_at_time(t_target)[0:3]
+        SP.set_attitudeState(t_target, q)
 
-            for other in bodyList:
 
-                if other is body:
-                    continue
+def orbit_dynamics(IPo, SP):
+    if SP.stm_enabled:
+        return IntegratorModels.VariationalDynamics(IPo.dynamics)
+    return IPo.dynamics
 
-                if isinstance(body, ObjectModels.Planet):
-                    continue
 
-                if (
-                    isinstance(body, ObjectModels.SpaceVehicle)
-                    and isinstance(other, ObjectModels.SpaceVehicle)
-                ):
-                    continue
+def check_collision(body, bodyList, t_target):
+    # ==================================================
+    # COLLISION CHECK (SYNCHRONIZED)
+    # ==================================================
+    SP = body.StateProperties
+    IP = body.IntegratorProperties
 
-                r_other = other.StateProperties.orbit_state_at_time(t_target)[0:3]
+    if not SP.collided and IP.orbit.is_propagated:
 
-                if np.linalg.norm(r_body - r_other) <= other.PhysicalProperties.radius:
-                    SP.collided = True
-                    print(f"Collision: {body.name} with {other.name}")
-                    break
+        r_body = SP.orbit_state_at_time(t_target)[0:3]
 
-        # ==================================================
-        # Schedule next synchronization
-        # ==================================================
-        next_time = t_target + IP.sync_dt
-        heapq.heappush(pq, (next_time, uid, body))
-        uid += 1
+        for other in collision_candidates(body, bodyList):
 
-        print(f"{body.name} : {100.0 * t_target / t_end:.2f}%")
+            r_other = other.StateProperties.orbit_state_at_time(t_target)[0:3]
 
-    return bodyList
+            if np.linalg.norm(r_body - r_other) <= other.PhysicalProperties.radius:
+                SP.collided = True
+                print(f"Collision: {body.name} with {other.name}")
+                break
+
+def collision_candidates(body, bodyList):
+    """Bodies check_collision tests `body` against (planets and vehicle pairs are skipped)."""
+    if isinstance(body, ObjectModels.Planet):
+        return []
+
+    candidates = []
+    for other in bodyList:
+        if other is body:
+            continue
+        if (
+            isinstance(body, ObjectModels.SpaceVehicle)
+            and isinstance(other, ObjectModels.SpaceVehicle)
+        ):
+            continue
+        candidates.append(other)
+    return candidates
 
 def body_sync_time(SP):
     return min(SP.orbit_latest_time, SP.attitude_latest_time)
@@ -1,34 +1,157 @@
+import collections
 import time
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
-import ColorSchemeObjects
-import StandardPlots
-from matplotlib.widgets import TextBox
 import CommandModule
+import CommandServer
 import heapq
+import threading
 import ObjectModels
+import EventModels
+import StepControlModels
 
 class RealTimePropagatorObject:
-    def __init__(self, bodyList, sim_start_time=0.0):
+    def __init__(self, bodyList, sim_start_time=0.0, lookahead=60.0, use_worker=True):
         self.bodyList = bodyList
         self.sim_time = sim_start_time
 
+        # Background propagation: the worker keeps every body up to
+        # sim_time + lookahead so the GUI thread only reads finished states
+        self.lookahead = lookahead
+        self.use_worker = use_worker
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._worker = None
+        self._worker_stop = False
+
         self.speed = 1.0
         self.running = False
         self.stopped = False
 
         self.pq, self.uid = initialize_heap(bodyList)
 
+        # Set while queued commands run, so handlers see the exact command time
+        self.command_time = None
+
         self.last_wall_time = None
         self.wall_start_time = None
 
+        # Frame budget, effective speed cap and HUD statistics
+        self.governor = FrameGovernor()
+
         self.simulation = ObjectModels.SimulationObject("simulator")
-        self.CommandModule = CommandModule.CommandModule(self.bodyList, self.simulation)
+        self.CommandModule = CommandModule.CommandModule(self.simulation, self.bodyList)
+        self.CommandModule.propagator = self
+
+    @property
+    def execution_time(self):
+        """Time at which a command is taking effect (see _run_due_commands)."""
+        return self.command_time if self.command_time is not None else self.sim_time
 
     def reset_propagation(self):
-        """Rebuild propagation queue after state changes (e.g., maneuvers)."""
-        self.pq, self.uid = initialize_heap(self.bodyList)
+        """
+        Rebuild propagation queue after state changes (e.g., maneuvers).
+
+        Anything the worker computed past the command time assumed the old
+        state, so the lookahead window is discarded first.
+        """
+        with self._lock:
+            t_cut = self.execution_time
+            for body in self.bodyList:
+                body.StateProperties.truncate_after(t_cut)
+            self.pq, self.uid = initialize_heap(self.bodyList)
+            self._wake.notify_all()
+
+    def _run_due_commands(self, t_limit):
+        """
+        Execute every queued command with issue_time <= t_limit at its exact time.
+
+        Commands and body steps share one timeline: before a command runs,
+        every body is integrated (or its lookahead cut back) to exactly the
+        command's issue time, then propagation resumes from there.
+        """
+        with self._lock:
+            while True:
+                t_cmd = self.CommandModule.next_time()
+                if t_cmd is None or t_cmd > t_limit:
+                    return
+
+                sync_bodies_to(self.bodyList, t_cmd)
+                self.command_time = t_cmd
+                try:
+                    self.CommandModule.process(t_cmd)
+                finally:
+                    self.command_time = None
+                self.pq, self.uid = initialize_heap(self.bodyList)
+
+    # ======================================================
+    # Background propagation worker
+    # ======================================================
+    def start_worker(self):
+        if not self.use_worker or self._worker is not None:
+            return
+        self._worker_stop = False
+        self._worker = threading.Thread(target=self._worker_loop, name="RealTimePropagator", daemon=True)
+        self._worker.start()
+
+    def stop_worker(self):
+        if self._worker is None:
+            return
+        with self._lock:
+            self._worker_stop = True
+            self._wake.notify_all()
+        self._worker.join()
+        self._worker = None
+
+    @property
+    def propagated_time(self):
+        """Earliest time every propagated body has reached."""
+        with self._lock:
+            times = [
+                body.StateProperties.orbit_latest_time
+                for body in self.bodyList
+                if body.IntegratorProperties.orbit.integrator is not None
+            ]
+        return min(times) if times else self.sim_time
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                if self._worker_stop:
+                    return
+
+                # Never run past a pending command; it is applied at its exact time
+                target = self.sim_time + self.lookahead
+                t_cmd = self.CommandModule.next_time()
+                if t_cmd is not None:
+                    target = min(target, t_cmd)
+
+                if not self.pq or self.pq[0][0] > target:
+                    self._wake.wait(timeout=0.1)
+                    continue
+
+                # One heap event per lock hold keeps GUI reads responsive
+                self.pq, self.uid = propagate_until(
+                    self.bodyList,
+                    self.pq,
+                    self.uid,
+                    self.pq[0][0]
+                )
+
+    def serve_commands(self, host="127.0.0.1", port=0, path=None):
+        """Accept commands from external scripts over a local socket (see CommandServer)."""
+        self.command_server = CommandServer.CommandServer(
+            self.CommandModule, host=host, port=port, path=path
+        ).start()
+        return self.command_server
+
+    def submit_text(self, text):
+        """TextBox callback: run a typed command at exactly the current sim_time."""
+        with self._lock:
+            command = self.CommandModule.parse(text)
+            if command is None:
+                return
+            self.CommandModule.submit(command)
+            self._run_due_commands(self.sim_time)
 
 
     # ======================================================
@@ -41,6 +164,8 @@ class RealTimePropagatorObject:
         self.speed = float(getattr(self.simulation, "speed", self.speed))
 
         if not self.running or self.stopped:
+            if self.last_wall_time is not None:
+                self.governor.reset_rate()
             self.last_wall_time = None
             return
         
@@ -52,20 +177,96 @@ class RealTimePropagatorObject:
         dt_wall = now - self.last_wall_time
         self.last_wall_time = now
 
-        dt_sim = self.speed * dt_wall
-        self.sim_time += dt_sim
+        # A stalled frame (window drag, GC) is not made up in one huge step
+        dt_sim = self.governor.effective_speed(self.speed) * min(dt_wall, 0.25)
+        self.advance(dt_sim)
 
-
-        self.pq, self.uid = propagate_until(
-            self.bodyList,
-            self.pq,
-            self.uid,
-            self.sim_time
+        self.governor.observe(
+            dt_wall, dt_sim, self.sim_time, self.propagated_time, self.speed,
+            worker=self._worker is not None
         )
 
-        self.CommandModule.process(self.sim_time)
+    def advance(self, dt_sim):
+        """Move sim_time forward by dt_sim, propagate and run due commands."""
+        with self._lock:
+            self.sim_time += dt_sim
+
+            t0 = time.perf_counter()
+            self._run_due_commands(self.sim_time)
+            t1 = time.perf_counter()
+            self.governor.record("command", t1 - t0)
+
+            if self._worker is None:
+                self.pq, self.uid = propagate_until(
+                    self.bodyList,
+                    self.pq,
+                    self.uid,
+                    self.sim_time
+                )
+                self.governor.record("propagate", time.perf_counter() - t1)
+            else:
+                self._wake.notify_all()
+
+    # ======================================================
+    # Headless driver
+    # ======================================================
+    def RunHeadless(self, end_time=None, realtime=True, frame_dt=1/60, max_frames=None):
+        """
+        Run the simulation loop without a display.
+
+        realtime=True  : wall-clock paced, same as the GUI (sim advances by
+                         speed * elapsed wall time, one frame every frame_dt)
+        realtime=False : as fast as possible; each frame advances the sim by
+                         speed * frame_dt with no sleeping
+
+        Stops at end_time (sim seconds), after max_frames, or when the
+        SimulationObject is stopped.
+        """
+        self.simulation.running = True
+        self.simulation.stopped = False
+
+        if realtime:
+            self.start_worker()
+            self.governor.budget = frame_dt
+        self.wall_start_time = time.perf_counter()
+        self.last_wall_time = self.wall_start_time
+
+        frames = 0
+        next_frame = self.wall_start_time
+        try:
+            while not self.simulation.stopped:
+                if end_time is not None and self.sim_time >= end_time:
+                    break
+                if max_frames is not None and frames >= max_frames:
+                    break
+
+                if realtime:
+                    next_frame += frame_dt
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.step()
+                else:
+                    self.speed = float(getattr(self.simulation, "speed", self.speed))
+                    if self.simulation.running:
+                        dt_sim = self.speed * frame_dt
+                        if end_time is not None:
+                            dt_sim = min(dt_sim, end_time - self.sim_time)
+                        self.advance(dt_sim)
+                    else:
+                        # paused: still accept commands (e.g. play)
+                        self._run_due_commands(self.sim_time)
+
+                self.governor.end_frame()
+                frames += 1
+        finally:
+            self.stop_worker()
+
+        return self.sim_time
 
     def RunRealTimeSimulation(self):
+        import matplotlib.pyplot as plt
+
         fig, ax, artists, trail_buffers = self.initialize_scene(self.bodyList)
         
         # ensure simulation is running and initialize wall-clock reference
@@ -78,6 +279,9 @@ class RealTimePropagatorObject:
         self.last_wall_time = time.perf_counter()
         self.wall_start_time = self.last_wall_time
 
+        self.start_worker()
+        fig.figure.canvas.mpl_connect("close_event", lambda event: self.stop_worker())
+
         # Create and execute commands
         speed_cmd = CommandModule.Command(
             target_name="simulator",
@@ -103,21 +307,33 @@ class RealTimePropagatorObject:
             owner=self.simulation
         )
 
+        canvas = fig.figure.canvas
+        blit = {"background": None}
+
+        def on_draw(event):
+            # Full redraws (resize, zoom, textbox edits) refresh the cached background
+            blit["background"] = canvas.copy_from_bbox(fig.figure.bbox)
+            for artist in artists["animated"]:
+                fig.figure.draw_artist(artist)
+
+        if canvas.supports_blit:
+            canvas.mpl_connect("draw_event", on_draw)
+
         def on_timer():
             if self.stopped:
                 return
             
             self.step()
-            self.update_visual(
-                bodies=self.bodyList,
-                artists=artists,
-                sim_time=self.sim_time,
-                trail_buffers=trail_buffers
-            )
 
-            fig.figure.canvas.draw_idle()
+            # Over budget, the governor skips renders and trail samples
+            render, update_trails = self.governor.plan_frame()
+            if render:
+                t0 = time.perf_counter()
+                self.render_frame(canvas, fig, artists, trail_buffers, blit, update_trails)
+                self.governor.record("render", time.perf_counter() - t0)
+            self.governor.end_frame()
 
-        timer = fig.figure.canvas.new_timer(interval=16)  # ~60 Hz
+        timer = fig.figure.canvas.new_timer(interval=int(1000 * self.governor.budget))  # ~60 Hz
         timer.add_callback(on_timer)
         timer.start()
 
@@ -126,7 +342,28 @@ class RealTimePropagatorObject:
     # ======================================================
     # Visualization
     # ======================================================
-    def update_visual(self, bodies, artists, sim_time, trail_buffers, max_trail=200):
+    def render_frame(self, canvas, fig, artists, trail_buffers, blit, update_trails=True):
+        with self._lock:
+            self.update_visual(
+                bodies=self.bodyList,
+                artists=artists,
+                sim_time=self.sim_time,
+                trail_buffers=trail_buffers,
+                update_trails=update_trails
+            )
+
+        if blit["background"] is None:
+            canvas.draw_idle()
+            return
+
+        # Blit: restore the static scene and redraw only the moving artists
+        canvas.restore_region(blit["background"])
+        for artist in artists["animated"]:
+            fig.figure.draw_artist(artist)
+        canvas.blit(fig.figure.bbox)
+        canvas.flush_events()
+
+    def update_visual(self, bodies, artists, sim_time, trail_buffers, update_trails=True):
         
         # sync runtime speed with simulation object (commands update SimulationObject.speed)
         if hasattr(self.simulation, "speed"):
@@ -141,7 +378,10 @@ class RealTimePropagatorObject:
             sim_text.set_text(f"Sim t: {sim_time:.2f} s")
 
         if speed_text is not None:
-            speed_text.set_text(f"Speed: {self.speed:.1f}x")
+            if self.governor.speed_cap is not None:
+                speed_text.set_text(f"Speed: {self.governor.effective_speed(self.speed):.1f}x (set {self.speed:.1f}x)")
+            else:
+                speed_text.set_text(f"Speed: {self.speed:.1f}x")
 
         if wall_text is not None:
             if self.wall_start_time is not None:
@@ -150,37 +390,75 @@ class RealTimePropagatorObject:
             else:
                 wall_text.set_text("Wall: --")
 
-        # -=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
-        for body in bodies:
-            name = body.name
-            SP = body.StateProperties
-            state = SP.orbit_state_at_time(sim_time)
-
-            if state is None:
-                continue
-
-            x, y = state[0], state[1]
-            buf = trail_buffers[name]
-            buf["x"].append(x)
-            buf["y"].append(y)
+        self.update_performance_text(artists)
 
-            if len(buf["x"]) > max_trail:
-                buf["x"] = buf["x"][-max_trail:]
-                buf["y"] = buf["y"][-max_trail:]
+        # -=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
+        positions = trail_buffers.latest()
+        for i, body in enumerate(bodies):
+            state = body.StateProperties.orbit_state_at_time(sim_time)
+            if state is not None:
+                positions[i, 0] = state[0]
+                positions[i, 1] = state[1]
+
+        if update_trails:
+            trail_buffers.append(positions)
+            artists["trails"].set_segments(trail_buffers.segments())
+        artists["markers"].set_offsets(positions)
+
+    def update_performance_text(self, artists):
+        governor = self.governor
+
+        ratio_text = artists.get("ratio_text")
+        if ratio_text is not None:
+            ratio = governor.sim_wall_ratio()
+            ratio_text.set_text("Sim/Wall: --" if ratio is None else f"Sim/Wall: {ratio:.1f}x")
+
+        lag_text = artists.get("lag_text")
+        if lag_text is not None:
+            effective = abs(governor.effective_speed(self.speed))
+            lag_wall = governor.lag / effective if effective > 0.0 else 0.0
+            lag_text.set_text(f"Lag: {governor.lag:.2f} s ({lag_wall:.2f} s wall)")
+
+        frame_text = artists.get("frame_text")
+        if frame_text is not None:
+            p = governor.percentiles()
+            render_stride, trail_stride = governor.LEVELS[governor.level]
+            if p is None:
+                frame_text.set_text("Frame p50/95/99: --")
+            else:
+                frame_text.set_text(
+                    f"Frame p50/95/99: {1e3*p[0]:.1f}/{1e3*p[1]:.1f}/{1e3*p[2]:.1f} ms"
+                    f"  render 1/{render_stride} trail 1/{trail_stride}"
+                )
 
-            artists[name]["trail"].set_data(buf["x"], buf["y"])
-            artists[name]["marker"].set_offsets(np.array([[x, y]]))
+        warning_text = artists.get("warning_text")
+        if warning_text is not None:
+            warning_text.set_text(governor.warning or "")
+            warning_text.set_visible(governor.warning is not None)
 
-    def initialize_scene(self, bodyList):
+    def initialize_scene(self, bodyList, max_trail=200):
         """
         Build and return the plotting scene.
 
+        All trails share one LineCollection and all markers one PathCollection,
+        and both (plus the HUD text) are animated artists for blitting.
+
         Returns:
             fig_obj: StandardPlots.FigureObject
             ax: matplotlib Axes (fig_obj.ax)
-            artists: dict mapping names to artists and overlay text
-            trail_buffers: dict mapping body name -> {"x":[], "y":[]}
+            artists: dict of the trail/marker collections, overlay text and
+                     the "animated" list redrawn every frame
+            trail_buffers: TrailRingBuffer holding every body's trail
         """
+        # Plotting imports are deferred so headless runs never load matplotlib
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection
+        from matplotlib.markers import MarkerStyle
+        from matplotlib.patches import Circle
+        from matplotlib.widgets import TextBox
+        import ColorSchemeObjects
+        import StandardPlots
+
         plt.ion()
         fig = StandardPlots.FigureObject(
             ColorScheme=ColorSchemeObjects.VisualScheme_RetroMilitary
@@ -191,30 +469,44 @@ class RealTimePropagatorObject:
         sim_text = ax.text(
             0.02, 0.98, "Sim t: 0.00 s",
             transform=ax.transAxes, va="top", ha="left",
-            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2)
+            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2),
+            animated=True
         )
         speed_text = ax.text(
             0.02, 0.94, "Speed: 1.0x",
             transform=ax.transAxes, va="top", ha="left",
-            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2)
+            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2),
+            animated=True
         )
         wall_text = ax.text(
             0.02, 0.90, "Wall: 0.00 s",
             transform=ax.transAxes, va="top", ha="left",
-            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2)
+            color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2),
+            animated=True
         )
 
-        artists = {
-            "sim_time_text": sim_text,
-            "speed_text": speed_text,
-            "wall_time_text": wall_text,
-        }
+        # Performance HUD (see FrameGovernor)
+        ratio_text, lag_text, frame_text = [
+            ax.text(
+                0.02, y, text,
+                transform=ax.transAxes, va="top", ha="left",
+                color="white", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2),
+                animated=True
+            )
+            for y, text in ((0.86, "Sim/Wall: --"), (0.82, "Lag: --"), (0.78, "Frame p50/95/99: --"))
+        ]
+        warning_text = ax.text(
+            0.02, 0.74, "",
+            transform=ax.transAxes, va="top", ha="left",
+            color="red", fontsize=10, bbox=dict(facecolor="black", alpha=0.5, pad=2),
+            animated=True, visible=False
+        )
 
-        trail_buffers = {}
+        line_colors, line_widths = [], []
+        sizes, paths, face_colors, edge_colors = [], [], [], []
 
-        # Create per-body trail and marker artists
+        # Collect per-body styling
         for body in bodyList:
-            name = body.name
             VP = body.VisualProperties
 
             # Ensure visual properties exist and provide sane defaults
@@ -225,18 +517,13 @@ class RealTimePropagatorObject:
             body_color = getattr(VP, "bodyColor", "gray")
             edge_color = getattr(VP, "edgeColor", "white")
 
-            trail_buffers[name] = {"x": [], "y": []}
-
-            trail, = ax.plot([], [], color=line_color, linewidth=line_width, zorder=2)
-            marker = ax.scatter(
-                [0], [0],
-                s=size,
-                marker=icon,
-                facecolor=body_color,
-                edgecolor=edge_color,
-                linewidth=line_width,
-                zorder=3
-            )
+            marker = MarkerStyle(icon)
+            paths.append(marker.get_path().transformed(marker.get_transform()))
+            line_colors.append(line_color)
+            line_widths.append(line_width)
+            sizes.append(size)
+            face_colors.append(body_color)
+            edge_colors.append(edge_color)
 
             # Optionally draw physical body circle if radius present and > 0
             radius = getattr(body.PhysicalProperties, "radius", None)
@@ -252,7 +539,40 @@ class RealTimePropagatorObject:
                     )
                 )
 
-            artists[name] = {"trail": trail, "marker": marker}
+        trail_buffers = TrailRingBuffer(len(bodyList), max_trail)
+
+        trails = LineCollection(
+            [], colors=line_colors, linewidths=line_widths, zorder=2, animated=True
+        )
+        ax.add_collection(trails, autolim=False)
+
+        markers = ax.scatter(
+            np.zeros(len(bodyList)), np.zeros(len(bodyList)),
+            s=sizes,
+            facecolor=face_colors,
+            edgecolor=edge_colors,
+            linewidth=line_widths,
+            zorder=3,
+            animated=True
+        )
+        # One collection, one marker path per body
+        markers.set_paths(paths)
+
+        artists = {
+            "sim_time_text": sim_text,
+            "speed_text": speed_text,
+            "wall_time_text": wall_text,
+            "ratio_text": ratio_text,
+            "lag_text": lag_text,
+            "frame_text": frame_text,
+            "warning_text": warning_text,
+            "trails": trails,
+            "markers": markers,
+        }
+        artists["animated"] = [
+            trails, markers, sim_text, speed_text, wall_text,
+            ratio_text, lag_text, frame_text, warning_text
+        ]
 
         # -------------------------------
         # Command input box
@@ -260,7 +580,7 @@ class RealTimePropagatorObject:
         axbox = fig.figure.add_axes([0.1, 0.01, 0.8, 0.05])
         textbox = TextBox(axbox, "CMD: ")
         # parse expects a single text argument; keep behavior consistent
-        textbox.on_submit(self.CommandModule.parse_and_execute)
+        textbox.on_submit(self.submit_text)
         self.textbox = textbox
 
         # Final scene tweaks
@@ -268,15 +588,212 @@ class RealTimePropagatorObject:
         plt.show(block=False)
 
         return fig, ax, artists, trail_buffers
+
+
+class TrailRingBuffer:
+    """
+    Fixed-size trail history for every body at once.
+
+    Each sample is written twice, at i and i + capacity, so the latest
+    `capacity` samples are always one contiguous slice; segments() returns a
+    (bodies, n, 2) view with no copying or list slicing per frame.
+    """
+
+    def __init__(self, n_bodies, capacity):
+        self.capacity = int(capacity)
+        self._data = np.zeros((n_bodies, 2 * self.capacity, 2))
+        self._next = 0
+        self._count = 0
+
+    def append(self, positions):
+        self._data[:, self._next] = positions
+        self._data[:, self._next + self.capacity] = positions
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def latest(self):
+        """Copy of the most recent positions (zeros before the first append)."""
+        if self._count == 0:
+            return np.zeros((self._data.shape[0], 2))
+        return self._data[:, self._next + self.capacity - 1].copy()
+
+    def segments(self):
+        start = self._next + self.capacity - self._count
+        return self._data[:, start:start + self._count]
+
+
+class FrameGovernor:
+    """
+    Keeps the live loop inside its frame budget.
+
+    Each frame the propagator reports the wall time spent propagating,
+    running commands and rendering. From those the governor
+
+      - renders every render_stride-th frame and appends a trail sample every
+        trail_stride-th rendered frame, coarsening when the average frame
+        cost is over budget and refining again once it comfortably fits
+      - caps the effective speed when propagation cannot keep up: the worker
+        lags sim_time by more than max_lag wall seconds, or (without a
+        worker) propagating a frame takes longer than the whole budget
+      - reports the measured sim/wall ratio, the propagation lag and
+        frame-time percentiles for the HUD
+
+    budget     : wall seconds per frame
+    max_lag    : worker lag [wall s] at which the speed is capped
+    prop_share : share of the budget propagation may use without a worker
+    """
+
+    # (render_stride, trail_stride), cheapest last
+    LEVELS = [(1, 1), (1, 2), (1, 4), (2, 4), (3, 4), (4, 4)]
+
+    def __init__(self, budget=1/60, max_lag=0.5, prop_share=0.5, window=240):
+        self.budget = budget
+        self.max_lag = max_lag
+        self.prop_share = prop_share
+
+        self.level = 0
+        self.speed_cap = None
+        self.warning = None
+
+        self.timings = {"propagate": 0.0, "command": 0.0, "render": 0.0}
+        self.averages = dict(self.timings)      # EMA per category (render: rendered frames only)
+        self.frame_times = collections.deque(maxlen=window)
+        self.rates = collections.deque(maxlen=60)   # (dt_wall, dt_sim) of recent steps
+
+        self.lag = 0.0              # sim_time - propagated_time [sim s]
+        self.capacity = None        # sim seconds propagated per wall second
+        self._frame = 0
+        self._rendered = 0
+        self._last_change = 0
+        self._last_propagated = None
+
+    # --------------------------------------------------
+    # Measurement
+    # --------------------------------------------------
+    def record(self, category, seconds):
+        self.timings[category] += seconds
+
+    def plan_frame(self):
+        """(render, update_trails) for the coming frame."""
+        render_stride, trail_stride = self.LEVELS[self.level]
+        if self._frame % render_stride:
+            return False, False
+        self._rendered += 1
+        return True, self._rendered % trail_stride == 0
+
+    def end_frame(self):
+        timings = self.timings
+        self.frame_times.append(sum(timings.values()))
+
+        for category in ("propagate", "command"):
+            self.averages[category] += 0.1 * (timings[category] - self.averages[category])
+        if timings["render"] > 0.0:
+            self.averages["render"] += 0.1 * (timings["render"] - self.averages["render"])
+
+        self.timings = dict.fromkeys(timings, 0.0)
+        self._frame += 1
+        self._adjust_level()
+
+    def observe(self, dt_wall, dt_sim, sim_time, propagated_time, speed, worker):
+        """Update lag, ratio and speed cap after a running step()."""
+        self.rates.append((dt_wall, dt_sim))
+        self.lag = max(sim_time - propagated_time, 0.0)
+        effective = self.effective_speed(speed)
+
+        if worker:
+            # Worker progress only measures capacity while it is saturated
+            if self._last_propagated is not None and self.lag > 0.0 and dt_wall > 0.0:
+                self._update_capacity((propagated_time - self._last_propagated) / dt_wall)
+            self._last_propagated = propagated_time
+            overloaded = self.lag > self.max_lag * abs(effective)
+            relaxed = self.lag == 0.0
+            sustainable = 0.9 * self.capacity if self.capacity else 0.5 * abs(effective)
+        else:
+            t_prop = self.averages["propagate"]
+            if self.timings["propagate"] > 0.0 and dt_sim != 0.0:
+                self._update_capacity(abs(dt_sim) / self.timings["propagate"])
+            overloaded = t_prop > self.budget
+            relaxed = t_prop < 0.5 * self.prop_share * self.budget
+            sustainable = self.prop_share * self.capacity if self.capacity else 0.5 * abs(effective)
+
+        if overloaded and effective != 0.0:
+            cap = min(abs(effective), sustainable)
+            if self.speed_cap is None:
+                print(f"Governor: propagation cannot keep up at {abs(speed):.1f}x, speed capped at {cap:.1f}x")
+            self.speed_cap = cap
+        elif relaxed and self.speed_cap is not None:
+            # Back up to the measured capacity quickly, then probe past it slowly
+            if self.speed_cap < sustainable:
+                self.speed_cap = min(1.02 * self.speed_cap, sustainable)
+            else:
+                self.speed_cap *= 1.002
+            if self.speed_cap >= abs(speed):
+                self.speed_cap = None
+
+        if self.speed_cap is not None:
+            self.warning = f"Propagation behind: speed capped at {self.speed_cap:.1f}x (requested {speed:.1f}x)"
+        else:
+            self.warning = None
+
+    def _update_capacity(self, rate):
+        if self.capacity is None:
+            self.capacity = rate
+        else:
+            self.capacity += 0.05 * (rate - self.capacity)
+
+    def _adjust_level(self):
+        # Level changes are spaced out so each is judged on settled averages
+        if self._frame - self._last_change < 30:
+            return
+
+        def cost(level):
+            return self.averages["propagate"] + self.averages["command"] + self.averages["render"] / self.LEVELS[level][0]
+
+        if cost(self.level) > self.budget and self.level < len(self.LEVELS) - 1:
+            self.level += 1
+            self._last_change = self._frame
+        elif self.level > 0 and cost(self.level - 1) < 0.7 * self.budget:
+            self.level -= 1
+            self._last_change = self._frame
+
+    # --------------------------------------------------
+    # Results
+    # --------------------------------------------------
+    def effective_speed(self, speed):
+        """Requested speed limited to the cap (sign kept)."""
+        if self.speed_cap is None or abs(speed) <= self.speed_cap:
+            return speed
+        return float(np.copysign(self.speed_cap, speed))
+
+    def sim_wall_ratio(self):
+        wall = sum(dt_wall for dt_wall, _ in self.rates)
+        if wall <= 0.0:
+            return None
+        return sum(dt_sim for _, dt_sim in self.rates) / wall
+
+    def percentiles(self, q=(50, 95, 99)):
+        """Frame-time percentiles [s] over the recent window (None before any frame)."""
+        if not self.frame_times:
+            return None
+        return np.percentile(np.fromiter(self.frame_times, dtype=float), q)
+
+    def reset_rate(self):
+        """Forget step history across a pause, so the ratio and capacity restart."""
+        self.rates.clear()
+        self._last_propagated = None
+
+
 def initialize_heap(bodyList):
     pq = []
     uid = 0
     for body in bodyList:
+        ObjectModels.adopt_ephemeris(body)
         IP = body.IntegratorProperties.orbit
         if IP.integrator is None:
             continue
 
         SP = body.StateProperties
+        StepControlModels.ensure_step(IP, SP.orbit_stateCurrent, SP.orbit_latest_time, "orbit")
         next_time = SP.orbit_latest_time + IP.dt
         heapq.heappush(pq, (next_time, uid, body))
         uid += 1
@@ -292,43 +809,55 @@ def propagate_until(bodyList, pq, uid, t_target):
             uid += 1
             break
 
-        IP = body.IntegratorProperties.orbit
-        SP = body.StateProperties
-
-        t_body = SP.orbit_latest_time
-        dt = next_time - t_body
+        step_body(body, next_time - body.StateProperties.orbit_latest_time)
 
-        if SP.collided:
-            new_state = SP.orbit_stateCurrent.copy()
-            t_new = next_time
-        else:
-            integrator = IP.integrator
-            dynamics = IP.dynamics
-            state = SP.orbit_state_at_time(t_body)
-
-            if IP.integrator.adaptive:
-                dt_try = dt
-                while True:
-                    new_state, err, tol = integrator.step(
-                        dynamics, state, t_body, dt_try,
-                        IP.absTol, IP.relTol
-                    )
-                    if err <= tol:
-                        break
-                    dt_try = max(IP.dt_min, 0.5 * dt_try)
-
-                t_new = t_body + dt_try
-                if err < 0.1 * tol:
-                    dt_try = min(IP.dt_max, 1.5 * dt_try)
-                IP.dt = dt_try
-            else:
-                new_state = integrator.step(dynamics, state, t_body, dt)
-                t_new = t_body + dt
-
-        SP.set_orbitState(t_new, new_state)
-        next_time = SP.orbit_latest_time + IP.dt
+        next_time = body.StateProperties.orbit_latest_time + body.IntegratorProperties.orbit.dt
         # print(f"Body : {body.name} : Time : {next_time} : POS : {body.StateProperties.orbit_stateCurrent}")
         heapq.heappush(pq, (next_time, uid, body))
         uid += 1
 
     return pq, uid
+
+def step_body(body, dt):
+    """Take one orbit step of (at most) dt; adaptive steps may come up short."""
+    IP = body.IntegratorProperties.orbit
+    SP = body.StateProperties
+
+    t_body = SP.orbit_latest_time
+
+    if SP.collided or SP.halt_time is not None:
+        new_state = SP.orbit_stateCurrent.copy()
+        t_new = t_body + dt
+    else:
+        integrator = IP.integrator
+        dynamics = IP.dynamics
+        state = SP.orbit_state_at_time(t_body)
+
+        if IP.integrator.adaptive:
+            new_state, dt_taken = StepControlModels.adaptive_step(IP, dynamics, state, t_body, dt, "orbit")
+            t_new = t_body + dt_taken
+        else:
+            new_state = integrator.step(dynamics, state, t_body, dt)
+            t_new = t_body + dt
+
+        # A cut step ends at the event, where handle_events stored the state
+        if IP.events and EventModels.handle_events(body, IP.events, dynamics, t_body, state, t_new, new_state) is not None:
+            return
+
+    SP.set_orbitState(t_new, new_state)
+
+def sync_bodies_to(bodyList, t):
+    """Bring every propagated body to exactly time t (cutting back any lookahead)."""
+    for body in bodyList:
+        IP = body.IntegratorProperties.orbit
+        if IP.integrator is None:
+            continue
+
+        SP = body.StateProperties
+        if SP.orbit_latest_time > t:
+            SP.truncate_after(t)
+
+        StepControlModels.ensure_step(IP, SP.orbit_stateCurrent, SP.orbit_latest_time, "orbit")
+        while SP.orbit_latest_time < t:
+            # adaptive_step keeps the natural step size across the shortened final step
+            step_body(body, min(IP.dt, t - SP.orbit_latest_time))
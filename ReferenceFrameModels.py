@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import numpy as np
 
 ## Reference Frames
@@ -10,6 +11,28 @@ class ReferenceFrame:
         
     def transform_state(self, state, time):
         raise NotImplementedError
+
+    def transform_history(self, times, states):
+        """
+        Transform a whole (N, 6) history at (N,) times.
+
+        Subclasses override this with a vectorized version; the fallback
+        just loops over transform_state.
+        """
+        times = np.asarray(times, dtype=float)
+        states = np.asarray(states, dtype=float)
+        return np.vstack([self.transform_state(x, t) for x, t in zip(states, times)])
+
+    def affine_history(self, times):
+        """
+        The transform as x' = A x + b at every time: A (N, 6, 6), b (N, 6).
+        Used by FrameGraph to compose frames into one operation per time.
+        """
+        raise NotImplementedError
+
+    def source_bodies(self):
+        """Bodies whose histories this frame reads."""
+        return []
     
 class BodyCenteredInertialFrame(ReferenceFrame):
     def __init__(self, body):
@@ -23,8 +46,9 @@ class BodyCenteredInertialFrame(ReferenceFrame):
         r = state[0:3]
         v = state[3:6]
 
-        r_body = self.body.StateProperties.state_at_time(time)[0:3]
-        v_body = self.body.StateProperties.state_at_time(time)[3:6]
+        body_state = self.body.StateProperties.orbit_state_at_time(time)
+        r_body = body_state[0:3]
+        v_body = body_state[3:6]
 
         r_new = r - r_body
         v_new = v - v_body
@@ -32,6 +56,20 @@ class BodyCenteredInertialFrame(ReferenceFrame):
 
         return np.hstack((r_new, v_new))
 
+    def transform_history(self, times, states):
+        states = np.asarray(states, dtype=float)
+        body_states = self.body.StateProperties.orbit_states_at_times(times)
+        return states[:, 0:6] - body_states[:, 0:6]
+
+    def affine_history(self, times):
+        times = np.asarray(times, dtype=float)
+        body_states = self.body.StateProperties.orbit_states_at_times(times)
+        A = np.broadcast_to(np.eye(6), (len(times), 6, 6)).copy()
+        return A, -body_states[:, 0:6]
+
+    def source_bodies(self):
+        return [self.body]
+
 class BodyFixedFrame(ReferenceFrame):
     def __init__(self, body, omega):
         self.body = body
@@ -41,7 +79,7 @@ class BodyFixedFrame(ReferenceFrame):
         r = state[0:3]
         v = state[3:6]
 
-        body_state = self.body.StateProperties.state_at_time(time)
+        body_state = self.body.StateProperties.orbit_state_at_time(time)
         r_body = body_state[0:3]
         v_body = body_state[3:6]
 
@@ -60,6 +98,28 @@ class BodyFixedFrame(ReferenceFrame):
 
         return np.hstack((r_rot, v_rot))
 
+    def transform_history(self, times, states):
+        times = np.asarray(times, dtype=float)
+        states = np.asarray(states, dtype=float)
+
+        body_states = self.body.StateProperties.orbit_states_at_times(times)
+        r_rel = states[:, 0:3] - body_states[:, 0:3]
+        v_rel = states[:, 3:6] - body_states[:, 3:6]
+
+        R = Rz_batch(np.linalg.norm(self.omega) * times)
+        r_rot = np.einsum("nij,nj->ni", R, r_rel)
+        v_rot = np.einsum("nij,nj->ni", R, v_rel - np.cross(self.omega, r_rel))
+
+        return np.hstack((r_rot, v_rot))
+
+    def affine_history(self, times):
+        times = np.asarray(times, dtype=float)
+        body_states = self.body.StateProperties.orbit_states_at_times(times)
+        return rotating_affine(Rz_batch(np.linalg.norm(self.omega) * times), self.omega, body_states[:, 0:6])
+
+    def source_bodies(self):
+        return [self.body]
+
 class TwoBodySynodicFrame(ReferenceFrame):
     def __init__(self, primary, secondary):
         """
@@ -73,19 +133,31 @@ class TwoBodySynodicFrame(ReferenceFrame):
 
     def barycenter(self, time):
         """Compute the center of mass of the two bodies at the given time."""
-        r1 = self.primary.StateProperties.state_at_time(time)[0:3]
-        r2 = self.secondary.StateProperties.state_at_time(time)[0:3]
+        return self.barycenter_state(time)[0:3]
+
+    def barycenter_state(self, time):
+        """Barycentre position and velocity (6,), querying each body once."""
+        s1 = self.primary.StateProperties.orbit_state_at_time(time)[0:6]
+        s2 = self.secondary.StateProperties.orbit_state_at_time(time)[0:6]
+        m1 = self.primary.PhysicalProperties.mass
+        m2 = self.secondary.PhysicalProperties.mass
+        return (m1 * s1 + m2 * s2) / (m1 + m2)
+
+    def barycenter_history(self, times):
+        """Barycentre position and velocity at every time: (N, 6)."""
+        s1 = self.primary.StateProperties.orbit_states_at_times(times)[:, 0:6]
+        s2 = self.secondary.StateProperties.orbit_states_at_times(times)[:, 0:6]
         m1 = self.primary.PhysicalProperties.mass
         m2 = self.secondary.PhysicalProperties.mass
-        return (m1 * r1 + m2 * r2) / (m1 + m2)
+        return (m1 * s1 + m2 * s2) / (m1 + m2)
 
     def transform_state(self, state, time):
         r = state[0:3]
         v = state[3:6]
 
         # Position relative to barycenter
-        r_bary = self.barycenter(time)
-        r_rel = r - r_bary
+        bary = self.barycenter_state(time)
+        r_rel = r - bary[0:3]
         
         # Rotation matrix from angular velocity vector
         theta = np.linalg.norm(self.omega) * time
@@ -95,25 +167,136 @@ class TwoBodySynodicFrame(ReferenceFrame):
         r_rot = R @ r_rel
 
         # Velocity in rotating frame
-        v1 = self.primary.StateProperties.state_at_time(time)[3:6]
-        v2 = self.secondary.StateProperties.state_at_time(time)[3:6]
-        v_bary = (self.primary.PhysicalProperties.mass * v1 + self.secondary.PhysicalProperties.mass * v2) / (self.primary.PhysicalProperties.mass + self.secondary.PhysicalProperties.mass)
-
-        v_rel = v - v_bary
+        v_rel = v - bary[3:6]
         v_rot = R @ (v_rel - np.cross(self.omega, r_rel))
 
         return np.hstack((r_rot, v_rot))
 
+    def transform_history(self, times, states):
+        times = np.asarray(times, dtype=float)
+        states = np.asarray(states, dtype=float)
+
+        bary = self.barycenter_history(times)
+        r_rel = states[:, 0:3] - bary[:, 0:3]
+        v_rel = states[:, 3:6] - bary[:, 3:6]
+
+        R = Rz_batch(np.linalg.norm(self.omega) * times)
+        r_rot = np.einsum("nij,nj->ni", R, r_rel)
+        v_rot = np.einsum("nij,nj->ni", R, v_rel - np.cross(self.omega, r_rel))
+
+        return np.hstack((r_rot, v_rot))
+
+    def affine_history(self, times):
+        times = np.asarray(times, dtype=float)
+        return rotating_affine(Rz_batch(np.linalg.norm(self.omega) * times), self.omega, self.barycenter_history(times))
+
+    def source_bodies(self):
+        return [self.primary, self.secondary]
+
+
+
+
+
+
+
+
+
 
 
 
 
+## Frame Graph
+class FrameGraph:
+    """
+    Tree of reference frames rooted at the inertial frame.
 
+    graph = FrameGraph()
+    graph.add_frame("ECI", BodyCenteredInertialFrame(Earth))
+    graph.add_frame("EarthMoonRot", TwoBodySynodicFrame(Earth, Moon))
 
+    Each node's frame is applied to the output of its parent, like
+    apply_frames along the path from the root. The path is composed into a
+    single x' = A x + b per time, which is cached per (frame, time grid) and
+    shared by every trajectory drawn on the same times. An entry is dropped
+    when the history_version of any body the path reads has changed.
+    """
 
+    ROOT = "inertial"
 
+    def __init__(self, max_cache=32):
+        self._frames = {}
+        self._parents = {}
+        self._cache = OrderedDict()
+        self.max_cache = max_cache
+        self.hits = 0
+        self.misses = 0
 
+    def add_frame(self, name, frame, parent=ROOT):
+        if name == self.ROOT or name in self._frames:
+            raise ValueError(f"frame already defined: {name}")
+        if parent != self.ROOT and parent not in self._frames:
+            raise ValueError(f"unknown parent frame: {parent}")
+        self._frames[name] = frame
+        self._parents[name] = parent
+        return frame
 
+    def path(self, name):
+        """Frames applied from the root to `name`, in order."""
+        frames = []
+        while name != self.ROOT:
+            if name not in self._frames:
+                raise ValueError(f"unknown frame: {name}")
+            frames.append(self._frames[name])
+            name = self._parents[name]
+        return frames[::-1]
+
+    def affine(self, name, times):
+        """Composed (A, b) taking inertial states to frame `name` at `times`."""
+        times = np.ascontiguousarray(times, dtype=float)
+        frames = self.path(name)
+        versions = tuple(
+            getattr(body.StateProperties, "history_version", 0)
+            for frame in frames for body in frame.source_bodies()
+        )
+
+        key = (name, len(times), hash(times.tobytes()))
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == versions and np.array_equal(entry[1], times):
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+        self.misses += 1
+        A = np.broadcast_to(np.eye(6), (len(times), 6, 6)).copy()
+        b = np.zeros((len(times), 6))
+        for frame in frames:
+            A_f, b_f = frame.affine_history(times)
+            A = np.einsum("nij,njk->nik", A_f, A)
+            b = np.einsum("nij,nj->ni", A_f, b) + b_f
+
+        self._cache[key] = (versions, times.copy(), A, b)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+        return A, b
+
+    def transform_history(self, name, times, states):
+        A, b = self.affine(name, times)
+        states = np.asarray(states, dtype=float)[:, 0:6]
+        return np.einsum("nij,nj->ni", A, states) + b
+
+    def transform_body(self, name, body, times=None):
+        """A body's orbit history (or its states at `times`) in frame `name`."""
+        SP = body.StateProperties
+        if times is None:
+            times = SP.orbit_times
+            states = SP.orbit_stateHistory
+        else:
+            states = SP.orbit_states_at_times(times)
+        return self.transform_history(name, times, states)
+
+    def clear_cache(self):
+        self._cache.clear()
 
 
 ## Methods
@@ -122,6 +305,30 @@ def apply_frames(state, time, frames):
         state = frame.transform_state(state, time)
     return state
 
+def apply_frames_history(times, states, frames):
+    """apply_frames for a whole (N, 6) history at (N,) times."""
+    for frame in frames:
+        states = frame.transform_history(times, states)
+    return states
+
+def rotating_affine(R, omega, origin):
+    """
+    Affine form of r' = R (r - r0), v' = R (v - v0 - omega x (r - r0)).
+
+    R (N, 3, 3), omega (3,), origin (N, 6) -> A (N, 6, 6), b (N, 6)
+    """
+    W = np.array([
+        [0.0, -omega[2], omega[1]],
+        [omega[2], 0.0, -omega[0]],
+        [-omega[1], omega[0], 0.0],
+    ])
+    A = np.zeros((len(R), 6, 6))
+    A[:, 0:3, 0:3] = R
+    A[:, 3:6, 3:6] = R
+    A[:, 3:6, 0:3] = -R @ W
+    b = -np.einsum("nij,nj->ni", A, origin)
+    return A, b
+
 def Rx(theta):
     c, s = np.cos(theta), np.sin(theta)
     return np.array([
@@ -144,4 +351,16 @@ def Rz(theta):
         [ c, -s, 0],
         [ s,  c, 0],
         [ 0,  0, 1]
-    ])
\ No newline at end of file
+    ])
+
+def Rz_batch(theta):
+    """Rz for an array of angles: (N,) -> (N, 3, 3)."""
+    theta = np.asarray(theta, dtype=float)
+    c, s = np.cos(theta), np.sin(theta)
+    R = np.zeros(theta.shape + (3, 3))
+    R[..., 0, 0] = c
+    R[..., 0, 1] = -s
+    R[..., 1, 0] = s
+    R[..., 1, 1] = c
+    R[..., 2, 2] = 1.0
+    return R
@@ -0,0 +1,613 @@
+import heapq
+import io
+import math
+import multiprocessing
+import pickle
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import PropagatorModels
+
+
+# ======================================================
+# Dependency Graph
+# ======================================================
+def references(body, bodyList):
+    """
+    Bodies whose states `body`'s propagation reads.
+
+    Returns (orbit_reads, state_reads): force targets, event bodies and
+    collision candidates only read orbits; torque targets may read either
+    history. Events without declared bodies are assumed to read every body.
+    """
+    IP = body.IntegratorProperties
+    orbit_reads = []
+    state_reads = []
+
+    if IP.orbit.is_propagated:
+        for force in getattr(IP.orbit.dynamics, "forces", None) or []:
+            target = getattr(force, "body", None)
+            if target is not None:
+                orbit_reads.append(target)
+
+        for event in IP.orbit.events:
+            orbit_reads.extend(bodyList if event.bodies is None else event.bodies)
+
+        orbit_reads.extend(PropagatorModels.collision_candidates(body, bodyList))
+
+    if IP.attitude.is_propagated:
+        for torque in getattr(IP.attitude.dynamics, "torques", None) or []:
+            target = getattr(torque, "body", None)
+            if target is not None:
+                state_reads.append(target)
+
+    return orbit_reads, state_reads
+
+def dependency_graph(bodyList):
+    """
+    {body: [bodies it depends on]} for every propagated body.
+
+    Only reads of histories that change during the run count: static and
+    ephemeris bodies (and the orbit of a body that only propagates its
+    attitude) can be read from any thread at any time.
+    """
+    graph = {}
+    for body in bodyList:
+        if not _is_propagated(body):
+            continue
+
+        orbit_reads, state_reads = references(body, bodyList)
+        depends = []
+        for target in orbit_reads:
+            if target is not body and target.IntegratorProperties.orbit.is_propagated:
+                depends.append(target)
+        for target in state_reads:
+            if target is not body and _is_propagated(target):
+                depends.append(target)
+
+        graph[body] = list(dict.fromkeys(depends))
+    return graph
+
+def can_read_ahead(body):
+    """
+    True if other bodies may read `body` after it has moved past them (see
+    independent_groups): its samples are only ever appended, so capping
+    reads at how far it had got gives back what the serial loop showed.
+    Decimated, archived and extrapolated histories, and orbits that events
+    can override, change behind the reader.
+    """
+    SP = body.StateProperties
+    return (
+        SP.extrapolator is None
+        and not body.IntegratorProperties.orbit.events
+        and SP._orbit_decimator is None and SP._attitude_decimator is None
+        and SP._orbit_archive is None and SP._attitude_archive is None
+    )
+
+def independent_groups(bodyList, graph=None):
+    """
+    Split the propagated bodies into groups that run their own sync loops,
+    in bodyList order.
+
+    Bodies that read each other share a group. Reading a body that can be
+    read ahead (can_read_ahead) only orders the groups (group_levels), so
+    vehicles that all read a propagated planet run side by side once the
+    planet has reached the window end. With extrapolation anywhere in the
+    run, rollbacks reorder the serial schedule and every read joins groups
+    (connected components of the dependency graph).
+    """
+    if graph is None:
+        graph = dependency_graph(bodyList)
+
+    read_ahead = all(body.StateProperties.extrapolator is None for body in bodyList)
+    parent = {id(body): id(body) for body in graph}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    ordered = []
+    for body, depends in graph.items():
+        for target in depends:
+            if id(target) not in parent:
+                continue
+            if read_ahead and can_read_ahead(target):
+                ordered.append((id(body), id(target)))
+            else:
+                parent[find(id(body))] = find(id(target))
+
+    # Groups that read each other ahead still have to share a loop
+    edges = {}
+    for key, target in ordered:
+        if find(key) != find(target):
+            edges.setdefault(find(key), set()).add(find(target))
+    for cycle in _cycles(edges):
+        for key in cycle[1:]:
+            parent[find(key)] = find(cycle[0])
+
+    groups = {}
+    for body in bodyList:
+        if body in graph:
+            groups.setdefault(find(id(body)), []).append(body)
+    return list(groups.values())
+
+def group_levels(groups, graph):
+    """
+    (levels, sources): sources[i] lists the bodies of other groups that
+    group i reads, and levels[i] is 0 for a group reading none, else one
+    more than the highest level it reads. Within a window a level starts
+    once every lower level has reached the window end.
+    """
+    group_of = {id(body): i for i, group in enumerate(groups) for body in group}
+
+    sources = []
+    for i, group in enumerate(groups):
+        found = []
+        for body in group:
+            for target in graph[body]:
+                if group_of.get(id(target), i) != i and target not in found:
+                    found.append(target)
+        sources.append(found)
+
+    levels = [None] * len(groups)
+
+    def level(i):
+        if levels[i] is None:
+            levels[i] = 1 + max((level(group_of[id(source)]) for source in sources[i]), default=-1)
+        return levels[i]
+
+    return [level(i) for i in range(len(groups))], sources
+
+def _cycles(edges):
+    """Sets of nodes on a common cycle of {node: {nodes}}, as lists."""
+    reach = {}
+    for start in edges:
+        seen = set()
+        stack = [start]
+        while stack:
+            for node in edges.get(stack.pop(), ()):
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        reach[start] = seen
+
+    cycles = []
+    done = set()
+    for node in edges:
+        if node in done or node not in reach[node]:
+            continue
+        cycle = [other for other in edges if other in reach[node] and node in reach[other]]
+        done.update(cycle)
+        cycles.append(cycle)
+    return cycles
+
+def _is_propagated(body):
+    IP = body.IntegratorProperties
+    return IP.orbit.is_propagated or IP.attitude.is_propagated
+
+
+# ======================================================
+# Serial Schedule
+# ======================================================
+def serial_schedule(pq, uid, t_end):
+    """
+    Replay the serial loop's heap from (pq, uid) up to t_end.
+
+    Returns (order, heap, uid): the syncs it runs as (t_target, body), and
+    the heap and uid it leaves. Bodies stopped by a terminal event stay
+    scheduled here, which leaves the order of everything else unchanged.
+    """
+    heap = list(pq)
+    heapq.heapify(heap)
+    order = []
+    while heap and heap[0][0] <= t_end:
+        t_target, _, body = heapq.heappop(heap)
+        order.append((t_target, body))
+        heapq.heappush(heap, (t_target + body.IntegratorProperties.sync_dt, uid, body))
+        uid += 1
+    return order, heap, uid
+
+def read_limits(order, groups, sources):
+    """
+    Per group, {(body, t_target): {StateProperties: (t_orbit, t_attitude)}}
+    for the syncs in `order`: how far the serial loop had propagated each
+    body of another group that the sync reads (see ObjectModels.read_limits).
+    """
+    group_of = {id(body): i for i, group in enumerate(groups) for body in group}
+
+    reached = {}
+    for found in sources:
+        for source in found:
+            SP = source.StateProperties
+            IP = source.IntegratorProperties
+            reached[id(source)] = [
+                SP.orbit_latest_time if IP.orbit.is_propagated else math.inf,
+                SP.attitude_latest_time if IP.attitude.is_propagated else math.inf,
+            ]
+
+    limits = [{} for _ in groups]
+    for t_target, body in order:
+        i = group_of[id(body)]
+        if sources[i]:
+            limits[i][(body, t_target)] = {
+                source.StateProperties: tuple(reached[id(source)]) for source in sources[i]
+            }
+        progress = reached.get(id(body))
+        if progress is not None:
+            progress[0] = max(progress[0], t_target)
+            progress[1] = max(progress[1], t_target)
+    return limits
+
+
+# ======================================================
+# Parallel Sync Loop
+# ======================================================
+def iterate_parallel_sync_loop(bodyList, pq, uid, t_end, workers, executor="process",
+                               checkpoint=None, window=None):
+    """
+    Parallel form of PropagatorModels.iterate_sync_loop.
+
+    Groups of bodies (independent_groups) run their own sync loops
+    concurrently, level by level within each window (group_levels): a group
+    reading other groups starts once they have reached the window end, and
+    its reads are capped at what the serial loop would have shown it
+    (read_limits). Each group's loop sees the heap order the serial loop
+    would give its bodies, so every history is bit-for-bit the serial one.
+
+    executor : "process" - each group is loaded into a worker process once
+                           and stays there; per window only heap entries,
+                           new samples and changed attributes travel (groups
+                           that cannot be pickled, e.g. with closures in
+                           events, or that keep a compact archive, run on
+                           threads instead)
+               "thread"  - groups share the interpreter (helps when the
+                           force models spend their time in numpy)
+    window   : sim seconds between merges; checkpoints are only written at
+               window ends (default: checkpoint.every_sim, else the whole run)
+
+    Yields (t_target, body) after each window, ordered by time, then group.
+    """
+    if executor not in ("process", "thread"):
+        raise ValueError(f"unknown executor: {executor}")
+
+    graph = dependency_graph(bodyList)
+    groups = independent_groups(bodyList, graph)
+    levels, sources = group_levels(groups, graph)
+    group_of = {id(body): i for i, group in enumerate(groups) for body in group}
+    read_ahead = any(sources)
+
+    if window is None and checkpoint is not None:
+        window = checkpoint.every_sim
+
+    threads = ThreadPoolExecutor(max_workers=workers)
+    processes = None
+    if executor == "process" and len(groups) > 1:
+        processes = _ResidentWorkers(bodyList, groups, levels, sources, workers)
+
+    try:
+        # Start of the run: the time the queued syncs were scheduled from
+        t_reached = min((t - body.IntegratorProperties.sync_dt for t, _, body in pq), default=t_end)
+        if checkpoint is not None:
+            checkpoint.maybe_save(bodyList, pq, uid, t_reached)
+
+        while pq and pq[0][0] <= t_end:
+            t_window = t_end if window is None else min(t_end, t_reached + window)
+
+            limits = [None] * len(groups)
+            if read_ahead:
+                order, serial_pq, serial_uid = serial_schedule(pq, uid, t_window)
+                limits = read_limits(order, groups, sources)
+
+            parts = [[] for _ in groups]
+            for entry in pq:
+                parts[group_of[id(entry[2])]].append(entry)
+
+            results = [None] * len(groups)
+            for level in sorted(set(levels)):
+                running = []
+                for i, entries in enumerate(parts):
+                    if not entries or levels[i] != level:
+                        continue
+                    if processes is not None and processes.load(i):
+                        running.append((i, processes.submit(i, entries, uid, t_window, limits[i])))
+                    else:
+                        running.append((i, threads.submit(_run_group, bodyList, entries, uid, t_window, limits[i])))
+                for i, future in running:
+                    results[i] = future.result()
+
+            pq = []
+            synced = []
+            for i, result in enumerate(results):
+                if result is None:
+                    continue
+                entries, group_synced = result
+                pq.extend((t, entry_uid, i, body) for t, entry_uid, body in entries)
+                synced.extend((t, i, n, body) for n, (t, body) in enumerate(group_synced))
+
+            if read_ahead:
+                # Number the heap as the serial loop leaves it
+                serial_uids = {id(body): entry_uid for _, entry_uid, body in serial_pq}
+                pq = [(t, serial_uids[id(body)], body) for t, _, _, body in pq]
+                heapq.heapify(pq)
+                uid = serial_uid
+            else:
+                # Deterministic merge: renumber the heap in (time, uid, group) order
+                pq.sort(key=lambda entry: entry[0:3])
+                pq = [(t, n, body) for n, (t, _, _, body) in enumerate(pq)]
+                uid = len(pq)
+
+            synced.sort(key=lambda item: item[0:3])
+            t_reached = t_window
+
+            if checkpoint is not None:
+                checkpoint.maybe_save(bodyList, pq, uid, synced[-1][0] if synced else t_window)
+
+            for t, _, _, body in synced:
+                yield t, body
+    finally:
+        threads.shutdown()
+        if processes is not None:
+            processes.shutdown()
+
+def _run_group(bodyList, entries, uid, t_end, limits=None):
+    pq = list(entries)
+    heapq.heapify(pq)
+    synced = list(PropagatorModels.iterate_sync_loop(bodyList, pq, uid, t_end, read_limits=limits))
+    return pq, synced
+
+
+# ======================================================
+# Process Workers
+# ======================================================
+# A group travels to its worker once, as an ordinary pickle of the group
+# plus every body it reads. After each window the members come back as
+# their __dict__s, with bodies, StateProperties and sample lists replaced
+# by references to the originals, so the merge updates the original
+# objects in place and only the changed samples are copied.
+
+_HISTORIES = ("orbit", "attitude", "stm")
+
+class _ResidentWorkers:
+    """
+    Worker processes that keep their groups between windows.
+
+    Each level's groups are spread over the processes. Per window a group
+    gets its heap entries, read limits and the samples other groups'
+    bodies gained since the last window, and sends back its members'
+    attributes and the samples that changed (StateProperties.history_changes).
+    """
+
+    def __init__(self, bodyList, groups, levels, sources, workers):
+        self.bodyList = bodyList
+        self.groups = groups
+        self.sources = sources
+
+        # group -> its worker body list (None: runs on threads)
+        self.bodies = {}
+        # group -> {(source index, history): samples the worker holds}
+        self.sent = {}
+
+        context = multiprocessing.get_context()
+        self.pipes = []
+        self.processes = []
+        for _ in range(min(workers, len(groups))):
+            pipe, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.pipes.append(pipe)
+            self.processes.append(process)
+
+        self.host = {}
+        for level in set(levels):
+            members = [i for i, group_level in enumerate(levels) if group_level == level]
+            for n, i in enumerate(members):
+                self.host[i] = n % len(self.pipes)
+
+    def load(self, i):
+        """Ship group i to its process the first time; False if it runs on threads."""
+        if i in self.bodies:
+            return self.bodies[i] is not None
+
+        group = self.groups[i]
+        bodies = _worker_bodies(self.bodyList, group)
+        payload = None
+        if not any(_has_archive(body) for body in group):
+            index = {id(body): n for n, body in enumerate(bodies)}
+            try:
+                payload = pickle.dumps((bodies, [index[id(body)] for body in group]),
+                                       protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                payload = None
+
+        if payload is None:
+            self.bodies[i] = None
+            return False
+
+        self.bodies[i] = bodies
+        self.sent[i] = {
+            (bodies.index(source), history): len(getattr(source.StateProperties, f"_{history}_times"))
+            for source in self.sources[i]
+            for history in ("orbit", "attitude")
+        }
+        self.pipes[self.host[i]].send(("load", i, payload))
+        return True
+
+    def submit(self, i, entries, uid, t_end, limits):
+        bodies = self.bodies[i]
+        index = {id(body): n for n, body in enumerate(bodies)}
+
+        updates = []
+        for source in self.sources[i]:
+            n = index[id(source)]
+            SP = source.StateProperties
+            tails = {}
+            for history in ("orbit", "attitude"):
+                count = self.sent[i][(n, history)]
+                times = getattr(SP, f"_{history}_times")
+                if len(times) > count:
+                    tails[history] = (times[count:], getattr(SP, f"_{history}_states")[count:])
+                    self.sent[i][(n, history)] = len(times)
+            scalars = {
+                name: getattr(SP, name)
+                for name in ("_orbit_stateCurrent", "_attitude_stateCurrent", "collided", "halt_time", "history_version")
+            }
+            updates.append((n, tails, scalars))
+
+        heap = [(t, entry_uid, index[id(body)]) for t, entry_uid, body in entries]
+        if limits:
+            positions = {id(body.StateProperties): n for n, body in enumerate(bodies)}
+            limits = {
+                (index[id(body)], t): {positions[id(SP)]: caps for SP, caps in caps_by_source.items()}
+                for (body, t), caps_by_source in limits.items()
+            }
+
+        pipe = self.pipes[self.host[i]]
+        pipe.send(("run", i, (heap, uid, t_end, limits, updates)))
+        return _Reply(self, i, pipe)
+
+    def merge(self, i, data):
+        group = self.groups[i]
+        bodies = self.bodies[i]
+
+        def persistent_load(ref):
+            kind, n, name = ref
+            if kind == "body":
+                return bodies[n]
+            if kind == "state":
+                return group[n].StateProperties
+            return getattr(group[n].StateProperties, name)
+
+        unpickler = pickle.Unpickler(io.BytesIO(data))
+        unpickler.persistent_load = persistent_load
+        states, changes, heap, synced = unpickler.load()
+
+        for body, (body_state, state) in zip(group, states):
+            body.__dict__.update(body_state)
+            body.StateProperties.__dict__.update(state)
+        for n, history, (t_from, times, samples) in changes:
+            group[n].StateProperties.apply_history_changes(history, t_from, times, samples)
+        for body in group:
+            body.StateProperties._changed_from = None
+
+        return (
+            [(t, entry_uid, bodies[n]) for t, entry_uid, n in heap],
+            [(t, bodies[n]) for t, n in synced],
+        )
+
+    def shutdown(self):
+        for pipe in self.pipes:
+            try:
+                pipe.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            pipe.close()
+        for process in self.processes:
+            process.join()
+
+class _Reply:
+    """Future-like handle for a group running in a worker process."""
+
+    def __init__(self, workers, i, pipe):
+        self.workers = workers
+        self.i = i
+        self.pipe = pipe
+
+    def result(self):
+        status, data = self.pipe.recv()
+        if status == "error":
+            raise RuntimeError(f"parallel group failed in its worker process:\n{data}")
+        return self.workers.merge(self.i, data)
+
+def _worker_bodies(bodyList, group):
+    """The group plus every body it reads, in bodyList order."""
+    needed = {id(body) for body in group}
+    for body in group:
+        orbit_reads, state_reads = references(body, bodyList)
+        needed.update(id(target) for target in orbit_reads + state_reads)
+
+        extrapolator = getattr(body.StateProperties, "extrapolator", None)
+        if extrapolator is not None:
+            # Building a prediction basis runs the source's own dynamics
+            needed.update(id(target) for target in references(extrapolator.body, bodyList)[0])
+    return [body for body in bodyList if id(body) in needed]
+
+def _has_archive(body):
+    # Compact archives are not covered by history_changes
+    SP = body.StateProperties
+    return any(getattr(SP, f"_{history}_archive") is not None for history in _HISTORIES)
+
+def _serve(pipe):
+    """Worker process: hosts groups until told to stop."""
+    groups = {}
+    while True:
+        try:
+            message = pipe.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        kind, i, payload = message
+        if kind == "load":
+            try:
+                groups[i] = pickle.loads(payload)
+            except Exception:
+                groups[i] = traceback.format_exc()
+            continue
+
+        try:
+            if isinstance(groups[i], str):
+                raise RuntimeError(groups[i])
+            reply = ("ok", _run_resident(*groups[i], *payload))
+        except Exception:
+            reply = ("error", traceback.format_exc())
+        pipe.send(reply)
+
+def _run_resident(bodies, members, heap, uid, t_end, limits, updates):
+    # Bring the bodies other groups propagate up to date
+    for n, tails, scalars in updates:
+        SP = bodies[n].StateProperties
+        for history, (times, states) in tails.items():
+            getattr(SP, f"_{history}_times").extend(times)
+            getattr(SP, f"_{history}_states").extend(states)
+        SP.__dict__.update(scalars)
+
+    group = [bodies[n] for n in members]
+    for body in group:
+        body.StateProperties.mark_history()
+
+    if limits:
+        limits = {
+            (bodies[n], t): {bodies[source].StateProperties: caps for source, caps in caps_by_source.items()}
+            for (n, t), caps_by_source in limits.items()
+        }
+    entries = [(t, entry_uid, bodies[n]) for t, entry_uid, n in heap]
+    pq, synced = _run_group(bodies, entries, uid, t_end, limits)
+
+    index = {id(body): n for n, body in enumerate(bodies)}
+    refs = {id(body): ("body", n, None) for n, body in enumerate(bodies)}
+    changes = []
+    for n, body in enumerate(group):
+        SP = body.StateProperties
+        refs[id(SP)] = ("state", n, None)
+        for history in _HISTORIES:
+            for name in (f"_{history}_times", f"_{history}_states"):
+                refs[id(getattr(SP, name))] = ("history", n, name)
+            change = SP.history_changes(history)
+            if change is not None:
+                changes.append((n, history, change))
+
+    result = (
+        [(body.__dict__, body.StateProperties.__dict__) for body in group],
+        changes,
+        [(t, entry_uid, index[id(body)]) for t, entry_uid, body in pq],
+        [(t, index[id(body)]) for t, body in synced],
+    )
+
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: refs.get(id(obj))
+    pickler.dump(result)
+    return buffer.getvalue()
@@ -62,6 +62,16 @@ class FigureObject:
         if self.axis_equal:
             self.ax.set_aspect('equal', adjustable='box')
             
+def common_time_span(bodies):
+    """
+    Time span covered by every body's orbit history. Ephemeris-driven and
+    static bodies are known at any time and do not limit it.
+    """
+    sampled = [b for b in bodies if getattr(b.StateProperties, "orbit_source", None) is None] or bodies
+    t_start = max(b.StateProperties.orbit_times[0] for b in sampled)
+    t_end   = min(b.StateProperties.orbit_times[-1] for b in sampled)
+    return t_start, t_end
+
 def Plot_Body(Body):
     BodyPlot = plt.scatter(Body.StateProperties.orbit_stateHistory[0, 0], 
                            Body.StateProperties.orbit_stateHistory[0, 1], 
@@ -76,18 +86,145 @@ def Plot_Body(Body):
                      )
     return BodyPlot
 
-def Plot_Trajectory(Body):
-    TrajectoryPlot = plt.plot(Body.StateProperties.orbit_stateHistory[:, 0], 
-                              Body.StateProperties.orbit_stateHistory[:, 1],
+def Plot_Trajectory(Body, decimate=None, decimate_threshold=20000):
+    """
+    Plot a body's x-y trajectory.
+
+    decimate : None (auto, above decimate_threshold points), True or False.
+        Decimated lines only hold the points visible at the current axis
+        limits and resolution (see DecimatedTrajectory) and are refreshed on
+        zoom, pan and resize.
+    """
+    history = Body.StateProperties.orbit_stateHistory
+    x = history[:, 0]
+    y = history[:, 1]
+
+    if decimate is None:
+        decimate = len(x) > decimate_threshold
+
+    if not decimate:
+        TrajectoryPlot = plt.plot(x, y,
+                                  label       = f"{Body.name} Trajectory",
+                                  color       = Body.VisualProperties.lineColor,
+                                  linewidth   = Body.VisualProperties.lineWidth,
+                                  alpha       = 1,
+                                  zorder      = 99,
+        )
+        return TrajectoryPlot
+
+    TrajectoryPlot = plt.plot([], [],
                               label       = f"{Body.name} Trajectory",
                               color       = Body.VisualProperties.lineColor,
                               linewidth   = Body.VisualProperties.lineWidth,
                               alpha       = 1,
                               zorder      = 99,
     )
+    # The line keeps its decimator alive for as long as it is drawn
+    TrajectoryPlot[0].decimator = DecimatedTrajectory(plt.gca(), TrajectoryPlot[0], x, y)
 
     return TrajectoryPlot
 
+class DecimatedTrajectory:
+    """
+    Pixel-aware min/max level of detail for a long x-y line.
+
+    Only points inside the current view (plus their neighbours, so lines
+    leaving the view are still drawn) are considered. They are split into
+    about one bucket per pixel along the longer axis side, and each bucket
+    keeps its first/last point and the points where x and y reach their
+    minimum and maximum. The drawn line therefore has O(pixels) points, but
+    every extreme that would light up a pixel is kept.
+    """
+
+    def __init__(self, ax, line, x, y, oversample=1.0):
+        self.ax = ax
+        self.line = line
+        self.x = x
+        self.y = y
+        self.oversample = oversample
+
+        # Autoscale on the full extent, not the decimated subset
+        x_min, x_max = _finite_range(x)
+        y_min, y_max = _finite_range(y)
+        ax.update_datalim([[x_min, y_min], [x_max, y_max]])
+        ax.autoscale_view()
+
+        self.update()
+        ax.callbacks.connect("xlim_changed", self.update)
+        ax.callbacks.connect("ylim_changed", self.update)
+        ax.figure.canvas.mpl_connect("resize_event", self.update)
+
+    def update(self, *args):
+        n_bins = int(self.oversample * max(self.ax.bbox.width, self.ax.bbox.height, 1))
+        xd, yd = minmax_decimate(
+            self.x, self.y,
+            self.ax.get_xlim(), self.ax.get_ylim(),
+            n_bins
+        )
+        self.line.set_data(xd, yd)
+
+def minmax_decimate(x, y, xlim, ylim, n_bins):
+    """
+    Reduce (x, y) to the points needed to draw it inside xlim/ylim with
+    n_bins buckets. Breaks between separate visible stretches are NaN.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if n == 0:
+        return x, y
+
+    x_lo, x_hi = sorted(xlim)
+    y_lo, y_hi = sorted(ylim)
+    visible = (x >= x_lo) & (x <= x_hi) & (y >= y_lo) & (y <= y_hi)
+
+    # Neighbours of visible points keep segments that cross the view edge
+    keep = visible.copy()
+    keep[1:] |= visible[:-1]
+    keep[:-1] |= visible[1:]
+
+    idx = np.flatnonzero(keep)
+    if len(idx) == 0:
+        return np.empty(0), np.empty(0)
+
+    # Stretches of consecutive indices are drawn as separate pieces
+    segment = np.concatenate(([0], np.cumsum(np.diff(idx) > 1)))
+
+    if len(idx) > 6 * n_bins:
+        per_bin = int(np.ceil(len(idx) / n_bins))
+        n_bins = int(np.ceil(len(idx) / per_bin))
+        padded = np.concatenate((idx, np.full(n_bins * per_bin - len(idx), idx[-1])))
+        buckets = padded.reshape(n_bins, per_bin)
+
+        xb = x[buckets]
+        yb = y[buckets]
+        rows = np.arange(n_bins)
+        picks = np.concatenate((
+            buckets[:, 0],
+            buckets[:, -1],
+            buckets[rows, np.argmin(xb, axis=1)],
+            buckets[rows, np.argmax(xb, axis=1)],
+            buckets[rows, np.argmin(yb, axis=1)],
+            buckets[rows, np.argmax(yb, axis=1)],
+        ))
+        picks = np.unique(picks)
+        segment = segment[np.searchsorted(idx, picks)]
+        idx = picks
+
+    xd = np.asarray(x[idx], dtype=float)
+    yd = np.asarray(y[idx], dtype=float)
+
+    breaks = np.flatnonzero(np.diff(segment)) + 1
+    if len(breaks):
+        xd = np.insert(xd, breaks, np.nan)
+        yd = np.insert(yd, breaks, np.nan)
+
+    return xd, yd
+
+def _finite_range(values):
+    values = np.asarray(values)
+    return float(np.nanmin(values)), float(np.nanmax(values))
+
 def Plot_Axes(Body):
     # Initial attitude
     att0 = Body.StateProperties.attitude_stateHistory[0]
@@ -139,8 +276,7 @@ def Animate_Trajectories(bodies, Figure_Object):
     # -------------------------------------------------
     # GLOBAL ANIMATION TIME (decoupled from simulation)
     # -------------------------------------------------
-    t_start = max(b.StateProperties._orbit_times[0] for b in bodies)
-    t_end   = min(b.StateProperties._orbit_times[-1] for b in bodies)
+    t_start, t_end = common_time_span(bodies)
 
     duration_sec, interval_ms, num_frames = compute_animation_timing(bodies)
     t_anim = np.linspace(t_start, t_end, num_frames)
@@ -174,48 +310,54 @@ def Animate_Trajectories(bodies, Figure_Object):
             markers.append(marker)
 
     # -------------------------------------------------
-    # Trail buffers (bounded)
+    # Precompute every frame (vectorized over t_anim)
+    # -------------------------------------------------
+    # positions[i]  : (frames, 2) body position
+    # axis_tips[i]  : (frames, 3, 2) end points of the body x/y/z axes, or None
+    positions = []
+    axis_tips = []
+    for b in bodies:
+        orbit_states = b.StateProperties.orbit_states_at_times(t_anim)
+        xy = np.ascontiguousarray(orbit_states[:, 0:2])
+        positions.append(xy)
+
+        att_states = b.StateProperties.attitude_states_at_times(t_anim)
+        if att_states is None or att_states.shape[1] < 4:
+            axis_tips.append(None)
+            continue
+
+        C = quat_to_dcm_batch(att_states[:, 0:4])              # (frames, 3, 3)
+        # Column j of C is body axis j in the inertial frame
+        tips = xy[:, None, :] + axis_scale * np.swapaxes(C[:, 0:2, :], 1, 2)
+        axis_tips.append(tips)
+
+    # -------------------------------------------------
+    # Trail length (bounded)
     # -------------------------------------------------
     MAX_TRAIL = 10
-    trails = [{"x": [], "y": []} for _ in bodies]
 
     # -------------------------------------------------
     # Frame update
     # -------------------------------------------------
     def update(frame):
-        t = t_anim[frame]
         artists = []
+        start = max(0, frame - MAX_TRAIL + 1)
+
+        for i in range(len(bodies)):
+            xy = positions[i]
+            x, y = xy[frame]
 
-        # Scale relative to body orbit size
-        for i, b in enumerate(bodies):
-            # Position
-            orbit_state = b.StateProperties.orbit_state_at_time(t)
-            x, y = orbit_state[0], orbit_state[1]
-
-            trails[i]["x"].append(x)
-            trails[i]["y"].append(y)
-            if len(trails[i]["x"]) > MAX_TRAIL:
-                trails[i]["x"] = trails[i]["x"][-MAX_TRAIL:]
-                trails[i]["y"] = trails[i]["y"][-MAX_TRAIL:]
-            lines[i].set_data(trails[i]["x"], trails[i]["y"])
+            lines[i].set_data(xy[start:frame + 1, 0], xy[start:frame + 1, 1])
             markers[i].set_data([x], [y])
             artists.extend([lines[i], markers[i]])
 
-            # Attitude axes
-            att_state = b.StateProperties.attitude_state_at_time(t)
-            q = att_state[0:4]
-            C = quat_to_dcm(q)
-
-            x_b = C @ np.array([1.0, 0.0, 0.0])
-            y_b = C @ np.array([0.0, 1.0, 0.0])
-            z_b = C @ np.array([0.0, 0.0, 1.0])
+            tips = axis_tips[i]
+            if tips is None:
+                continue
 
-            bx, by, bz = axes_artists[i]
-            bx.set_data([x, x + axis_scale * x_b[0]], [y, y + axis_scale * x_b[1]])
-            by.set_data([x, x + axis_scale * y_b[0]], [y, y + axis_scale * y_b[1]])
-            bz.set_data([x, x + axis_scale * z_b[0]], [y, y + axis_scale * z_b[1]])
-
-            artists.extend([bx, by, bz])
+            for axis_artist, tip in zip(axes_artists[i], tips[frame]):
+                axis_artist.set_data([x, tip[0]], [y, tip[1]])
+                artists.append(axis_artist)
 
         return artists
 
@@ -244,8 +386,7 @@ def compute_animation_timing(bodies,
     """
 
     # Determine common time span
-    t_start = max(b.StateProperties._orbit_times[0] for b in bodies)
-    t_end   = min(b.StateProperties._orbit_times[-1] for b in bodies)
+    t_start, t_end = common_time_span(bodies)
 
     sim_span = max(1e-6, t_end - t_start)
 
@@ -273,4 +414,18 @@ def quat_to_dcm(q):
         [2*(q1*q3 - q0*q2),     2*(q2*q3 + q0*q1),     1 - 2*(q1*q1 + q2*q2)]
     ])
 
-
+def quat_to_dcm_batch(q):
+    """quat_to_dcm for an (N, 4) array of quaternions; returns (N, 3, 3)."""
+    q = np.asarray(q, dtype=float)
+    q0, q1, q2, q3 = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    C = np.empty((len(q), 3, 3))
+    C[:, 0, 0] = 1 - 2*(q2*q2 + q3*q3)
+    C[:, 0, 1] = 2*(q1*q2 - q0*q3)
+    C[:, 0, 2] = 2*(q1*q3 + q0*q2)
+    C[:, 1, 0] = 2*(q1*q2 + q0*q3)
+    C[:, 1, 1] = 1 - 2*(q1*q1 + q3*q3)
+    C[:, 1, 2] = 2*(q2*q3 - q0*q1)
+    C[:, 2, 0] = 2*(q1*q3 - q0*q2)
+    C[:, 2, 1] = 2*(q2*q3 + q0*q1)
+    C[:, 2, 2] = 1 - 2*(q1*q1 + q2*q2)
+    return C
@@ -0,0 +1,173 @@
+import numpy as np
+
+# Step used by fixed-step integrators when IndividualIntegratorProperties.dt is left unset
+DEFAULT_FIXED_DT = 10.0
+
+# Default error blocks: each block gets its own scale (position vs velocity,
+# quaternion vs body rates; the orbit block 6: covers an augmented STM)
+DEFAULT_BLOCKS = {
+    "orbit": (slice(0, 3), slice(3, 6), slice(6, None)),
+    "attitude": (slice(0, 4), slice(4, None)),
+}
+
+
+# ======================================================
+# Step Controller
+# ======================================================
+class StepController:
+    """
+    PI step-size controller for embedded Runge-Kutta pairs.
+
+    The error of a step is a weighted RMS: each block of components is
+    scaled by atol + rtol * |block| (its vector norm), so position errors
+    are judged against the position magnitude and velocity errors against
+    the speed. The norm is the largest block RMS; a step is accepted
+    when it is <= 1.
+
+    atol     : scalar or one value per block, e.g. (1e-3, 1e-6) for
+               metres / metres-per-second (missing trailing blocks reuse
+               the last value)
+    rtol     : relative tolerance
+    blocks   : slices grouping the state components (None: whole state)
+    safety   : safety factor on the proposed step
+    fac_min  : largest allowed shrink per step
+    fac_max  : largest allowed growth per step
+    beta     : PI gain on the previous error (0 gives a plain I controller)
+    order    : order of the error estimate (5 for Dormand-Prince 4(5))
+    """
+
+    def __init__(self, atol=1e-12, rtol=1e-12, blocks=None, safety=0.9,
+                 fac_min=0.2, fac_max=5.0, beta=0.04, order=5):
+        self.atol = atol
+        self.rtol = rtol
+        self.blocks = blocks
+        self.safety = safety
+        self.fac_min = fac_min
+        self.fac_max = fac_max
+        self.beta = beta
+        self.order = order
+
+        self.reset()
+
+    def reset(self):
+        self._err_old = 1e-4
+        self._rejected = False
+        self.accepted_steps = 0
+        self.rejected_steps = 0
+
+    # --------------------------------------------------
+    # Error norm
+    # --------------------------------------------------
+    def error_norm(self, err, x, x_new):
+        err = np.asarray(err)
+        blocks = self.blocks or (slice(None),)
+        atol = np.atleast_1d(np.asarray(self.atol, dtype=float))
+        if len(atol) < len(blocks):
+            # Blocks without their own atol (e.g. an augmented STM) reuse the last one
+            atol = np.concatenate((atol, np.full(len(blocks) - len(atol), atol[-1])))
+
+        worst = 0.0
+        for block, a in zip(blocks, atol):
+            e = err[block]
+            if e.size == 0:
+                continue
+            scale = a + self.rtol * max(np.linalg.norm(x[block]), np.linalg.norm(x_new[block]))
+            worst = max(worst, np.sqrt(np.mean((e / scale) ** 2)))
+        return worst
+
+    # --------------------------------------------------
+    # Step proposals
+    # --------------------------------------------------
+    def accept(self, dt, err):
+        """Record an accepted step and return the next step size."""
+        expo = 1.0 / self.order - 0.75 * self.beta
+        fac = err ** expo / self._err_old ** self.beta
+        fac = np.clip(fac / self.safety, 1.0 / self.fac_max, 1.0 / self.fac_min)
+        dt_next = dt / fac
+
+        # No growth straight after a rejection
+        if self._rejected:
+            dt_next = min(dt_next, dt)
+
+        self._err_old = max(err, 1e-4)
+        self._rejected = False
+        self.accepted_steps += 1
+        return dt_next
+
+    def reject(self, dt, err):
+        """Record a rejected step and return the step to retry with."""
+        fac = min(1.0 / self.fac_min, err ** (1.0 / self.order) / self.safety)
+        self._rejected = True
+        self.rejected_steps += 1
+        return dt / fac
+
+    def initial_step(self, dynamics, x, t, dt_min, dt_max):
+        """Starting step from the local derivative scale (Hairer, Norsett & Wanner II.4)."""
+        x = np.asarray(x, dtype=float)
+        f0 = dynamics(x, t)
+
+        d0 = self.error_norm(x, x, x)
+        d1 = self.error_norm(f0, x, x)
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+
+        f1 = dynamics(x + h0 * f0, t + h0)
+        d2 = self.error_norm(f1 - f0, x, x) / h0
+
+        if max(d1, d2) <= 1e-15:
+            h1 = max(1e-6, 1e-3 * h0)
+        else:
+            h1 = (0.01 / max(d1, d2)) ** (1.0 / self.order)
+
+        return float(np.clip(min(100.0 * h0, h1), dt_min, dt_max))
+
+
+# ======================================================
+# Engine helpers
+# ======================================================
+def controller_for(IP, kind="orbit"):
+    """The controller attached to IndividualIntegratorProperties (built from its tolerances)."""
+    if IP.controller is None:
+        IP.controller = StepController(
+            atol=IP.absTol,
+            rtol=IP.relTol,
+            blocks=DEFAULT_BLOCKS.get(kind),
+        )
+    return IP.controller
+
+def ensure_step(IP, x, t, kind="orbit"):
+    """Choose IP.dt automatically if it was left unset."""
+    if IP.dt is not None:
+        return IP.dt
+
+    if getattr(IP.integrator, "adaptive", False):
+        IP.dt = controller_for(IP, kind).initial_step(IP.dynamics, x, t, IP.dt_min, IP.dt_max)
+    else:
+        IP.dt = DEFAULT_FIXED_DT
+    return IP.dt
+
+def adaptive_step(IP, dynamics, x, t, dt, kind="orbit"):
+    """
+    One accepted adaptive step of at most dt.
+
+    Returns (x_new, dt_taken) and updates IP.dt with the controller's next
+    step. A step cut short only to land on a sync time leaves IP.dt alone.
+    At dt_min the step is accepted whatever its error.
+    """
+    controller = controller_for(IP, kind)
+    shortened = dt < IP.dt
+
+    h = dt
+    while True:
+        x_new, err_vec = IP.integrator.step_error(dynamics, x, t, h)
+        err = controller.error_norm(err_vec, x, x_new)
+
+        if err <= 1.0 or h <= IP.dt_min:
+            break
+
+        h = max(IP.dt_min, controller.reject(h, err))
+
+    dt_next = controller.accept(h, err)
+    if not shortened or h < dt:
+        IP.dt = float(np.clip(dt_next, IP.dt_min, IP.dt_max))
+
+    return x_new, h
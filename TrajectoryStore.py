@@ -0,0 +1,425 @@
+import json
+import os
+import queue
+import threading
+import numpy as np
+import ObjectModels
+
+STORE_FORMAT  = "trajectory-store"
+STORE_VERSION = 1
+METADATA_FILE = "metadata.json"
+
+HISTORY_WIDTHS = {"orbit": 6, "attitude": 7}
+
+VISUAL_FIELDS   = ("bodyColor", "edgeColor", "lineColor", "textColor",
+                   "lineWidth", "size", "icon", "frameScale")
+PHYSICAL_FIELDS = ("J2", "mass", "radius", "mu", "SOI")
+
+
+# ======================================================
+# Writing
+# ======================================================
+class TrajectoryWriter:
+    """
+    Writes body histories as chunked binary columns.
+
+    Layout on disk:
+        <path>/metadata.json
+        <path>/body_000/orbit_t.f64      time column
+        <path>/body_000/orbit_0.f64      one file per state component
+        ...
+    Every column is a raw little-endian float64 file, so it can be reopened
+    with np.memmap and sliced without reading the rest of the run.
+    """
+
+    def __init__(self, path, chunk_rows=65536):
+        self.path = path
+        self.chunk_rows = int(chunk_rows)
+        self._bodies = {}
+        self._order = []
+        os.makedirs(self.path, exist_ok=True)
+
+    def add_body(self, body):
+        if body.name in self._bodies:
+            return self._bodies[body.name]
+
+        entry = {
+            "name": body.name,
+            "kind": getattr(body, "kind", type(body).__name__),
+            "directory": f"body_{len(self._order):03d}",
+            "visual": _copy_fields(body.VisualProperties, VISUAL_FIELDS),
+            "physical": _copy_fields(body.PhysicalProperties, PHYSICAL_FIELDS),
+        }
+        for history, width in HISTORY_WIDTHS.items():
+            entry[history] = {"rows": 0, "width": width, "dtype": "<f8"}
+
+        # Columns are appended to, so drop any left by an earlier save here
+        directory = os.path.join(self.path, entry["directory"])
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            if filename.endswith(".f64"):
+                os.remove(os.path.join(directory, filename))
+
+        self._bodies[body.name] = entry
+        self._order.append(body.name)
+        return entry
+
+    def append(self, name, history, times, states):
+        """Append rows to one history ("orbit" or "attitude") of a body."""
+        entry = self._bodies[name]
+        meta = entry[history]
+
+        times = np.asarray(times, dtype="<f8").reshape(-1)
+        if times.size == 0:
+            return
+        states = np.asarray(states, dtype="<f8").reshape(times.size, -1)
+
+        # Width is fixed by the first write (e.g. STM-augmented orbit states)
+        if meta["rows"] == 0:
+            meta["width"] = states.shape[1]
+        elif states.shape[1] != meta["width"]:
+            raise ValueError(
+                f"{name} {history}: expected width {meta['width']}, got {states.shape[1]}"
+            )
+
+        directory = os.path.join(self.path, entry["directory"])
+        with open(os.path.join(directory, f"{history}_t.f64"), "ab") as f:
+            f.write(times.tobytes())
+        for col in range(meta["width"]):
+            with open(os.path.join(directory, f"{history}_{col}.f64"), "ab") as f:
+                f.write(np.ascontiguousarray(states[:, col]).tobytes())
+
+        meta["rows"] += times.size
+
+    def write_body(self, body):
+        """Write the full in-memory history of a body, one chunk at a time."""
+        self.add_body(body)
+        SP = body.StateProperties
+        for history in HISTORY_WIDTHS:
+            # export_history includes samples moved to the compact archive
+            times, states, _ = SP.export_history(history)
+            for i in range(0, len(times), self.chunk_rows):
+                self.append(
+                    body.name, history,
+                    times[i:i + self.chunk_rows],
+                    states[i:i + self.chunk_rows],
+                )
+
+    def flush(self):
+        metadata = {
+            "format": STORE_FORMAT,
+            "version": STORE_VERSION,
+            "chunk_rows": self.chunk_rows,
+            "bodies": [self._bodies[name] for name in self._order],
+        }
+        tmp = os.path.join(self.path, METADATA_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, METADATA_FILE))
+
+    def close(self):
+        self.flush()
+
+
+class HistoryWriter:
+    """
+    Background-thread front end for TrajectoryWriter.
+
+    append() only copies the rows and queues them; the disk writes happen on
+    a worker thread so the propagation loop never waits on I/O (unless the
+    queue is full, which bounds memory held in flight).
+    """
+
+    def __init__(self, path, chunk_rows=65536, max_pending=64, flush_every=16):
+        self.writer = TrajectoryWriter(path, chunk_rows=chunk_rows)
+        self.flush_every = flush_every
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self):
+        return self.writer.path
+
+    def add_body(self, body):
+        self._check()
+        self._queue.put(("add", body.name, _BodySnapshot(body)))
+
+    def append(self, name, history, times, states):
+        self._check()
+        times = np.array(times, dtype=float)
+        states = np.array(states, dtype=float)
+        self._queue.put(("append", name, (history, times, states)))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._check()
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError("history writer failed") from self._error
+
+    def _run(self):
+        writes = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                op, name, payload = item
+                if op == "add":
+                    self.writer.add_body(payload)
+                else:
+                    self.writer.append(name, *payload)
+                    writes += 1
+                    if writes % self.flush_every == 0:
+                        self.writer.flush()
+            except Exception as exc:
+                self._error = exc
+        try:
+            self.writer.flush()
+        except Exception as exc:
+            if self._error is None:
+                self._error = exc
+
+
+def save_trajectories(path, bodyList, chunk_rows=65536):
+    """Write every body's time/orbit/attitude history to a trajectory store."""
+    writer = TrajectoryWriter(path, chunk_rows=chunk_rows)
+    for body in bodyList:
+        writer.write_body(body)
+    writer.close()
+    return path
+
+
+# ======================================================
+# Reading
+# ======================================================
+class TrajectoryStore:
+    """
+    Memory-mapped view of a saved run.
+
+    store = TrajectoryStore(path)
+    for body in store.bodies:
+        StandardPlots.Plot_Trajectory(body)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+
+        if self.metadata.get("format") != STORE_FORMAT:
+            raise ValueError(f"{path} is not a trajectory store")
+
+        self.bodies = [StoredBody(path, entry) for entry in self.metadata["bodies"]]
+        self._by_name = {body.name: body for body in self.bodies}
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __iter__(self):
+        return iter(self.bodies)
+
+    def __len__(self):
+        return len(self.bodies)
+
+
+class StoredBody:
+    """Read-only stand-in for a CelestialBody, backed by a trajectory store."""
+
+    def __init__(self, path, entry):
+        self.name = entry["name"]
+        self.kind = entry["kind"]
+        self.description = None
+
+        self.VisualProperties = ObjectModels.VisualProperties()
+        for field, value in entry["visual"].items():
+            setattr(self.VisualProperties, field, value)
+
+        self.PhysicalProperties = ObjectModels.PhysicalProperties()
+        for field, value in entry["physical"].items():
+            setattr(self.PhysicalProperties, field, value)
+
+        self.StateProperties = StoredStateProperties(
+            os.path.join(path, entry["directory"]), entry
+        )
+
+
+class StoredStateProperties:
+    """
+    Mirrors the read side of ObjectModels.StateProperties over memmapped columns.
+    """
+
+    def __init__(self, directory, entry):
+        self.collided = False
+        self._orbit_times, self._orbit_columns = _open_history(directory, "orbit", entry["orbit"])
+        self._attitude_times, self._attitude_columns = _open_history(directory, "attitude", entry["attitude"])
+
+## ORBIT STATE
+    @property
+    def orbit_latest_time(self):
+        if len(self._orbit_times) == 0:
+            return None
+        return float(self._orbit_times[-1])
+
+    @property
+    def orbit_times(self):
+        return self._orbit_times
+
+    @property
+    def orbit_stateCurrent(self):
+        if len(self._orbit_times) == 0:
+            return None
+        return self.orbit_stateHistory[-1]
+
+    @property
+    def orbit_stateHistory(self):
+        return ColumnStack(self._orbit_columns, len(self._orbit_times))
+
+    def orbit_state_at_time(self, t):
+        return _interpolate(self._orbit_times, self._orbit_columns, t)
+
+    def orbit_states_at_times(self, times):
+        return _interpolate_many(self._orbit_times, self._orbit_columns, times)
+
+## ATTITUDE STATE
+    @property
+    def attitude_latest_time(self):
+        if len(self._attitude_times) == 0:
+            return None
+        return float(self._attitude_times[-1])
+
+    @property
+    def attitude_times(self):
+        return self._attitude_times
+
+    @property
+    def attitude_stateCurrent(self):
+        if len(self._attitude_times) == 0:
+            return None
+        return self.attitude_stateHistory[-1]
+
+    @property
+    def attitude_stateHistory(self):
+        return ColumnStack(self._attitude_columns, len(self._attitude_times))
+
+    def attitude_state_at_time(self, t):
+        return _interpolate(self._attitude_times, self._attitude_columns, t)
+
+    def attitude_states_at_times(self, times):
+        return _interpolate_many(self._attitude_times, self._attitude_columns, times)
+
+
+class ColumnStack:
+    """
+    Lazy (rows, width) array assembled from per-component columns.
+
+    Indexing a single column (history[:, 0]) returns a slice of that column's
+    memmap without touching the others; anything else is materialized.
+    """
+
+    ndim = 2
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.shape = (rows, len(columns))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, cols = key
+            if isinstance(cols, (int, np.integer)):
+                return self.columns[cols][rows]
+            selected = self.columns[cols]
+            return np.stack([c[rows] for c in selected], axis=-1)
+
+        if isinstance(key, (int, np.integer)):
+            return np.array([c[key] for c in self.columns])
+
+        return np.stack([c[key] for c in self.columns], axis=-1)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+
+# ======================================================
+# Helpers
+# ======================================================
+class _BodySnapshot:
+    """Snapshot of the fields TrajectoryWriter.add_body reads, safe to hand to another thread."""
+
+    def __init__(self, body):
+        self.name = body.name
+        self.kind = type(body).__name__
+        self.VisualProperties = _Fields(_copy_fields(body.VisualProperties, VISUAL_FIELDS))
+        self.PhysicalProperties = _Fields(_copy_fields(body.PhysicalProperties, PHYSICAL_FIELDS))
+
+class _Fields:
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+def _copy_fields(obj, fields):
+    out = {}
+    for field in fields:
+        value = getattr(obj, field, None)
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            out[field] = value
+    return out
+
+def _open_history(directory, history, meta):
+    rows = int(meta["rows"])
+    dtype = np.dtype(meta["dtype"])
+
+    def column(name):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(directory, name), dtype=dtype, mode="r", shape=(rows,))
+
+    times = column(f"{history}_t.f64")
+    columns = [column(f"{history}_{col}.f64") for col in range(int(meta["width"]))]
+    return times, columns
+
+def _interpolate(times, columns, t):
+    n = len(times)
+    if n == 0:
+        return None
+
+    if t <= times[0]:
+        return np.array([c[0] for c in columns])
+
+    if t >= times[-1]:
+        return np.array([c[n - 1] for c in columns])
+
+    i = int(np.searchsorted(times, t)) - 1
+    t0, t1 = times[i], times[i + 1]
+    alpha = (t - t0) / (t1 - t0)
+    return np.array([(1 - alpha) * c[i] + alpha * c[i + 1] for c in columns])
+
+def _interpolate_many(times, columns, t):
+    # Only the bracketing rows are gathered, so the memmaps stay mostly unread
+    n = len(times)
+    if n == 0:
+        return None
+
+    t = np.asarray(t, dtype=float)
+    if n == 1:
+        return np.stack([np.full(t.shape, c[0]) for c in columns], axis=-1)
+
+    i = np.clip(np.searchsorted(times, t) - 1, 0, n - 2)
+    t0, t1 = times[i], times[i + 1]
+    alpha = np.clip((t - t0) / (t1 - t0), 0.0, 1.0)
+    return np.stack([(1 - alpha) * c[i] + alpha * c[i + 1] for c in columns], axis=-1)
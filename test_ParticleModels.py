@@ -0,0 +1,26 @@
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import ColorSchemeObjects
+import ExampleObjectClasses
+import ForceModels
+import ParticleModels
+import StandardPlots
+
+
+def test_animate_particle_handles():
+    Earth = ExampleObjectClasses.Earth()
+    Earth.make_static()
+
+    registry = ParticleModels.ParticleRegistry([ForceModels.PointMassGravity(Earth)])
+    x0 = ExampleObjectClasses.LEOSpaceVehicle().StateProperties.orbit_stateCurrent
+    handles = registry.add_many(np.vstack((x0, x0 * np.array([1.1, 1, 1, 1, 0.95, 1]))))
+    for t in np.linspace(60.0, 600.0, 10):
+        registry.propagate_to(t)
+
+    assert handles[0].StateProperties.attitude_states_at_times(np.array([0.0])) is None
+
+    Figure = StandardPlots.FigureObject(ColorSchemeObjects.VisualScheme_Default)
+    ani = StandardPlots.Animate_Trajectories(handles, Figure)
+    ani._func(0)
+    ani._func(5)